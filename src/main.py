@@ -5,52 +5,143 @@
 main.py
 
 This file orchestrates the entire SHIELD-RSU system. The steps are:
-1) Ego vehicle & LiDAR data ingestion
-2) End-to-end LLM analysis (trajectory, collision risk, severity ranking)
+1) Ego vehicle & LiDAR data ingestion, objects outside the configured
+   zones (crosswalks, sidewalks, approach lanes) dropped
+2) Deterministic risk pre-ranking (TTC, closest approach, VRU vulnerability);
+   end-to-end LLM analysis only for scenes the pre-ranking cannot decide,
+   optionally through the background LLMServer so the loop never blocks
 3) Message formatting & sending
+
+With PIPELINED the three steps run as separate worker threads connected by
+one-slot queues that keep only the newest frame: ingestion and broadcast
+tick at 10 Hz on a monotonic scheduler, and analysis works on the latest
+frame at whatever rate it manages. The broadcast repeats the most recent
+analysis until a newer one arrives, for at most BROADCAST_MAX_AGE_S after
+its frame was captured.
+
+Stage latencies (utils/instrumentation.py) are logged periodically and
+served as Prometheus text on a local port.
 """
 
+import threading
 import time
+from utils import instrumentation
+from utils.instrumentation import record, timed
 from utils.logger import logger
+from utils.zone_map import load_zone_map
 
 from modules.data_ingestion import DataIngestion
 from modules.llm_inference import LLMInference
 from modules.communication import Communication
+from modules.risk_engine import RiskEngine
+from modules.llm_server import LLMServer
+from modules.scheduler import PERIOD_S, LatestQueue, PeriodicScheduler
+
+# Run the LLM in the background LLMServer instead of blocking run_cycle().
+ASYNC_LLM = True
+
+# An LLM answer on a scene submitted longer ago than this is no longer used;
+# the rule-based result is.
+LLM_RESULT_MAX_AGE_S = 1.0
+
+# Run ingestion, analysis and communication as separate pipeline stages.
+PIPELINED = True
+
+# The communication stage stops repeating a result whose frame was captured
+# longer ago than this (analysis failing or stalled); its positions are stale.
+BROADCAST_MAX_AGE_S = 1.0
+
+# Serve stage latency histograms at http://127.0.0.1:METRICS_PORT/metrics
+# (None disables it) and log a latency summary every interval.
+METRICS_PORT = instrumentation.METRICS_PORT
+METRICS_SUMMARY_INTERVAL_S = 60.0
 
 
 class SHIELDRSUSystem:
 
-    def __init__(self):
+    def __init__(self, async_llm: bool = False, pipelined: bool = False):
         """
         Initialize the subsystem classes. In a real deployment on Jetson Orin Nano,
         you might also handle GPU initialization or other system setup here.
+
+        Args:
+            async_llm: Submit ambiguous scenes to a background LLMServer and
+              keep using rule-based / recent LLM results while it runs,
+              instead of calling the LLM synchronously.
+            pipelined: main_loop() runs the stages in their own threads
+              (see start_pipeline()) instead of calling run_cycle().
         """
         logger.info("Initializing SHIELD-RSU system...")
 
         self.data_ingestion = DataIngestion()
         self.llm_inference = LLMInference()
         self.communication = Communication()
+        self.risk_engine = RiskEngine()
+        self.zone_map = load_zone_map()
+
+        self.llm_server = LLMServer(self.llm_inference.generate_batch).start() if async_llm else None
+        self.pending_llm = None      # Future of the scene currently being analysed
+        self.pending_llm_submitted_at = None
+        self.last_llm_result = None  # Most recent LLM answer
+        self.last_llm_submitted_at = None  # Monotonic time its scene was submitted
+
+        # Pipeline stages: ingest -> frames -> analysis -> results -> communication
+        self.pipelined = pipelined
+        self.frames = LatestQueue()    # (captured_at, ego_data, lidar_objects)
+        self.results = LatestQueue()   # (captured_at, ego_data, ranked_objects)
+        self.latest_result = None      # Result the communication stage repeats
+        self.schedulers = {
+            'ingest': PeriodicScheduler(PERIOD_S, name="ingest"),
+            'communication': PeriodicScheduler(PERIOD_S, name="communication"),
+        }
+        self.stage_stats = {
+            'frames_ingested': 0,
+            'frames_analysed': 0,
+            'broadcasts_sent': 0,
+            'stale_results': 0,
+            'last_result_age_ms': 0.0
+        }
+        self._stop = threading.Event()
+        self._workers = []
 
 
+    @timed("cycle")
     def run_cycle(self):
         """
         One iteration of the pipeline:
-        1) Ingest data
-        2) Run LLM end-to-end analysis
+        1) Ingest data, keep only objects inside the zones
+        2) Rank risks with the RiskEngine; run LLM end-to-end analysis
+           only if the scene is ambiguous
         3) Send broadcast & personalized messages
         """
         # 1) Data Ingestion
+        ego_data, lidar_objects = self._ingest()
+
+        # 2) Risk pre-ranking, LLM End-to-end analysis for ambiguous scenes
+        ranked_objects = self._analyse(ego_data, lidar_objects)
+
+        # 3) Communication
+        self._communicate(ego_data, ranked_objects)
+
+
+    @timed("ingest")
+    def _ingest(self):
         ego_data = self.data_ingestion.get_ego_data()
         lidar_objects = self.data_ingestion.get_lidar_data()
+        if self.zone_map is not None:
+            lidar_objects = self.zone_map.filter_objects(lidar_objects)
+        return ego_data, lidar_objects
 
-        # 2) LLM End-to-end analysis
-        llm_results = self.llm_inference.end_to_end_analysis(
-            ego_data=ego_data,
-            lidar_objects=lidar_objects
-        )
-        ranked_objects = llm_results.get("ranked_objects", [])
 
-        # 3) Communication
+    @timed("analysis")
+    def _analyse(self, ego_data, lidar_objects):
+        results = self.risk_engine.assess(ego_data, lidar_objects)
+        if results["ambiguous"]:
+            results = self._llm_analysis(ego_data, lidar_objects, results)
+        return results.get("ranked_objects", [])
+
+
+    def _communicate(self, ego_data, ranked_objects):
         broadcast_msg = self.communication.format_broadcast_message(ranked_objects)
         self.communication.send_broadcast_message(broadcast_msg)
 
@@ -58,23 +149,154 @@ class SHIELDRSUSystem:
         self.communication.send_personalized_message(ego_data, personalized_msg)
 
 
+    def _llm_analysis(self, ego_data, lidar_objects, fallback):
+        """
+        LLM analysis of an ambiguous scene. Without an LLMServer this blocks on
+        end_to_end_analysis(). Otherwise the scene is submitted (unless one is
+        already pending) and the most recent LLM answer is returned if its scene
+        was submitted at most LLM_RESULT_MAX_AGE_S ago, else the rule-based
+        fallback. The age is taken from the submission, not from the result's
+        analysis_timestamp, which is set when the LLM finishes (or the cache
+        hits) and says nothing about how old the object positions are.
+        """
+        if self.llm_server is None:
+            return self.llm_inference.end_to_end_analysis(
+                ego_data=ego_data,
+                lidar_objects=lidar_objects
+            )
+
+        if self.pending_llm is not None and self.pending_llm.done():
+            try:
+                self.last_llm_result = self.pending_llm.result()
+                self.last_llm_submitted_at = self.pending_llm_submitted_at
+            except Exception as e:
+                logger.error(f"LLM analysis failed: {e}")
+            self.pending_llm = None
+
+        if self.pending_llm is None:
+            self.pending_llm_submitted_at = time.monotonic()
+            self.pending_llm = self.llm_inference.submit_analysis(self.llm_server, ego_data, lidar_objects)
+
+        if self.last_llm_result is not None:
+            age_s = time.monotonic() - self.last_llm_submitted_at
+            if age_s <= LLM_RESULT_MAX_AGE_S:
+                return self.last_llm_result
+        return fallback
+
+
+    def start_pipeline(self):
+        """
+        Starts the ingest, analysis and communication stages in their own
+        threads. Ingest and communication run at 10 Hz whatever the
+        analysis takes; analysis always picks the newest ingested frame.
+        """
+        self._stop.clear()
+        self._workers = [
+            threading.Thread(target=self.schedulers['ingest'].run, args=(self._ingest_stage, self._stop),
+                             name="ingest", daemon=True),
+            threading.Thread(target=self._analysis_stage, name="analysis", daemon=True),
+            threading.Thread(target=self.schedulers['communication'].run,
+                             args=(self._communication_stage, self._stop), name="communication", daemon=True),
+        ]
+        for worker in self._workers:
+            worker.start()
+        logger.info("Pipeline started")
+
+
+    def stop_pipeline(self, timeout: float = 1.0):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        logger.info(f"Pipeline stopped: {self.pipeline_summary()}")
+
+
+    def pipeline_summary(self):
+        """
+        Stage counters, per-stage scheduler counters (ticks, deadline misses)
+        and the number of stale frames/results dropped between stages.
+        """
+        summary = dict(self.stage_stats)
+        for name, scheduler in self.schedulers.items():
+            summary[name] = dict(scheduler.stats)
+        summary['frames_dropped'] = self.frames.dropped
+        summary['results_dropped'] = self.results.dropped
+        return summary
+
+
+    def _ingest_stage(self):
+        ego_data, lidar_objects = self._ingest()
+        self.frames.put_latest((time.monotonic(), ego_data, lidar_objects))
+        self.stage_stats['frames_ingested'] += 1
+
+
+    def _analysis_stage(self):
+        while not self._stop.is_set():
+            frame = self.frames.get_latest(timeout=PERIOD_S)
+            if frame is None:
+                continue
+            captured_at, ego_data, lidar_objects = frame
+            try:
+                ranked_objects = self._analyse(ego_data, lidar_objects)
+            except Exception as e:
+                logger.error(f"Error in analysis: {e}")
+                continue
+            self.results.put_latest((captured_at, ego_data, ranked_objects))
+            self.stage_stats['frames_analysed'] += 1
+
+
+    def _communication_stage(self):
+        result = self.results.get_latest()
+        if result is not None:
+            self.latest_result = result
+        if self.latest_result is None:
+            return
+        captured_at, ego_data, ranked_objects = self.latest_result
+        age_s = time.monotonic() - captured_at
+        self.stage_stats['last_result_age_ms'] = age_s * 1e3
+        record("result_age", age_s)
+        if age_s > BROADCAST_MAX_AGE_S:
+            # No fresh analysis: better silent than old hazard positions and ego data.
+            self.stage_stats['stale_results'] += 1
+            return
+        self._communicate(ego_data, ranked_objects)
+        self.stage_stats['broadcasts_sent'] += 1
+
+
     def main_loop(self):
         """
-        Main loop to continuously run cycles at ~10Hz or the desired frequency.
+        Main loop to continuously run cycles at ~10Hz or the desired
+        frequency, either as pipeline stages or one run_cycle() per tick.
         """
+        if METRICS_PORT is not None:
+            try:
+                instrumentation.serve(METRICS_PORT)
+            except OSError as e:
+                # Port taken or not permitted: run on without the endpoint.
+                logger.warning(f"Metrics endpoint on port {METRICS_PORT} unavailable: {e}")
+        instrumentation.start_periodic_summary(METRICS_SUMMARY_INTERVAL_S,
+                                               lambda text: logger.info("Stage latencies:\n" + text))
+
+        if self.pipelined:
+            self.start_pipeline()
+            try:
+                while True:
+                    time.sleep(10.0)
+                    logger.info(f"Pipeline: {self.pipeline_summary()}")
+            finally:
+                self.stop_pipeline()
+
+        scheduler = PeriodicScheduler(PERIOD_S, name="run_cycle")
         while True:
-            start = time.time()
+            scheduler.wait()
             try:
                 self.run_cycle()
             except Exception as e:
                 logger.error(f"Error in run_cycle: {e}")
 
-            elapsed = time.time() - start
-            time.sleep(max(0.0, 0.1 - elapsed))  # ~10Hz
-
 
 def main():
-    shield_rsu = SHIELDRSUSystem()
+    shield_rsu = SHIELDRSUSystem(async_llm=ASYNC_LLM, pipelined=PIPELINED)
     shield_rsu.main_loop()
 
 
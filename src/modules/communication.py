@@ -8,6 +8,7 @@ into a Communication class.
 
 import json
 from typing import List, Dict, Any
+from utils.instrumentation import timed
 from utils.logger import logger
 
 
@@ -20,6 +21,7 @@ class Communication:
         pass
     
 
+    @timed("message_format")
     def format_broadcast_message(self, ranked_objects: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Creates a general broadcast message for all road users.
@@ -33,6 +35,7 @@ class Communication:
         return msg
     
 
+    @timed("message_format")
     def format_personalized_message(
         self,
         ego_data: Dict[str, float],
@@ -58,6 +61,7 @@ class Communication:
         return msg
     
 
+    @timed("message_send")
     def send_broadcast_message(self, msg: Dict[str, Any]) -> None:
         """
         In a real system, this might publish to an MQTT topic or DSRC broadcast.
@@ -66,6 +70,7 @@ class Communication:
         logger.info("[Broadcast] --> " + json.dumps(msg, indent=2))
 
 
+    @timed("message_send")
     def send_personalized_message(self, ego_data: Dict[str, Any], msg: Dict[str, Any]) -> None:
         """
         In a real system, you might do a point-to-point V2X or socket message to the vehicle.
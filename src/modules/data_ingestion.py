@@ -4,11 +4,22 @@
 """
 data_ingestion.py
 
-Class for receiving ego vehicle data and fetching LiDAR detections.
-Replace placeholder logic with your actual data interfaces.
+Classes for receiving ego vehicle data and fetching LiDAR detections:
+- DataIngestion: placeholder data, replace with your actual data interfaces.
+- SensorIngestion: LiDAR detections from a Gemini Detect object_list stream
+  (or utils/replay_server.py), read in a background thread that keeps only
+  the newest frame.
 """
 
-from typing import Dict, List, Any
+import socket
+import ssl
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from utils.frame_batch import FrameBatch
+from utils.frame_decoder import DECODE_ERRORS, JsonDecoder, get_decoder
+from utils.frame_reader import FrameReader
+from utils.instrumentation import timer
 
 
 class DataIngestion:
@@ -56,4 +67,120 @@ class DataIngestion:
                 "heading_deg": 85.0
             }
         ]
-    
\ No newline at end of file
+
+
+    def get_lidar_batch(self) -> FrameBatch:
+        """
+        Same detections as get_lidar_data(), as a columnar FrameBatch for the
+        vectorized geometry / risk code.
+        """
+        return FrameBatch.from_scene_objects(self.get_lidar_data())
+
+
+class SensorIngestion(DataIngestion):
+    """
+    stats:
+        frames_received     object_list frames decoded
+        frames_replaced     frames overwritten before anyone read them
+        frames_consumed     frames handed out by get_lidar_batch()
+        connection_lost     1 once the stream has ended
+    """
+    def __init__(self,
+                 address: Tuple[str, int],
+                 ssl_context: Optional[ssl.SSLContext] = None,
+                 decoder: Optional[JsonDecoder] = None):
+        """
+        Args:
+            address: (host, port) of the sensor.
+            ssl_context: Client-side TLS context, None for plain TCP.
+            decoder: JSON decoder backend, defaults to the preferred one.
+        """
+        super().__init__()
+        self.address = address
+        self.ssl_context = ssl_context
+        self.decoder = decoder or get_decoder()
+        self.latest = None    # Newest object_list entry
+        self.fresh = False    # latest has not been read yet
+        self.stats = {
+            'frames_received': 0,
+            'frames_replaced': 0,
+            'frames_consumed': 0,
+            'connection_lost': 0
+        }
+        self._lock = threading.Lock()
+        self._socket = None
+        self._thread = None
+
+
+    def start(self) -> "SensorIngestion":
+        """
+        Connects to the sensor and starts the receive thread.
+        """
+        sock = socket.create_connection(self.address)
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_hostname=self.address[0])
+        self._socket = sock
+        self._thread = threading.Thread(target=self._receive, name="sensor-ingestion", daemon=True)
+        self._thread.start()
+        return self
+
+
+    def stop(self, timeout: float = 1.0) -> None:
+        if self._socket is None:
+            return
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._thread.join(timeout)
+        self._socket = None
+
+
+    def _receive(self) -> None:
+        reader = FrameReader(self._socket)
+        while True:
+            try:
+                payload = reader.read_frame()
+            except OSError:
+                payload = None  # Closed by stop()
+            if payload is None:
+                break
+
+            with timer("frame_decode"):
+                try:
+                    data = self.decoder.decode(payload)
+                except DECODE_ERRORS:
+                    continue
+            entries = data.get("object_list") if isinstance(data, dict) else None
+            if not entries:
+                continue  # Heartbeat
+
+            with self._lock:
+                if self.fresh:
+                    self.stats['frames_replaced'] += 1
+                self.latest = entries[-1]
+                self.fresh = True
+                self.stats['frames_received'] += 1
+        self.stats['connection_lost'] = 1
+
+
+    def get_lidar_data(self) -> List[Dict[str, Any]]:
+        """
+        Objects of the newest frame in the scene-object format.
+        """
+        return self.get_lidar_batch().to_scene_objects()
+
+
+    def get_lidar_batch(self) -> FrameBatch:
+        """
+        Newest frame as a FrameBatch; empty until the first frame arrives.
+        """
+        with self._lock:
+            entry = self.latest
+            if self.fresh:
+                self.stats['frames_consumed'] += 1
+                self.fresh = False
+        if entry is None:
+            return FrameBatch()
+        return FrameBatch.from_gemini(entry)
@@ -0,0 +1,355 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-02
+
+"""
+json_constraint.py
+
+Schema-constrained JSON generation for the LLM answer
+
+    {"dangerous_objects": [{...}, {...}, ...]}
+
+JsonPrefixValidator is an incremental pushdown automaton that accepts a
+character only if the text so far can still be completed into an answer of
+that shape. JsonConstraint uses one validator per batch row:
+- as a logits processor it keeps, at every step, the highest-scoring token
+  whose text keeps the output valid (and only EOS once the JSON closed);
+- as a stopping criterion it ends generation as soon as the top-level
+  object is closed in every row.
+
+The HF adapters are plain callables (LogitsProcessorList and
+StoppingCriteriaList only call them), so this module does not import torch.
+"""
+
+import re
+from typing import Callable, List, Optional
+
+# The only key of the top-level object.
+SCHEMA_KEY = "dangerous_objects"
+
+# Number of best-scoring tokens tried before widening the search.
+CANDIDATE_TOKENS = 32
+
+# Consecutive whitespace characters allowed between tokens of the answer, so
+# a model that prefers spaces or newlines cannot stall until max_new_tokens.
+MAX_WHITESPACE = 2
+
+_WHITESPACE = " \t\n\r"
+_HEX_DIGITS = "0123456789abcdefABCDEF"
+_NUMBER_CHARS = "0123456789+-.eE"
+_LITERALS = {"t": "rue", "f": "alse", "n": "ull"}
+
+# A number, and a prefix that can still be completed into one.
+_NUMBER_RE = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+_NUMBER_PREFIX_RE = re.compile(r"-?$|-?(0|[1-9]\d*)(\.\d*)?$|-?(0|[1-9]\d*)(\.\d+)?[eE][+-]?\d*$")
+
+# Automaton modes.
+_VALUE = 0             # Expecting a value
+_STRING = 1            # Inside a string (value or key)
+_NUMBER = 2            # Inside a number
+_LITERAL = 3           # Inside true / false / null
+_AFTER_VALUE = 4       # After a value in a container: ',' or closing bracket
+_KEY_OR_END = 5        # After '{': key or '}'
+_KEY = 6               # After ',' in an object: key
+_COLON = 7             # After a key
+_VALUE_OR_END = 8      # After '[': value or ']'
+_DONE = 9              # Top-level value closed
+
+
+class JsonPrefixValidator:
+    """
+    Accepts the characters of a {"dangerous_objects": [object, ...]} answer
+    one at a time. Elements of the array may hold any JSON. Whitespace is
+    rejected outside the top-level object and after max_whitespace
+    consecutive whitespace characters, inside strings too (None: no limit).
+
+    Attributes:
+        complete: The top-level object has been closed.
+        failed: A rejected character was fed through feed_text().
+        element_boundary: Length of the longest prefix ending between two
+            array elements, where the answer can be cut and closed with ']}'.
+    """
+    __slots__ = ("key", "max_whitespace", "whitespace", "stack", "mode", "buffer", "is_key", "escape",
+                 "unicode_left", "literal", "position", "element_boundary", "complete", "failed")
+
+    def __init__(self, key: str = SCHEMA_KEY, max_whitespace: Optional[int] = MAX_WHITESPACE):
+        self.key = key
+        self.max_whitespace = max_whitespace
+        self.whitespace = 0  # Consecutive whitespace characters just accepted
+        self.stack = []  # 'o' (object) / 'a' (array) per open container
+        self.mode = _VALUE
+        self.buffer = ""
+        self.is_key = False
+        self.escape = False
+        self.unicode_left = 0
+        self.literal = ""
+        self.position = 0
+        self.element_boundary = None
+        self.complete = False
+        self.failed = False
+
+
+    def copy(self) -> "JsonPrefixValidator":
+        clone = JsonPrefixValidator.__new__(JsonPrefixValidator)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        clone.stack = list(self.stack)
+        return clone
+
+
+    def feed_text(self, text: str) -> bool:
+        """Feeds several characters; False (and failed) at the first rejected one."""
+        for ch in text:
+            if not self.feed(ch):
+                self.failed = True
+                return False
+        return True
+
+
+    def feed(self, ch: str) -> bool:
+        """Feeds one character; False if no valid answer starts with the text so far."""
+        accepted = self._feed(ch)
+        if accepted:
+            self.position += 1
+            self.whitespace = self.whitespace + 1 if ch in _WHITESPACE else 0
+            if self.stack == ["o", "a"] and self.mode in (_AFTER_VALUE, _VALUE_OR_END):
+                self.element_boundary = self.position
+        return accepted
+
+
+    def _feed(self, ch: str) -> bool:
+        if ch in _WHITESPACE and self.max_whitespace is not None and self.whitespace >= self.max_whitespace:
+            return False
+        mode = self.mode
+        if mode == _STRING:
+            return self._string(ch)
+        if mode == _NUMBER:
+            if ch in _NUMBER_CHARS:
+                self.buffer += ch
+                return _NUMBER_PREFIX_RE.match(self.buffer) is not None
+            if not _NUMBER_RE.match(self.buffer):
+                return False
+            self._end_value()
+            return self._feed(ch)
+        if mode == _LITERAL:
+            if ch != self.literal[0]:
+                return False
+            self.literal = self.literal[1:]
+            if not self.literal:
+                self._end_value()
+            return True
+
+        if ch in _WHITESPACE:
+            return bool(self.stack)  # None before '{' or after the closing '}'
+        if mode == _DONE:
+            return False
+        if mode == _VALUE_OR_END and ch == "]":
+            return self._close()
+        if mode in (_VALUE, _VALUE_OR_END):
+            return self._start_value(ch)
+        if mode in (_KEY_OR_END, _KEY):
+            if ch == "}" and mode == _KEY_OR_END:
+                # The top-level object must hold the schema key.
+                return self.stack != ["o"] and self._close()
+            if ch != '"':
+                return False
+            self.mode, self.is_key, self.buffer = _STRING, True, ""
+            return True
+        if mode == _COLON:
+            if ch != ":":
+                return False
+            self.mode = _VALUE
+            return True
+
+        # _AFTER_VALUE
+        top = self.stack[-1]
+        if ch == ",":
+            if self.stack == ["o"]:
+                return False  # The schema key is the only one.
+            self.mode = _KEY if top == "o" else _VALUE
+            return True
+        if (ch == "}" and top == "o") or (ch == "]" and top == "a"):
+            return self._close()
+        return False
+
+
+    def _start_value(self, ch: str) -> bool:
+        # Shape required by the schema: {"key": [ {..}, .. ]}
+        depth = len(self.stack)
+        expected = "{" if depth == 0 else "[" if self.stack == ["o"] else "{" if self.stack == ["o", "a"] else None
+        if expected is not None and ch != expected:
+            return False
+
+        if ch == "{":
+            self.stack.append("o")
+            self.mode = _KEY_OR_END
+        elif ch == "[":
+            self.stack.append("a")
+            self.mode = _VALUE_OR_END
+        elif ch == '"':
+            self.mode, self.is_key, self.buffer = _STRING, False, ""
+        elif ch in "-0123456789":
+            self.mode, self.buffer = _NUMBER, ch
+        elif ch in _LITERALS:
+            self.mode, self.literal = _LITERAL, _LITERALS[ch]
+        else:
+            return False
+        return True
+
+
+    def _string(self, ch: str) -> bool:
+        schema_key = self.is_key and self.stack == ["o"]
+        if self.unicode_left:
+            if ch not in _HEX_DIGITS:
+                return False
+            self.unicode_left -= 1
+            return True
+        if self.escape:
+            self.escape = False
+            if ch == "u":
+                self.unicode_left = 4
+                return True
+            return ch in '"\\/bfnrt'
+        if ch == "\\":
+            self.escape = True
+            return not schema_key
+        if ch == '"':
+            if self.is_key:
+                if schema_key and self.buffer != self.key:
+                    return False
+                self.mode = _COLON
+            else:
+                self._end_value()
+            return True
+        if ord(ch) < 0x20:
+            return False
+        if schema_key:
+            self.buffer += ch
+            return self.key.startswith(self.buffer)
+        return True
+
+
+    def _close(self) -> bool:
+        self.stack.pop()
+        self._end_value()
+        return True
+
+
+    def _end_value(self) -> None:
+        if self.stack:
+            self.mode = _AFTER_VALUE
+        else:
+            self.mode = _DONE
+            self.complete = True
+
+
+def close_truncated(text: str) -> Optional[str]:
+    """
+    Repairs an answer cut off by the token limit: keeps the complete array
+    elements and closes the JSON. Returns None if nothing can be salvaged.
+    Any amount of whitespace is accepted, as unconstrained (e.g. indented)
+    answers are repaired too.
+    """
+    validator = JsonPrefixValidator(max_whitespace=None)
+    for ch in text:
+        if not validator.feed(ch):
+            break
+    if validator.complete:
+        return text[:validator.position]
+    if validator.element_boundary is None:
+        return None
+    return text[:validator.element_boundary].rstrip().rstrip(",") + "]}"
+
+
+class JsonConstraint:
+    """
+    Per-generate-call state shared by JsonLogitsProcessor and JsonStoppingCriteria.
+    """
+    def __init__(self,
+                 token_text: Callable[[int], str],
+                 prompt_length: int,
+                 batch_size: int,
+                 eos_token_id: int,
+                 candidate_tokens: int = CANDIDATE_TOKENS):
+        """
+        Args:
+            token_text: Returns the text of one token id.
+            prompt_length: Input length; tokens after it are generated ones.
+            batch_size: Rows of the generate call.
+            eos_token_id: Token forced once a row's JSON is complete.
+            candidate_tokens: Best-scoring tokens tried first at every step.
+        """
+        self.token_text = token_text
+        self.fed = prompt_length
+        self.validators = [JsonPrefixValidator() for _ in range(batch_size)]
+        self.eos_token_id = eos_token_id
+        self.candidate_tokens = candidate_tokens
+        self.unconstrained_steps = 0
+
+
+    def update(self, input_ids) -> None:
+        """Feeds the tokens generated since the last call to the validators."""
+        length = input_ids.shape[1]
+        if length <= self.fed:
+            return
+        for row, validator in enumerate(self.validators):
+            if validator.complete or validator.failed:
+                continue
+            for token in input_ids[row, self.fed:length].tolist():
+                if not validator.feed_text(self.token_text(token)) or validator.complete:
+                    break
+        self.fed = length
+
+
+    def best_valid_token(self, validator: JsonPrefixValidator, row_scores) -> Optional[int]:
+        """Highest-scoring token that keeps the row valid, None if there is none."""
+        vocab_size = row_scores.shape[-1]
+        tried, k = 0, min(self.candidate_tokens, vocab_size)
+        while tried < vocab_size:
+            candidates = row_scores.topk(k).indices.tolist()
+            for token in candidates[tried:]:
+                text = self.token_text(token)
+                if text and validator.copy().feed_text(text):
+                    return token
+            tried, k = k, min(k * 8, vocab_size)
+        return None
+
+
+    def process_logits(self, input_ids, scores):
+        self.update(input_ids)
+        constrained = scores.new_full(scores.shape, float("-inf"))
+        for row, validator in enumerate(self.validators):
+            if validator.complete:
+                constrained[row, self.eos_token_id] = 0.0
+                continue
+            token = None if validator.failed else self.best_valid_token(validator, scores[row])
+            if token is None:
+                constrained[row] = scores[row]
+                self.unconstrained_steps += 1
+            else:
+                constrained[row, token] = scores[row, token]
+        return constrained
+
+
+    def is_done(self, input_ids) -> List[bool]:
+        self.update(input_ids)
+        return [validator.complete for validator in self.validators]
+
+
+class JsonLogitsProcessor:
+    """Logits processor view of a JsonConstraint."""
+
+    def __init__(self, constraint: JsonConstraint):
+        self.constraint = constraint
+
+    def __call__(self, input_ids, scores):
+        return self.constraint.process_logits(input_ids, scores)
+
+
+class JsonStoppingCriteria:
+    """Stopping criterion view of a JsonConstraint: stops rows whose JSON is complete."""
+
+    def __init__(self, constraint: JsonConstraint):
+        self.constraint = constraint
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return input_ids.new_tensor(self.constraint.is_done(input_ids)).bool()
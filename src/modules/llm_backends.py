@@ -0,0 +1,284 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-07
+
+"""
+llm_backends.py
+
+Model backends for LLMInference. Nothing is loaded when a backend is
+created; the weights are read on first use (or by an explicit load()), so
+building SHIELDRSUSystem no longer waits for the model.
+
+Three backends are provided, in order of preference:
+    llama.cpp - GGUF model (e.g. Q4_K_M or Q8_0) run by llama-cpp-python;
+                weights are already quantized and memory-mapped
+                (pip install llama-cpp-python, GGUF file at GGUF_MODEL_PATH)
+    hf-int8   - HF model with its Linear layers converted to int8 by
+                torch dynamic quantization
+    hf        - HF model at full precision
+get_backend() picks the first one available; see
+test/benchmark/bench_llm_backends.py for load time and resident memory.
+
+The HF backends expose tokenizer/model for LLMInference's own generate
+loop (prefix KV cache, JSON constraint). The llama.cpp backend generates
+through complete(): llama.cpp reuses the KV cache of the longest common
+prompt prefix by itself, and a JSON-schema grammar takes the place of the
+JSON constraint.
+"""
+
+import json
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+try:
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+except ImportError:
+    torch = None
+
+try:
+    import llama_cpp
+except ImportError:
+    llama_cpp = None
+
+from utils.logger import logger
+
+# HF model of the hf / hf-int8 backends.
+HF_MODEL_NAME = "Qwen/Qwen2.5-7B-Instruct"
+
+# GGUF model of the llama.cpp backend.
+GGUF_MODEL_PATH = Path("properties/models/qwen2.5-7b-instruct-q4_k_m.gguf")
+
+# Backend used by LLMInference; None picks the first available one.
+LLM_BACKEND = None
+
+# Context window of the llama.cpp backend (prompt template + scene + answer).
+LLAMA_CPP_CONTEXT = 4096
+
+# Schema of the answer, used as a llama.cpp grammar.
+ANSWER_SCHEMA = {
+    "type": "object",
+    "properties": {"dangerous_objects": {"type": "array", "items": {"type": "object"}}},
+    "required": ["dangerous_objects"],
+}
+
+
+def resident_memory_mb() -> float:
+    """
+    Return:
+        Current resident set size of this process in MiB (peak RSS where
+        /proc is not available).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LLMBackend:
+    """
+    Lazily loaded model. Subclasses implement _load().
+
+    load_stats:
+        load_s          wall time of the load
+        rss_before_mb   resident memory before the load
+        rss_after_mb    resident memory after the load
+    """
+    name = None
+
+    # Whether LLMInference drives model.generate() itself (HF backends) or
+    # calls complete().
+    hf_generate = False
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.load_stats = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+
+    def load(self) -> "LLMBackend":
+        """Reads the model if that has not happened yet."""
+        with self._load_lock:
+            if self._loaded:
+                return self
+            rss_before = resident_memory_mb()
+            start = time.perf_counter()
+            self._load()
+            self._loaded = True
+            self.load_stats = {
+                'load_s': time.perf_counter() - start,
+                'rss_before_mb': rss_before,
+                'rss_after_mb': resident_memory_mb(),
+            }
+            logger.info(f"Loaded {self.name} backend ({self.model_name}): {self.load_stats}")
+        return self
+
+
+    def _load(self) -> None:
+        raise NotImplementedError
+
+
+    def count_tokens(self, text: str) -> int:
+        raise NotImplementedError
+
+
+    def complete(self, prompts: List[str], max_new_tokens: int, constrained: bool = True) -> List[str]:
+        raise NotImplementedError
+
+
+class HFBackend(LLMBackend):
+    """
+    Full-precision HF model. from_pretrained() memory-maps safetensors
+    checkpoints and, with low_cpu_mem_usage, builds the model without a
+    second, randomly initialised copy of the weights.
+    """
+    name = "hf"
+    hf_generate = True
+
+    def __init__(self, model_name: str = HF_MODEL_NAME):
+        super().__init__(model_name)
+        self._tokenizer = None
+        self._model = None
+
+
+    @property
+    def tokenizer(self):
+        # The tokenizer is small, so it is read on its own and does not load the model.
+        if self._tokenizer is None:
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            # Batched generation pads on the left so every prompt ends at the same position.
+            self._tokenizer.padding_side = "left"
+            if self._tokenizer.pad_token is None:
+                self._tokenizer.pad_token = self._tokenizer.eos_token
+        return self._tokenizer
+
+
+    @property
+    def model(self):
+        self.load()
+        return self._model
+
+
+    def _load(self) -> None:
+        self._model = AutoModelForCausalLM.from_pretrained(self.model_name, low_cpu_mem_usage=True)
+        self._model.eval()
+
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+
+class HFInt8Backend(HFBackend):
+    """
+    HF model whose Linear layers hold int8 weights (torch dynamic
+    quantization: activations are quantized per batch at run time). About
+    a quarter of the fp32 weight memory after the load; the fp32 weights
+    are still read once, so peak memory during the load is not reduced.
+    Use the llama.cpp backend where that peak does not fit.
+    """
+    name = "hf-int8"
+
+    def _load(self) -> None:
+        model = AutoModelForCausalLM.from_pretrained(self.model_name, low_cpu_mem_usage=True,
+                                                     torch_dtype=torch.float32)
+        self._model = torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear},
+                                                             dtype=torch.qint8)
+
+
+class LlamaCppBackend(LLMBackend):
+    """
+    GGUF model run by llama.cpp. The file is memory-mapped, so only the
+    pages touched by inference become resident.
+    """
+    name = "llama.cpp"
+
+    def __init__(self,
+                 model_path: Path = GGUF_MODEL_PATH,
+                 n_ctx: int = LLAMA_CPP_CONTEXT,
+                 n_threads: Optional[int] = None):
+        super().__init__(str(model_path))
+        self.model_path = Path(model_path)
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self._llama = None
+        self._grammar = None
+
+
+    @property
+    def llama(self):
+        self.load()
+        return self._llama
+
+
+    def _load(self) -> None:
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"GGUF model not found: {self.model_path}")
+        if llama_cpp is None:
+            raise ImportError("The llama.cpp backend needs llama-cpp-python.")
+        self._llama = llama_cpp.Llama(model_path=str(self.model_path), n_ctx=self.n_ctx,
+                                      n_threads=self.n_threads, use_mmap=True, verbose=False)
+        self._grammar = llama_cpp.LlamaGrammar.from_json_schema(json.dumps(ANSWER_SCHEMA), verbose=False)
+
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.llama.tokenize(text.encode("utf-8"), add_bos=False))
+
+
+    def complete(self, prompts: List[str], max_new_tokens: int, constrained: bool = True) -> List[str]:
+        """
+        Generates the prompts one after the other (greedy). With constrained,
+        the output follows ANSWER_SCHEMA and ends when the JSON closes.
+        """
+        llama = self.llama
+        outputs = []
+        for prompt in prompts:
+            completion = llama.create_completion(prompt, max_tokens=max_new_tokens, temperature=0.0,
+                                                 grammar=self._grammar if constrained else None)
+            outputs.append(completion["choices"][0]["text"])
+        return outputs
+
+
+# Backends in order of preference, with their availability.
+BACKENDS = {
+    "llama.cpp": (LlamaCppBackend, llama_cpp is not None and GGUF_MODEL_PATH.exists()),
+    "hf-int8": (HFInt8Backend, torch is not None and hasattr(torch, "ao")),
+    "hf": (HFBackend, torch is not None),
+}
+
+
+def available_backends() -> List[str]:
+    """
+    Return:
+        Names of the usable backends, in order of preference.
+    """
+    return [name for name, (_, available) in BACKENDS.items() if available]
+
+
+def get_backend(name: Optional[str] = None, **kwargs: Any) -> LLMBackend:
+    """
+    Returns an unloaded backend instance.
+
+    Args:
+        name: Backend name ("llama.cpp", "hf-int8" or "hf"). Defaults to the
+          preferred available backend.
+        kwargs: Passed to the backend, e.g. model_name or model_path.
+    """
+    if name is None:
+        available = available_backends()
+        if not available:
+            raise ImportError("No LLM backend available: install torch/transformers or llama-cpp-python.")
+        name = available[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    return BACKENDS[name][0](**kwargs)
+
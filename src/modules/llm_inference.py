@@ -5,102 +5,416 @@
 llminference.py
 
 Encapsulates an LLMInference class that performs:
-- Prompt reading (with chain-of-thought)
-- Single end-to-end LLM call
+- Prompt reading (with chain-of-thought), its KV cache computed once
+- Lazy model loading through a configurable (quantized) backend
+- Optional speculative decoding with a small draft model
+- Single end-to-end LLM call, or batched calls through an LLMServer
+- Reuse of recent answers for (quantized) identical scenes
 - Parsing and post-processing results
 """
 
+import copy
 import math
 import time
 import json
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Dict, Any, List
 
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM  # Example HF usage
+try:
+    import torch
+    from transformers import LogitsProcessorList, StoppingCriteriaList
+except ImportError:
+    torch = None  # Only the HF backends need torch, see llm_backends.py
 
+from modules.json_constraint import JsonConstraint, JsonLogitsProcessor, JsonStoppingCriteria, close_truncated
+from modules.llm_backends import LLM_BACKEND, HFBackend, LLMBackend, get_backend
+from modules.scene_cache import SceneCache, refresh_result, scene_signature
+from modules.scene_encoder import SceneEncoder
+from modules.speculative import DRAFT_MODEL_NAME, SpeculativeDecoder
+from utils.instrumentation import record, timed
+from utils.logger import logger
 
-class LLMInference:
+# Generation budget per request; the expected JSON answer is short.
+MAX_NEW_TOKENS = 256
+
+# Encode the static prompt template once and reuse its past-key-values.
+PREFIX_CACHE = True
+
+# Constrain generation to the {"dangerous_objects": [...]} schema and stop
+# as soon as the JSON object closes.
+CONSTRAINED_JSON = True
 
+# Also count the tokens of the indented JSON scene the compact table replaces
+# and log both per request; tokenizes the whole JSON, so off in production.
+MEASURE_TOKEN_SAVINGS = False
+
+
+class _PrefillTimer:
+    """
+    Records when the first logits are processed, i.e. when the prefill
+    forward pass is done, so generation time can be split into prefill and
+    decode.
+    """
     def __init__(self):
+        self.prefill_done = None
+
+    def __call__(self, input_ids, scores):
+        if self.prefill_done is None:
+            self.prefill_done = time.perf_counter()
+        return scores
+
+
+class LLMInference:
+
+    def __init__(self, backend: LLMBackend = None, draft_model: str = DRAFT_MODEL_NAME):
         """
-        Load the Qwen Qwen2.5-7B-Instruct model from Hugging Face 
-        and read the chain-of-thought prompt from property/prompt.txt.
+        Select the model backend (Qwen2.5-7B-Instruct, see llm_backends.py)
+        and read the chain-of-thought prompt from property/prompt.txt. The
+        model itself is loaded on the first request, or by load().
+
+        Args:
+            backend: Model backend; defaults to get_backend(LLM_BACKEND).
+            draft_model: HF name of a small model of the same family that
+              drafts tokens for speculative decoding (HF backends only),
+              None to decode token by token.
         """
-        self.model_name = "Qwen/Qwen2.5-7B-Instruct"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
-        self.model.eval()
+        self.backend = backend if backend is not None else get_backend(LLM_BACKEND)
+        self.model_name = self.backend.model_name
+
+        self.speculative = None
+        if draft_model is not None and self.backend.hf_generate:
+            self.speculative = SpeculativeDecoder(HFBackend(draft_model))
 
         # Load the chain-of-thought prompt template from file
         prompt_file = Path("properties/prompt.txt")
         self.prompt_template = prompt_file.read_text(encoding="utf-8")
 
+        # Token ids and KV cache of the template, shared by every request;
+        # built together with the model (HF backends only)
+        self.prefix_ids = None
+        self.prefix_cache = None
+
+        # Timing of the most recent generate call, see _generate()
+        self.last_metrics = {}
+
+        # Token id -> text, filled lazily by the JSON constraint
+        self._token_texts = {}
+
+        # Answers that parsed as JSON directly, after repair, or not at all
+        self.parse_stats = {'parsed': 0, 'repaired': 0, 'failed': 0}
+
+        # Recent answers by quantized scene signature
+        self.scene_cache = SceneCache()
+
+        # Compact, token-budgeted scene table; last_scene holds its token counts
+        self.scene_encoder = SceneEncoder(token_counter=self._count_tokens,
+                                          measure_savings=MEASURE_TOKEN_SAVINGS)
+        self.last_scene = None
+
+
+    @property
+    def tokenizer(self):
+        return self.backend.tokenizer
+
+
+    @property
+    def model(self):
+        return self.backend.model
+
+
+    def load(self) -> "LLMInference":
+        """
+        Loads the model (and caches the prompt template) now instead of on
+        the first request.
+        """
+        self.backend.load()
+        if PREFIX_CACHE and self.backend.hf_generate and self.prefix_cache is None:
+            self._build_prefix_cache()
+            if self.speculative is not None:
+                self.speculative.cache_prefix(self.prefix_ids)
+        return self
+
 
     def end_to_end_analysis(self,
                             ego_data: Dict[str, float],
                             lidar_objects: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
+        0) Return the cached answer if the same scene was analysed recently
         1) Format the prompt
         2) Call the LLM
         3) Parse JSON
         4) Post-process -> Return only dangerous objects
         """
+        signature = scene_signature(ego_data, lidar_objects)
+        cached = self.scene_cache.get(signature)
+        if cached is not None:
+            return refresh_result(cached, lidar_objects)
+
         prompt = self._format_prompt(ego_data, lidar_objects)
         llm_raw_output = self._call_llm(prompt)
         llm_parsed_output = self._parse_llm_output(llm_raw_output)
         result = self._post_process(ego_data, lidar_objects, llm_parsed_output)
 
+        self.scene_cache.put(signature, result)
         return result
 
 
+    def submit_analysis(self,
+                        server,
+                        ego_data: Dict[str, float],
+                        lidar_objects: List[Dict[str, Any]]) -> Future:
+        """
+        Non-blocking end_to_end_analysis(): queues the prompt on an LLMServer
+        (built on generate_batch) and returns a Future resolving to the same
+        result dict. Parsing and post-processing run in the server's worker.
+        A cached scene resolves immediately.
+        """
+        signature = scene_signature(ego_data, lidar_objects)
+        cached = self.scene_cache.get(signature)
+        if cached is not None:
+            future = Future()
+            future.set_result(refresh_result(cached, lidar_objects))
+            return future
+
+        prompt = self._format_prompt(ego_data, lidar_objects)
+
+        def finish(llm_raw_output: str) -> Dict[str, Any]:
+            llm_parsed_output = self._parse_llm_output(llm_raw_output)
+            result = self._post_process(ego_data, lidar_objects, llm_parsed_output)
+            self.scene_cache.put(signature, result)
+            return result
+
+        return server.submit(prompt, finish)
+
+
+    def _build_prefix_cache(self) -> None:
+        """
+        Tokenizes the prompt template and runs it through the model once, so
+        requests only need to encode their ego/object suffix.
+        """
+        start = time.perf_counter()
+        self.prefix_ids = self.tokenizer(self.prompt_template, return_tensors='pt')["input_ids"]
+        with torch.no_grad():
+            self.prefix_cache = self.model(input_ids=self.prefix_ids, use_cache=True).past_key_values
+        logger.info(f"Cached {self.prefix_ids.shape[1]} prompt template tokens "
+                    f"in {time.perf_counter() - start:.2f} s")
+
+
+    @timed("prompt_build")
     def _format_prompt(self,
                        ego_data: Dict[str, float],
                        lidar_objects: List[Dict[str, Any]]) -> str:
         """
         Insert the EGO data and LiDAR objects into the chain-of-thought prompt template.
+        lidar_objects may also be a FrameBatch.
+        """
+        return self.prompt_template + self._format_scene(ego_data, lidar_objects)
+
+
+    def _format_scene(self,
+                      ego_data: Dict[str, float],
+                      lidar_objects: List[Dict[str, Any]]) -> str:
         """
-        prompt = (
-            self.prompt_template
-            + "\n\nEGO Vehicle Data:\n"
-            + json.dumps(ego_data, indent=2)
-            + "\n\nDetected Objects:\n"
-            + json.dumps(lidar_objects, indent=2)
-        )
-        return prompt
+        The request-specific part of the prompt that follows the template:
+        the ego data and a compact table of the highest-priority objects
+        that fit the scene token budget.
+        """
+        self.last_scene = scene = self.scene_encoder.encode(ego_data, lidar_objects)
+        if scene.verbose_tokens:
+            logger.info(f"Scene encoded: {scene.tokens} tokens (indented JSON: {scene.verbose_tokens}), "
+                        f"{scene.objects_kept}/{scene.objects_total} objects")
+        else:
+            logger.debug(f"Scene encoded: {scene.tokens} tokens, "
+                         f"{scene.objects_kept}/{scene.objects_total} objects")
+        return self.last_scene.text
+
+
+    def _count_tokens(self, text: str) -> int:
+        return self.backend.count_tokens(text)
+
+
+    def _prepare_inputs(self, prompts: List[str]):
+        """
+        Tokenizes the prompts for generate().
+
+        If every prompt starts with the cached template, only the suffixes are
+        tokenized and a copy of the template's KV cache (repeated per prompt)
+        is returned, so generate() encodes just the suffix tokens. Suffixes
+        are left-padded, which puts the padding between template and suffix
+        where the attention mask hides it.
+
+        Returns:
+            (inputs, past_key_values) with past_key_values None without a cache hit.
+        """
+        self.load()
+        template = self.prompt_template
+        if self.prefix_cache is None or not all(prompt.startswith(template) for prompt in prompts):
+            return dict(self.tokenizer(prompts, return_tensors='pt', padding=True)), None
+
+        suffix = self.tokenizer([prompt[len(template):] for prompt in prompts],
+                                return_tensors='pt', padding=True, add_special_tokens=False)
+        prefix_ids = self.prefix_ids.expand(len(prompts), -1)
+        inputs = {
+            "input_ids": torch.cat([prefix_ids, suffix["input_ids"]], dim=1),
+            "attention_mask": torch.cat([torch.ones_like(prefix_ids), suffix["attention_mask"]], dim=1),
+        }
+        past_key_values = copy.deepcopy(self.prefix_cache)  # generate() appends to the cache
+        if len(prompts) > 1:
+            past_key_values.batch_repeat_interleave(len(prompts))
+        return inputs, past_key_values
+
+
+    def _generate(self, inputs: Dict[str, Any], past_key_values, **generate_kwargs):
+        """
+        Runs model.generate() and records the prefill/decode split of its
+        wall time in self.last_metrics. With CONSTRAINED_JSON the output is
+        forced into the answer schema and generation stops once it is closed.
+        Single prompts go through the speculative decoder if one is set up.
+        """
+        speculative = self.speculative is not None and inputs["input_ids"].shape[0] == 1
+        timer = _PrefillTimer()
+        logits_processor = [timer]
+        stopping_criteria = []
+        constraint = None
+        if CONSTRAINED_JSON:
+            constraint = JsonConstraint(self._token_text, inputs["input_ids"].shape[1],
+                                        inputs["input_ids"].shape[0], self.tokenizer.eos_token_id)
+            logits_processor.append(JsonLogitsProcessor(constraint))
+            stopping_criteria.append(JsonStoppingCriteria(constraint))
+
+        start = time.perf_counter()
+        if speculative:
+            output_ids, run = self.speculative.generate(
+                self.model,
+                inputs["input_ids"],
+                past_key_values,
+                eos_token_id=self.tokenizer.eos_token_id,
+                constraint=constraint,
+                **generate_kwargs
+            )
+            timer.prefill_done = start + run['prefill_s']
+        else:
+            with torch.no_grad():
+                output_ids = self.model.generate(
+                    **inputs,
+                    past_key_values=past_key_values,
+                    logits_processor=LogitsProcessorList(logits_processor),
+                    stopping_criteria=StoppingCriteriaList(stopping_criteria),
+                    do_sample=False,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    **generate_kwargs
+                )
+        end = time.perf_counter()
+        prefill_done = timer.prefill_done or end
+
+        input_length = inputs["input_ids"].shape[1]
+        prefix_length = self.prefix_ids.shape[1] if past_key_values is not None else 0
+        self.last_metrics = {
+            "batch_size": output_ids.shape[0],
+            "cached_tokens": prefix_length,
+            "encoded_tokens": input_length - prefix_length,
+            "new_tokens": output_ids.shape[1] - input_length,
+            "prefill_s": prefill_done - start,
+            "decode_s": end - prefill_done,
+        }
+        if constraint is not None:
+            self.last_metrics["json_complete"] = sum(v.complete for v in constraint.validators)
+            self.last_metrics["unconstrained_steps"] = constraint.unconstrained_steps
+        record("llm_prefill", self.last_metrics["prefill_s"])
+        record("llm_decode", self.last_metrics["decode_s"])
+        if speculative:
+            self.last_metrics["drafted_tokens"] = run['drafted']
+            self.last_metrics["accepted_tokens"] = run['accepted']
+        logger.debug(f"LLM generate: {self.last_metrics}")
+        return output_ids
+
+
+    def _token_text(self, token_id: int) -> str:
+        text = self._token_texts.get(token_id)
+        if text is None:
+            text = self._token_texts[token_id] = self.tokenizer.decode([token_id])
+        return text
 
 
     def _call_llm(self, prompt: str) -> str:
         """
         Use the loaded HF model to generate text from the prompt.
         This is a synchronous example - consider your performance constraints.
+        Only the newly generated tokens are decoded.
         """
-        # Encode input
-        input_ids = self.tokenizer.encode(prompt, return_tensors='pt')
-        
-        with torch.no_grad():
-            output_ids = self.model.generate(
-                input_ids,
-                max_length=1024,
-                do_sample=False,  # or True if you want sampling
-            )
-        output_text = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+        if not self.backend.hf_generate:
+            return self._complete([prompt])[0]
+
+        # Encode input (only the part after the cached template, if any)
+        inputs, past_key_values = self._prepare_inputs([prompt])
+
+        output_ids = self._generate(inputs, past_key_values, max_new_tokens=MAX_NEW_TOKENS)
+        new_tokens = output_ids[0, inputs["input_ids"].shape[1]:]
+        output_text = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
 
         return output_text
+
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Generates the outputs of several prompts in one padded generate call.
+        Only the newly generated tokens are decoded.
+        """
+        if not self.backend.hf_generate:
+            return self._complete(prompts)
+
+        inputs, past_key_values = self._prepare_inputs(prompts)
+
+        output_ids = self._generate(inputs, past_key_values, max_new_tokens=MAX_NEW_TOKENS)
+        new_tokens = output_ids[:, inputs["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
     
 
+    def _complete(self, prompts: List[str]) -> List[str]:
+        """
+        Generation through a backend with its own decoding loop (llama.cpp);
+        it handles prefix reuse and the answer schema itself.
+        """
+        self.load()
+        start = time.perf_counter()
+        outputs = self.backend.complete(prompts, MAX_NEW_TOKENS, constrained=CONSTRAINED_JSON)
+        self.last_metrics = {
+            "batch_size": len(prompts),
+            "generate_s": time.perf_counter() - start,
+        }
+        record("llm_generate", self.last_metrics["generate_s"])
+        logger.debug(f"LLM generate: {self.last_metrics}")
+        return outputs
+
+
+    @timed("llm_parse")
     def _parse_llm_output(self, llm_raw_output: str) -> Dict[str, Any]:
         """
         Convert the LLM's raw text into a Python dict.
-        Expected to be valid JSON with a 'dangerous_objects' key.
+        Expected to be valid JSON with a 'dangerous_objects' key. An answer
+        cut off by the token limit keeps its complete objects.
         """
-        # Find JSON substring or assume the entire output is JSON
         try:
-            # A naive approach: we assume the LLM output is fully JSON
             parsed = json.loads(llm_raw_output)
+            self.parse_stats['parsed'] += 1
+            return parsed
         except json.JSONDecodeError:
-            parsed = {"dangerous_objects": []}
-        return parsed
+            pass
+
+        start = llm_raw_output.find("{")
+        repaired = close_truncated(llm_raw_output[start:]) if start >= 0 else None
+        if repaired is not None:
+            try:
+                parsed = json.loads(repaired)
+                self.parse_stats['repaired'] += 1
+                return parsed
+            except json.JSONDecodeError:
+                pass
+
+        logger.warning("Could not parse the LLM output as JSON")
+        self.parse_stats['failed'] += 1
+        return {"dangerous_objects": []}
     
 
     def _post_process(self,
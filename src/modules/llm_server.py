@@ -0,0 +1,197 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-28
+
+"""
+llm_server.py
+
+Background LLM inference service. Scene requests from any number of callers
+(ego vehicles, sensors) are queued, and a single worker thread groups the
+requests that are waiting into one padded generate call. Callers get a
+concurrent.futures.Future immediately and never block on the model, so the
+10 Hz loop keeps running on cached or rule-based results while an answer is
+pending.
+
+Batching happens at the request level: a generate call runs to completion,
+and requests arriving meanwhile form the next batch (HF generate cannot add
+sequences to a running batch).
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.logger import logger
+
+# Largest number of prompts per generate call.
+MAX_BATCH_SIZE = 8
+
+# How long the worker waits for more requests after the first one arrives.
+MAX_BATCH_WAIT_S = 0.01
+
+# Pending requests; the oldest one is dropped when the queue is full.
+QUEUE_SIZE = 32
+
+# Number of recent request latencies kept for the percentiles.
+LATENCY_WINDOW = 1000
+
+
+class _Request:
+    __slots__ = ("prompt", "finish", "future", "submitted")
+
+    def __init__(self, prompt: str, finish: Optional[Callable[[str], Any]]):
+        self.prompt = prompt
+        self.finish = finish
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class LLMServer:
+    """
+    Runs generate_fn in its own worker thread on batches of queued prompts.
+
+    generate_fn takes a list of prompts and returns one output string per
+    prompt, e.g. LLMInference.generate_batch.
+    """
+    def __init__(self,
+                 generate_fn: Callable[[List[str]], List[str]],
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 max_batch_wait_s: float = MAX_BATCH_WAIT_S,
+                 queue_size: int = QUEUE_SIZE):
+        self.generate_fn = generate_fn
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_s = max_batch_wait_s
+        self.requests = queue.Queue(maxsize=queue_size)
+        self.latencies_s = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {
+            'requests_submitted': 0,
+            'requests_completed': 0,
+            'requests_failed': 0,
+            'requests_dropped': 0,
+            'batches': 0
+        }
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._worker = None
+
+
+    def start(self) -> "LLMServer":
+        if self._worker is None:
+            self._stopping.clear()
+            self._worker = threading.Thread(target=self._run, name="llm-server", daemon=True)
+            self._worker.start()
+            logger.info("LLM server started")
+        return self
+
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the worker after the current batch; pending requests are cancelled.
+        """
+        if self._worker is None:
+            return
+        self._stopping.set()
+        self._worker.join(timeout)
+        self._worker = None
+        while True:
+            try:
+                self.requests.get_nowait().future.cancel()
+            except queue.Empty:
+                break
+        logger.info("LLM server stopped")
+
+
+    def submit(self, prompt: str, finish: Optional[Callable[[str], Any]] = None) -> Future:
+        """
+        Queues a prompt.
+
+        Args:
+            prompt: The full prompt text.
+            finish: Optional function applied to the raw output in the worker
+              (e.g. parsing); the future then resolves to its result.
+
+        Returns:
+            Future resolving to the (finished) model output. If the queue is
+            full, the oldest pending request is cancelled to make room.
+        """
+        request = _Request(prompt, finish)
+        with self._lock:
+            self.stats['requests_submitted'] += 1
+            while True:
+                try:
+                    self.requests.put_nowait(request)
+                    break
+                except queue.Full:
+                    try:
+                        self.requests.get_nowait().future.cancel()
+                        self.stats['requests_dropped'] += 1
+                    except queue.Empty:
+                        pass
+        return request.future
+
+
+    def _next_batch(self) -> List[_Request]:
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.max_batch_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0
+                             else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        # Skip requests cancelled by their caller while queued.
+        return [request for request in batch if request.future.set_running_or_notify_cancel()]
+
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            try:
+                outputs = self.generate_fn([request.prompt for request in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"generate_fn returned {len(outputs)} outputs for {len(batch)} prompts")
+            except Exception as e:
+                logger.error(f"LLM batch of {len(batch)} failed: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                self.stats['requests_failed'] += len(batch)
+                continue
+
+            self.stats['batches'] += 1
+            self.batch_sizes.append(len(batch))
+            done = time.perf_counter()
+            for request, output in zip(batch, outputs):
+                try:
+                    result = request.finish(output) if request.finish else output
+                except Exception as e:
+                    request.future.set_exception(e)
+                    self.stats['requests_failed'] += 1
+                    continue
+                request.future.set_result(result)
+                self.latencies_s.append(done - request.submitted)
+                self.stats['requests_completed'] += 1
+
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns the counters plus mean batch size and p50/p99 latency in ms.
+        """
+        latencies = np.array(self.latencies_s) * 1e3
+        summary = dict(self.stats)
+        summary['mean_batch_size'] = float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0
+        summary['latency_p50_ms'] = float(np.percentile(latencies, 50)) if len(latencies) else 0.0
+        summary['latency_p99_ms'] = float(np.percentile(latencies, 99)) if len(latencies) else 0.0
+        return summary
@@ -0,0 +1,195 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-18
+
+"""
+risk_engine.py
+
+Deterministic, vectorized collision-risk pre-ranking. For every ego/object
+pair it computes, in one NumPy pass:
+- constant-velocity trajectory extrapolation
+- closest-approach distance and time
+- time-to-collision (TTC)
+- a risk score weighted by VRU vulnerability
+
+The result uses the same 'ranked_objects' structure as
+LLMInference.end_to_end_analysis(), so Communication can consume either.
+Scenes where the numbers do not give a clear answer are flagged as
+ambiguous, and only those need the LLM.
+"""
+
+import time
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+from utils.frame_batch import CLASS_CODES, CLASS_NAMES, FrameBatch
+from utils.logger import logger
+
+# Look-ahead for the trajectory extrapolation, in seconds.
+PREDICTION_HORIZON_S = 5.0
+
+# Two road users closer than this (centre to centre) count as colliding.
+COLLISION_RADIUS_M = 2.0
+
+# Closest-approach distance beyond which proximity adds no risk.
+PROXIMITY_RADIUS_M = 10.0
+
+# Objects at or above this risk score are reported as dangerous.
+DANGER_THRESHOLD = 0.6
+
+# Scores in [low, high) are too close to call; the scene is then sent to the LLM.
+AMBIGUITY_BAND = (0.4, 0.6)
+
+# Weight of the TTC term vs. the proximity term in the risk score.
+TTC_WEIGHT = 0.7
+
+# VRU vulnerability index per classification code.
+VULNERABILITY_WEIGHTS = np.ones(len(CLASS_NAMES), dtype=np.float32)
+VULNERABILITY_WEIGHTS[CLASS_CODES["UNKNOWN"]] = 0.8
+VULNERABILITY_WEIGHTS[CLASS_CODES["PERSON"]] = 1.0
+VULNERABILITY_WEIGHTS[CLASS_CODES["BICYCLE"]] = 0.9
+VULNERABILITY_WEIGHTS[CLASS_CODES["VEHICLE"]] = 0.7
+VULNERABILITY_WEIGHTS[CLASS_CODES["LARGE_VEHICLE"]] = 0.8
+
+
+def ego_kinematics(ego_data: Dict[str, float]):
+    """
+    Returns the ego (x, y) position and (vx, vy) velocity from an ego_data dict.
+    Heading is in degrees counter-clockwise from the +x axis, like FrameBatch.
+    """
+    speed = ego_data.get("speed_mps", 0.0)
+    heading = np.radians(ego_data.get("heading_deg", 0.0))
+    position = np.array([ego_data.get("location_x", 0.0), ego_data.get("location_y", 0.0)])
+    velocity = np.array([speed * np.cos(heading), speed * np.sin(heading)])
+    return position, velocity
+
+
+class RiskEngine:
+
+    def __init__(self,
+                 horizon_s: float = PREDICTION_HORIZON_S,
+                 collision_radius_m: float = COLLISION_RADIUS_M,
+                 proximity_radius_m: float = PROXIMITY_RADIUS_M,
+                 danger_threshold: float = DANGER_THRESHOLD,
+                 ambiguity_band=AMBIGUITY_BAND):
+        self.horizon_s = horizon_s
+        self.collision_radius_m = collision_radius_m
+        self.proximity_radius_m = proximity_radius_m
+        self.danger_threshold = danger_threshold
+        self.ambiguity_band = ambiguity_band
+
+
+    def pairwise(self,
+                 ego_positions: np.ndarray,
+                 ego_velocities: np.ndarray,
+                 batch: FrameBatch) -> Dict[str, np.ndarray]:
+        """
+        Computes the risk terms for every ego/object pair.
+
+        Args:
+            ego_positions: (E, 2) ego x/y positions.
+            ego_velocities: (E, 2) ego x/y velocities.
+            batch: The N detected objects.
+
+        Returns:
+            Dict of (E, N) arrays: distance_m, relative_speed_mps,
+            time_to_closest_s, closest_approach_m, ttc_s (inf if no
+            collision course) and risk_score. Pairs with missing object
+            kinematics are NaN.
+        """
+        # Relative position / velocity of each object w.r.t. each ego: (E, N, 2).
+        p = batch.positions()[None, :, :] - ego_positions[:, None, :]
+        v = batch.velocities()[None, :, :] - ego_velocities[:, None, :]
+
+        pp = np.einsum("enk,enk->en", p, p)
+        pv = np.einsum("enk,enk->en", p, v)
+        vv = np.einsum("enk,enk->en", v, v)
+
+        distance = np.sqrt(pp)
+        relative_speed = np.sqrt(vv)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Closest approach within the horizon, moving at constant velocity.
+            t_closest = np.where(vv > 0, -pv / vv, 0.0)
+            t_closest = np.clip(t_closest, 0.0, self.horizon_s)
+            closest = np.linalg.norm(p + v * t_closest[..., None], axis=-1)
+
+            # TTC: first t >= 0 with |p + v t| = R.
+            c = pp - self.collision_radius_m ** 2
+            disc = pv * pv - vv * c
+            t_hit = (-pv - np.sqrt(np.maximum(disc, 0.0))) / vv
+            ttc = np.where((vv > 0) & (disc >= 0) & (t_hit >= 0), t_hit, np.inf)
+            ttc = np.where(c <= 0, 0.0, ttc)
+
+        ttc_term = np.clip(1.0 - ttc / self.horizon_s, 0.0, 1.0)
+        proximity_term = np.clip(1.0 - closest / self.proximity_radius_m, 0.0, 1.0)
+        vulnerability = VULNERABILITY_WEIGHTS[batch.objects["class_code"]][None, :]
+        risk = vulnerability * (TTC_WEIGHT * ttc_term + (1.0 - TTC_WEIGHT) * proximity_term)
+
+        missing = np.isnan(pp) | np.isnan(vv)
+        ttc = np.where(missing, np.nan, ttc)
+        risk = np.where(missing, np.nan, risk)
+
+        return {
+            "distance_m": distance,
+            "relative_speed_mps": relative_speed,
+            "time_to_closest_s": t_closest,
+            "closest_approach_m": closest,
+            "ttc_s": ttc,
+            "risk_score": risk,
+        }
+
+
+    def assess(self,
+               ego_data: Dict[str, float],
+               lidar_objects: Union[List[Dict[str, Any]], FrameBatch]) -> Dict[str, Any]:
+        """
+        Ranks the objects around one ego vehicle.
+
+        Returns:
+            {
+                "ranked_objects": dangerous objects, highest risk first, each
+                    the scene object plus its risk terms,
+                "analysis_timestamp": <microseconds>,
+                "ambiguous": True if the LLM should decide this scene,
+                "source": "risk_engine"
+            }
+        """
+        batch = lidar_objects if isinstance(lidar_objects, FrameBatch) \
+            else FrameBatch.from_scene_objects(lidar_objects)
+        scene_objects = batch.to_scene_objects()
+
+        ego_position, ego_velocity = ego_kinematics(ego_data)
+        terms = self.pairwise(ego_position[None, :], ego_velocity[None, :], batch)
+        terms = {name: values[0] for name, values in terms.items()}
+        risk = terms["risk_score"]
+
+        low, high = self.ambiguity_band
+        missing = np.isnan(risk)
+        in_band = (risk >= low) & (risk < high)
+        ambiguous = bool(np.any(missing) or np.any(in_band))
+
+        dangerous = np.flatnonzero(np.nan_to_num(risk, nan=-1.0) >= self.danger_threshold)
+        dangerous = dangerous[np.argsort(-risk[dangerous], kind="stable")]
+
+        ranked_objects = []
+        for index in dangerous.tolist():
+            ttc = float(terms["ttc_s"][index])
+            ranked = dict(scene_objects[index])
+            ranked.update({
+                "risk_score": round(float(risk[index]), 3),
+                "ttc_s": round(ttc, 2) if np.isfinite(ttc) else None,
+                "distance_m": round(float(terms["distance_m"][index]), 2),
+                "relative_speed_mps": round(float(terms["relative_speed_mps"][index]), 2),
+                "closest_approach_m": round(float(terms["closest_approach_m"][index]), 2),
+                "time_to_closest_s": round(float(terms["time_to_closest_s"][index]), 2),
+            })
+            ranked_objects.append(ranked)
+
+        logger.debug(f"Risk engine: {len(batch)} objects, {len(ranked_objects)} dangerous, ambiguous={ambiguous}")
+        return {
+            "ranked_objects": ranked_objects,
+            "analysis_timestamp": int(time.time() * 1e6),
+            "ambiguous": ambiguous,
+            "source": "risk_engine"
+        }
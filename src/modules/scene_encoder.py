@@ -0,0 +1,127 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-30
+
+"""
+scene_encoder.py
+
+Compact serialization of a scene for the LLM prompt. Instead of indented
+JSON (whitespace and repeated keys for every object), objects are written
+as a CSV table with a fixed column order and rounded numbers, limited to
+the fields the ranking needs. A hard token budget keeps the objects with
+the highest RiskEngine pre-score (TTC / proximity / vulnerability, then
+distance) when a scene is too large.
+"""
+
+import json
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from modules.risk_engine import RiskEngine, ego_kinematics
+from utils.frame_batch import FrameBatch
+
+# Token budget for the whole scene block (ego data + object table).
+SCENE_TOKEN_BUDGET = 1024
+
+# Table columns, in order.
+COLUMNS = ("id", "type", "x_m", "y_m", "speed_mps", "heading_deg", "dist_m", "ttc_s")
+
+OBJECTS_HEADER = ("\n\nDetected Objects (CSV, positions in m, heading in degrees counter-clockwise "
+                  "from +x, dist_m / ttc_s to the EGO vehicle, '-' = none, highest priority first):\n")
+
+
+def approx_token_count(text: str) -> int:
+    """Rough token count (about 4 characters per token) when no tokenizer is available."""
+    return math.ceil(len(text) / 4)
+
+
+class SceneEncoding(NamedTuple):
+    text: str
+    tokens: int              # Tokens of text
+    verbose_tokens: int      # Tokens of the indented JSON it replaces, 0 if not measured
+    objects_kept: int
+    objects_total: int
+
+
+def _number(value: float, digits: int) -> str:
+    if value is None or not np.isfinite(value):
+        return "-"
+    return f"{value:.{digits}f}"
+
+
+class SceneEncoder:
+
+    def __init__(self,
+                 token_counter: Callable[[str], int] = approx_token_count,
+                 token_budget: int = SCENE_TOKEN_BUDGET,
+                 risk_engine: Optional[RiskEngine] = None,
+                 measure_savings: bool = False):
+        """
+        Args:
+            token_counter: Returns the number of tokens of a string, e.g. the
+              LLM tokenizer's encode length.
+            token_budget: Maximum tokens of the encoded scene.
+            risk_engine: Scores the objects for the budget cut.
+            measure_savings: Also count the tokens of the verbose JSON encoding;
+              off by default as it tokenizes the whole indented JSON.
+        """
+        self.token_counter = token_counter
+        self.token_budget = token_budget
+        self.risk_engine = risk_engine or RiskEngine()
+        self.measure_savings = measure_savings
+
+
+    def encode(self,
+               ego_data: Dict[str, float],
+               lidar_objects: Union[List[Dict[str, Any]], FrameBatch]) -> SceneEncoding:
+        """
+        Encodes the ego data and the objects that fit in the token budget.
+        """
+        if isinstance(lidar_objects, FrameBatch):
+            batch, lidar_objects = lidar_objects, lidar_objects.to_scene_objects()
+        else:
+            batch = FrameBatch.from_scene_objects(lidar_objects)
+
+        head = "\n\nEGO Vehicle Data:\n" + json.dumps(ego_data) + OBJECTS_HEADER + ",".join(COLUMNS) + "\n"
+        used = self.token_counter(head)
+        lines = []
+
+        if len(batch):
+            ego_position, ego_velocity = ego_kinematics(ego_data)
+            terms = self.risk_engine.pairwise(ego_position[None, :], ego_velocity[None, :], batch)
+            risk = np.nan_to_num(terms["risk_score"][0], nan=-1.0)
+            distance = np.nan_to_num(terms["distance_m"][0], nan=np.inf)
+            ttc = terms["ttc_s"][0]
+
+            for index in np.lexsort((distance, -risk)).tolist():
+                line = self._row(lidar_objects[index], distance[index], ttc[index]) + "\n"
+                cost = self.token_counter(line)
+                if used + cost > self.token_budget:
+                    break
+                lines.append(line)
+                used += cost
+
+        text = head + "".join(lines)
+        verbose_tokens = 0
+        if self.measure_savings:
+            verbose_tokens = self.token_counter(
+                "\n\nEGO Vehicle Data:\n" + json.dumps(ego_data, indent=2)
+                + "\n\nDetected Objects:\n" + json.dumps(lidar_objects, indent=2)
+            )
+        return SceneEncoding(text, self.token_counter(text), verbose_tokens, len(lines), len(batch))
+
+
+    @staticmethod
+    def _row(obj: Dict[str, Any], distance: float, ttc: float) -> str:
+        position = obj.get("position") or {}
+        return ",".join((
+            str(obj.get("id", "")).replace(",", " "),
+            str(obj.get("type", obj.get("classification", "UNKNOWN"))),
+            _number(position.get("x"), 1),
+            _number(position.get("y"), 1),
+            _number(obj.get("speed_mps"), 1),
+            _number(obj.get("heading_deg"), 0),
+            _number(distance, 1),
+            _number(ttc, 1),
+        ))
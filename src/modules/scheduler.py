@@ -0,0 +1,124 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-12
+
+"""
+scheduler.py
+
+Timing and hand-off primitives of the staged SHIELD-RSU pipeline:
+- PeriodicScheduler: fixed-rate loop on the monotonic clock. Deadlines are
+  multiples of the period from the start, so overruns do not accumulate
+  into drift. A late tick counts as a deadline miss, and ticks that passed
+  entirely during an overrun are skipped rather than run back to back.
+- LatestQueue: one-slot queue between stages. Putting into a full slot
+  replaces the waiting item, so a slow consumer always gets the newest
+  frame and stale ones are dropped.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from utils.logger import logger
+
+# Period of the ingest and broadcast stages (10 Hz).
+PERIOD_S = 0.1
+
+
+class PeriodicScheduler:
+    """
+    stats:
+        ticks               ticks run
+        deadline_misses     ticks that started after their deadline
+        skipped_ticks       ticks dropped because a whole period had passed
+        max_lateness_ms     largest start delay of a missed tick
+    """
+    def __init__(self,
+                 period_s: float = PERIOD_S,
+                 name: str = "loop",
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.period_s = period_s
+        self.name = name
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+        self.stats = {
+            'ticks': 0,
+            'deadline_misses': 0,
+            'skipped_ticks': 0,
+            'max_lateness_ms': 0.0
+        }
+
+
+    def wait(self) -> bool:
+        """
+        Sleeps until the next tick.
+
+        Returns:
+            False if the tick's deadline had already passed (a miss).
+        """
+        now = self.clock()
+        if self.deadline is None:
+            self.deadline = now
+
+        lateness = now - self.deadline
+        on_time = lateness <= 0
+        if on_time:
+            self.sleep(-lateness)
+        else:
+            skipped = int(lateness // self.period_s)
+            self.deadline += skipped * self.period_s  # The latest tick that has passed
+            self.stats['deadline_misses'] += 1
+            self.stats['skipped_ticks'] += skipped
+            self.stats['max_lateness_ms'] = max(self.stats['max_lateness_ms'], lateness * 1e3)
+            logger.debug(f"{self.name}: tick {lateness * 1e3:.1f} ms late, {skipped} skipped")
+
+        self.stats['ticks'] += 1
+        self.deadline += self.period_s
+        return on_time
+
+
+    def run(self, fn: Callable[[], Any], stop: threading.Event) -> None:
+        """
+        Calls fn once per tick until stop is set; errors are logged and the
+        loop goes on.
+        """
+        while not stop.is_set():
+            self.wait()
+            if stop.is_set():
+                break
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Error in {self.name}: {e}")
+
+
+class LatestQueue(queue.Queue):
+    """
+    Bounded queue whose put_latest() drops the oldest waiting item instead
+    of blocking. dropped counts those items.
+    """
+    def __init__(self, maxsize: int = 1):
+        super().__init__(maxsize=maxsize)
+        self.dropped = 0
+
+
+    def put_latest(self, item: Any) -> None:
+        with self.mutex:
+            if 0 < self.maxsize <= self._qsize():
+                self._get()  # Its place (and pending task) goes to the new item
+                self.dropped += 1
+            else:
+                self.unfinished_tasks += 1
+            self._put(item)
+            self.not_empty.notify()
+
+
+    def get_latest(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Waits up to timeout for an item; None if there is none."""
+        try:
+            return self.get(timeout=timeout) if timeout else self.get_nowait()
+        except queue.Empty:
+            return None
+
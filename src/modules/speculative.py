@@ -0,0 +1,240 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-09
+
+"""
+speculative.py
+
+Greedy speculative decoding for LLMInference. A small draft model of the
+same family (same tokenizer) proposes a few tokens, and the target model
+checks all of them in one forward pass. The longest prefix the target
+agrees with is kept, plus the target's own next token, so every round
+yields at least one token. The accepted tokens are always the target's
+greedy choices, so the output is the one of greedy decoding
+(do_sample=False). The only differences can come from floating-point
+rounding between one multi-token forward pass and several single-token
+passes.
+
+The target's repetition penalty (from its generation config) and the
+JSON answer constraint are applied at every verified position, as
+model.generate() applies them. Batches of one prompt only.
+"""
+
+import copy
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+try:
+    import torch
+    from transformers import DynamicCache, LogitsProcessorList, RepetitionPenaltyLogitsProcessor
+except ImportError:
+    torch = None  # Only used with the HF backends, see llm_backends.py
+
+from modules.json_constraint import JsonConstraint, JsonPrefixValidator
+from modules.llm_backends import HFBackend
+from utils.logger import logger
+
+# Draft model; None disables speculative decoding.
+DRAFT_MODEL_NAME = None  # e.g. "Qwen/Qwen2.5-0.5B-Instruct"
+
+# Tokens proposed by the draft model per round.
+NUM_DRAFT_TOKENS = 4
+
+
+class SpeculativeDecoder:
+    """
+    stats (over all generate calls):
+        rounds      draft/verify rounds
+        drafted     tokens proposed by the draft model
+        accepted    proposed tokens the target model agreed with
+    """
+    def __init__(self,
+                 draft_backend: HFBackend,
+                 num_draft_tokens: int = NUM_DRAFT_TOKENS):
+        """
+        Args:
+            draft_backend: Lazily loaded draft model; it must share the
+              target's tokenizer.
+            num_draft_tokens: Tokens proposed per round.
+        """
+        self.draft_backend = draft_backend
+        self.num_draft_tokens = num_draft_tokens
+        self.prefix_ids = None
+        self.prefix_cache = None
+        self.stats = {
+            'rounds': 0,
+            'drafted': 0,
+            'accepted': 0
+        }
+
+
+    def cache_prefix(self, prefix_ids: "torch.Tensor") -> None:
+        """Runs the prompt template through the draft model once, see LLMInference._build_prefix_cache()."""
+        self.prefix_ids = prefix_ids
+        self.prefix_cache = DynamicCache()
+        self._forward(self.draft_backend.model, self.prefix_cache, prefix_ids)
+
+
+    def acceptance_rate(self) -> float:
+        return self.stats['accepted'] / self.stats['drafted'] if self.stats['drafted'] else 0.0
+
+
+    def generate(self,
+                 target,
+                 input_ids: "torch.Tensor",
+                 past_key_values: Optional["DynamicCache"],
+                 max_new_tokens: int,
+                 eos_token_id: int,
+                 constraint: Optional[JsonConstraint] = None) -> Tuple["torch.Tensor", Dict[str, Any]]:
+        """
+        Greedy generation for one prompt.
+
+        Args:
+            target: The HF model whose output is produced.
+            input_ids: (1, n) prompt token ids.
+            past_key_values: Target KV cache of a prefix of the prompt, or None.
+            max_new_tokens: Generation budget.
+            eos_token_id: Ends generation when produced, as do the
+              eos tokens of the target's generation config.
+            constraint: JSON answer constraint of the call, or None.
+
+        Return:
+            (output_ids, run) with the (1, n + new) token ids and the
+            rounds/drafted/accepted counts and prefill time of this call.
+        """
+        draft = self.draft_backend.model
+        processors = self._processors(target)
+        stop_ids = self._stop_ids(target, eos_token_id)
+        validator = constraint.validators[0] if constraint is not None else None
+        run = {'rounds': 0, 'drafted': 0, 'accepted': 0}
+
+        # Both caches hold every token but the last one, which the next round feeds.
+        start = time.perf_counter()
+        target_cache = past_key_values if past_key_values is not None else DynamicCache()
+        self._forward(target, target_cache, input_ids[:, target_cache.get_seq_length():-1])
+        draft_cache = self._draft_cache(input_ids)
+        self._forward(draft, draft_cache, input_ids[:, draft_cache.get_seq_length():-1])
+        run['prefill_s'] = time.perf_counter() - start
+
+        sequence = input_ids
+        prompt_length = input_ids.shape[1]
+        done = False
+        while not done and sequence.shape[1] - prompt_length < max_new_tokens:
+            remaining = max_new_tokens - (sequence.shape[1] - prompt_length)
+
+            # Draft: propose up to k tokens, leaving room for the target's own token.
+            drafted = []
+            draft_ids = sequence
+            draft_validator = validator.copy() if validator is not None else None
+            feed = sequence[:, draft_cache.get_seq_length():]
+            for _ in range(min(self.num_draft_tokens, remaining - 1)):
+                logits = self._forward(draft, draft_cache, feed)
+                token = self._choose(processors(draft_ids, logits[:, -1, :].float()), draft_validator, constraint,
+                                     verify=False)
+                drafted.append(token)
+                feed = sequence.new_tensor([[token]])
+                draft_ids = torch.cat([draft_ids, feed], dim=1)
+                if self._ends(token, draft_validator, constraint, stop_ids):
+                    break
+
+            # Verify: the target's choice after the last token and after every proposal.
+            logits = self._forward(target, target_cache,
+                                   torch.cat([sequence[:, -1:], sequence.new_tensor([drafted])], dim=1))
+            old_length = sequence.shape[1]
+            matched = 0
+            for position in range(len(drafted) + 1):
+                scores = processors(sequence, logits[:, position, :].float())
+                token = self._choose(scores, validator, constraint)
+                sequence = torch.cat([sequence, sequence.new_tensor([[token]])], dim=1)
+                done = (self._ends(token, validator, constraint, stop_ids)
+                        or sequence.shape[1] - prompt_length >= max_new_tokens)
+                if position == len(drafted) or token != drafted[position]:
+                    break
+                matched += 1
+                if done:
+                    break
+
+            # Drop the cache entries of rejected proposals.
+            target_cache.crop(sequence.shape[1] - 1)
+            draft_cache.crop(min(draft_cache.get_seq_length(), old_length + matched))
+
+            run['rounds'] += 1
+            run['drafted'] += len(drafted)
+            run['accepted'] += matched
+
+        for key in ('rounds', 'drafted', 'accepted'):
+            self.stats[key] += run[key]
+        logger.debug(f"Speculative decoding: {run}")
+        return sequence, run
+
+
+    def _draft_cache(self, input_ids: "torch.Tensor") -> "DynamicCache":
+        """Copy of the draft's template cache if the prompt starts with the template."""
+        if self.prefix_cache is not None:
+            length = self.prefix_ids.shape[1]
+            if input_ids.shape[1] > length and torch.equal(input_ids[0, :length], self.prefix_ids[0]):
+                return copy.deepcopy(self.prefix_cache)
+        return DynamicCache()
+
+
+    @staticmethod
+    def _processors(target) -> "LogitsProcessorList":
+        """The score processors model.generate() applies in greedy mode for this model."""
+        processors = LogitsProcessorList()
+        penalty = getattr(target.generation_config, "repetition_penalty", None)
+        if penalty is not None and penalty != 1.0:
+            processors.append(RepetitionPenaltyLogitsProcessor(penalty))
+        return processors
+
+
+    @staticmethod
+    def _stop_ids(target, eos_token_id: int) -> Set[int]:
+        """Tokens that end model.generate() for this model."""
+        configured = getattr(target.generation_config, "eos_token_id", None)
+        if configured is None:
+            configured = []
+        elif isinstance(configured, int):
+            configured = [configured]
+        return {eos_token_id, *configured}
+
+
+    @staticmethod
+    def _forward(model, cache: "DynamicCache", input_ids: "torch.Tensor") -> Optional["torch.Tensor"]:
+        """Appends input_ids to the cache; returns their logits."""
+        if input_ids.shape[1] == 0:
+            return None
+        with torch.no_grad():
+            return model(input_ids=input_ids, past_key_values=cache, use_cache=True).logits
+
+
+    @staticmethod
+    def _choose(scores: "torch.Tensor",
+                validator: Optional[JsonPrefixValidator],
+                constraint: Optional[JsonConstraint],
+                verify: bool = True) -> int:
+        """
+        Greedy token, restricted to the answer schema like JsonLogitsProcessor.
+        Only target (verify) steps count towards constraint.unconstrained_steps.
+        """
+        if constraint is None:
+            return int(scores[0].argmax())
+        if validator.complete:
+            return constraint.eos_token_id
+        token = None if validator.failed else constraint.best_valid_token(validator, scores[0])
+        if token is None:
+            if verify:
+                constraint.unconstrained_steps += 1
+            return int(scores[0].argmax())
+        return token
+
+
+    @staticmethod
+    def _ends(token: int,
+              validator: Optional[JsonPrefixValidator],
+              constraint: Optional[JsonConstraint],
+              stop_ids: Set[int]) -> bool:
+        """Feeds the token to the validator; True if generation stops after it."""
+        if validator is not None and not validator.complete and not validator.failed:
+            validator.feed_text(constraint.token_text(token))
+            if validator.complete:
+                return True
+        return token in stop_ids
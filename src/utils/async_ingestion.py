@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-10
+
+"""
+asyncio ingestion service for several Gemini Detect / RSU object_list streams.
+
+Every sensor endpoint gets its own receive task on a shared event loop and its
+own pipeline (VruDetector + LidarBuffer) running on a dedicated worker thread.
+The two are decoupled by a small bounded queue that drops the oldest frame
+when the pipeline falls behind, so a slow or stalled sensor never holds up
+the others. Lost connections are retried with exponential backoff.
+"""
+
+import asyncio
+import random
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence
+
+from batch_writer import shared_writer
+from bev_renderer import BevRenderer
+from data_collector import (
+    HOST, PORT, CAPTURE_AREA, MAX_BUFFER_SIZE, MIN_VIDEO_DURATION, NO_VRU_THRESHOLD, PRE_EVENT_FRAMES,
+    SESSION_CODEC, VIDEO_AUDIT, VIDEO_SOURCE, parse_frame, print_session_statistics
+)
+from fp_filter import FalsePositiveFilter
+from frame_reader import ENDIAN_TYPE, FRAME_SIZE_B
+from frame_ring import FrameRing
+from instrumentation import timer
+from lidar_buffer import LidarBuffer
+from segment_recorder import shared_recorder
+from vru_detector import VRU_CLASSIFICATIONS, VruDetector
+from vru_tracker import VruTracker
+from zone_map import load_zone_map
+
+# Sensors to subscribe to. Add one entry per Gemini Detect unit / RSU.
+SENSOR_ENDPOINTS = [
+    ("gemini-0", HOST, PORT),
+]
+
+# Frames buffered per sensor between the receive task and its pipeline.
+QUEUE_SIZE = 8
+
+# Reconnect backoff in seconds.
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+
+# A connection with no data (not even heartbeats) for this long is reset.
+READ_TIMEOUT = 10.0
+
+
+class SensorEndpoint(NamedTuple):
+    name: str
+    host: str
+    port: int
+
+
+def default_detector_factory(pipeline: "SensorPipeline") -> VruDetector:
+    """
+    Builds a VruDetector/LidarBuffer pair configured like data_collector.main(),
+    sharing the pipeline's counters, false-positive filter, tracker, zones,
+    pre-event ring, batch writer and video renderer or screen recorder.
+    """
+    lidar_buffer = LidarBuffer(
+        max_frames=MAX_BUFFER_SIZE,
+        min_video_duration=MIN_VIDEO_DURATION,
+        capture_area=CAPTURE_AREA,
+        session_counters=pipeline.session_counters,
+        session_codec=SESSION_CODEC,
+        batch_writer=pipeline.batch_writer,
+        recorder=pipeline.recorder,
+        renderer=pipeline.renderer,
+        audit_video=VIDEO_AUDIT
+    )
+    return VruDetector(lidar_buffer, NO_VRU_THRESHOLD, pipeline.screen_counters,
+                       pipeline.fp_filter, pipeline.tracker, pipeline.zone_map, pipeline.pre_event)
+
+
+class SensorPipeline:
+    """
+    Session loop for a single sensor, equivalent to the body of
+    data_collector.main(): frames go to the current VruDetector, and when it
+    reports the session complete the counters are updated and a fresh
+    detector/buffer pair is created.
+    """
+    def __init__(self, sensor_name: str,
+                 detector_factory: Callable[["SensorPipeline"], VruDetector] = default_detector_factory):
+        self.sensor_name = sensor_name
+        self.detector_factory = detector_factory
+        self.session_counters = {
+            'total_sessions': 0,
+            'valid_sessions': 0,
+            'current_session_valid': False
+        }
+        self.screen_counters = {
+            'frames_screened': 0,
+            'full_decodes_avoided': 0
+        }
+        self.fp_filter = FalsePositiveFilter()
+        self.tracker = VruTracker(VRU_CLASSIFICATIONS)
+        self.zone_map = load_zone_map()
+        self.pre_event = FrameRing(PRE_EVENT_FRAMES)
+        self.batch_writer = shared_writer()  # One writer thread for all sensors
+        # Videos drawn from this sensor's frames, or cut from one screen capture for all sensors
+        self.renderer = BevRenderer(self.zone_map) if VIDEO_SOURCE == "bev" else None
+        self.recorder = shared_recorder(CAPTURE_AREA) if self.renderer is None else None
+        self.vru_detector = self.detector_factory(self)
+        self.frames_processed = 0
+
+
+    def process_payload(self, payload: Any) -> None:
+        """
+        Decodes one payload and feeds it to the current detector.
+        """
+        with timer("prescreen"):
+            keep = self.vru_detector.should_decode(payload)
+        if not keep:
+            return
+
+        with timer("frame_decode"):
+            data = parse_frame(payload)
+        if data is None:
+            return
+
+        self.frames_processed += 1
+        with timer("vru_detect"):
+            finished = self.vru_detector.handle_frame(data)
+        if finished:
+            self._finish_session()
+
+
+    def _finish_session(self) -> None:
+        self.session_counters['total_sessions'] += 1
+        if self.session_counters['current_session_valid']:
+            self.session_counters['valid_sessions'] += 1
+
+        print(f"[{self.sensor_name}] session finished.")
+        print_session_statistics(self.session_counters, self.screen_counters, self.fp_filter, self.tracker,
+                                 self.batch_writer)
+        self.vru_detector = self.detector_factory(self)
+
+
+class AsyncIngestionService:
+    """
+    Subscribes to N sensor endpoints at once and routes each stream to its
+    own SensorPipeline.
+
+    Per-sensor counters are kept in self.stats[name]:
+        frames_received, frames_dropped, frames_processed, connects, connected.
+    """
+    def __init__(self,
+                 endpoints: Sequence[SensorEndpoint],
+                 pipeline_factory: Callable[[str], Any] = SensorPipeline,
+                 ssl_context: Optional[ssl.SSLContext] = None,
+                 use_tls: bool = True,
+                 queue_size: int = QUEUE_SIZE,
+                 backoff_initial: float = BACKOFF_INITIAL,
+                 backoff_max: float = BACKOFF_MAX,
+                 read_timeout: float = READ_TIMEOUT):
+        """
+        Args:
+            endpoints: Sensors to subscribe to.
+            pipeline_factory: Called with the sensor name; the result must
+              provide process_payload(payload).
+            ssl_context: Client TLS context. Defaults to an unverified
+              TLS 1.2 context, matching data_collector.main().
+            use_tls: Connect with plain TCP when False.
+            queue_size: Frames buffered per sensor before the oldest is dropped.
+            backoff_initial: First reconnect delay in seconds.
+            backoff_max: Upper bound for the reconnect delay in seconds.
+            read_timeout: Seconds without any data before reconnecting.
+        """
+        self.endpoints = list(endpoints)
+        self.pipeline_factory = pipeline_factory
+        if use_tls and ssl_context is None:
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
+            ssl_context.verify_mode = ssl.CERT_NONE
+        self.ssl_context = ssl_context if use_tls else None
+        self.queue_size = queue_size
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.read_timeout = read_timeout
+
+        self.pipelines: Dict[str, Any] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._stop_event = None
+
+
+    async def run(self) -> None:
+        """
+        Runs until stop() is called (or the task is cancelled); then saves
+        the pipelines' queued batches and stops their screen recorder.
+        """
+        self._stop_event = asyncio.Event()
+        tasks = []
+        executors = []
+
+        for endpoint in self.endpoints:
+            self.pipelines[endpoint.name] = self.pipeline_factory(endpoint.name)
+            self.stats[endpoint.name] = {
+                'frames_received': 0,
+                'frames_dropped': 0,
+                'frames_processed': 0,
+                'connects': 0,
+                'connected': False
+            }
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pipeline-{endpoint.name}")
+            executors.append(executor)
+            tasks.append(asyncio.create_task(self._receive(endpoint, queue)))
+            tasks.append(asyncio.create_task(self._consume(endpoint, queue, executor)))
+
+        try:
+            await self._stop_event.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for executor in executors:
+                executor.shutdown(wait=True)
+            # Save the queued batches (the writer is a daemon thread), then stop
+            # the screen capture with the service, not with the process. The
+            # pipelines share both, so each is closed once.
+            writers = {id(w): w for w in (getattr(p, "batch_writer", None) for p in self.pipelines.values()) if w}
+            for batch_writer in writers.values():
+                batch_writer.close()
+            for pipeline in self.pipelines.values():
+                recorder = getattr(pipeline, "recorder", None)
+                if recorder is not None:
+                    recorder.stop()
+
+
+    def stop(self) -> None:
+        """
+        Requests the service to stop. Must be called from the event loop thread.
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+
+    async def _receive(self, endpoint: SensorEndpoint, queue: asyncio.Queue) -> None:
+        """
+        Keeps a connection to one sensor open and pushes raw payloads into
+        its queue, reconnecting with exponential backoff.
+        """
+        stats = self.stats[endpoint.name]
+        attempt = 0
+
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(
+                    endpoint.host, endpoint.port, ssl=self.ssl_context
+                )
+                stats['connects'] += 1
+                stats['connected'] = True
+                print(f"[{endpoint.name}] connected to {(endpoint.host, endpoint.port)}.")
+
+                while True:
+                    with timer("frame_receive"):
+                        header = await asyncio.wait_for(reader.readexactly(FRAME_SIZE_B), self.read_timeout)
+                        frame_size = int.from_bytes(header, ENDIAN_TYPE)
+                        payload = await asyncio.wait_for(reader.readexactly(frame_size), self.read_timeout)
+                    stats['frames_received'] += 1
+                    attempt = 0
+
+                    if queue.full():
+                        # Never wait on a slow pipeline: drop its oldest frame.
+                        queue.get_nowait()
+                        stats['frames_dropped'] += 1
+                    queue.put_nowait(payload)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ssl.SSLError) as e:
+                print(f"[{endpoint.name}] connection lost: {e!r}")
+            finally:
+                stats['connected'] = False
+                if writer is not None:
+                    writer.close()
+
+            delay = min(self.backoff_max, self.backoff_initial * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)
+            attempt += 1
+            print(f"[{endpoint.name}] reconnecting in {delay:.1f} s...")
+            await asyncio.sleep(delay)
+
+
+    async def _consume(self, endpoint: SensorEndpoint, queue: asyncio.Queue,
+                       executor: ThreadPoolExecutor) -> None:
+        """
+        Hands queued payloads to the sensor's pipeline on its worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        pipeline = self.pipelines[endpoint.name]
+        stats = self.stats[endpoint.name]
+
+        while True:
+            payload = await queue.get()
+            try:
+                await loop.run_in_executor(executor, pipeline.process_payload, payload)
+            except Exception as e:
+                print(f"[{endpoint.name}] pipeline error: {e!r}")
+            stats['frames_processed'] += 1
+
+
+def main():
+    endpoints = [SensorEndpoint(*endpoint) for endpoint in SENSOR_ENDPOINTS]
+    print(f"Subscribing to {len(endpoints)} sensor(s): {[e.name for e in endpoints]}")
+    asyncio.run(AsyncIngestionService(endpoints).run())
+
+
+if __name__ == "__main__":
+    main()
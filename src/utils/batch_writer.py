@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-23
+
+"""
+Long-lived background writer for LidarBuffer batches.
+
+One daemon thread takes save jobs from a bounded queue, so a batch rollover
+on the ingest thread only costs a queue put instead of spawning a thread.
+When the disk falls behind and the queue is full, submit() blocks until a
+slot frees up (backpressure) rather than letting unsaved batches pile up
+in memory; how often and how long that happens is counted in stats and
+recorded as the "batch_submit_wait" stage.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from instrumentation import record
+
+# Batches waiting to be saved before submit() blocks.
+MAX_PENDING_BATCHES = 4
+
+
+class BatchWriter:
+    """
+    stats:
+        batches_submitted   jobs submitted
+        batches_saved       jobs finished
+        batches_failed      jobs that raised
+        submits_blocked     submits that waited for a free queue slot
+        max_wait_ms         longest such wait
+        max_queue_depth     most jobs waiting at once
+    """
+    def __init__(self, max_pending: int = MAX_PENDING_BATCHES, name: str = "batch-writer"):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.stats: Dict[str, Any] = {
+            'batches_submitted': 0,
+            'batches_saved': 0,
+            'batches_failed': 0,
+            'submits_blocked': 0,
+            'max_wait_ms': 0.0,
+            'max_queue_depth': 0
+        }
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """
+        Queues fn(*args) for the writer thread, waiting for a free slot if
+        max_pending jobs are already queued.
+
+        Return:
+            Future of fn's result.
+        """
+        future = Future()
+        job = (future, fn, args)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(job)
+            wait_s = time.perf_counter() - start
+            self.stats['submits_blocked'] += 1
+            self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], wait_s * 1e3)
+            record("batch_submit_wait", wait_s)
+
+        self.stats['batches_submitted'] += 1
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._queue.qsize())
+        return future
+
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            future, fn, args = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                    self.stats['batches_saved'] += 1
+                except Exception as e:
+                    print(f"Error saving batch: {e}")
+                    future.set_exception(e)
+                    self.stats['batches_failed'] += 1
+            self._queue.task_done()
+
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or being saved."""
+        return self._queue.unfinished_tasks
+
+
+    def flush(self) -> None:
+        """Waits until every submitted job has finished."""
+        self._queue.join()
+
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Finishes the queued jobs and stops the writer thread."""
+        if self.pending:
+            print(f"Saving {self.pending} queued batches before exit...")
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+    def summary(self) -> str:
+        """
+        Returns the counters as a printable string.
+        """
+        s = self.stats
+        return (f"  Batches Saved: {s['batches_saved']}/{s['batches_submitted']} "
+                f"({s['batches_failed']} failed), Blocked Submits: {s['submits_blocked']} "
+                f"(max {s['max_wait_ms']:.1f} ms), Max Queue Depth: {s['max_queue_depth']}")
+
+
+_shared_writer = None
+_shared_lock = threading.Lock()
+
+
+def shared_writer() -> BatchWriter:
+    """
+    Returns the process-wide writer, started on first use.
+    """
+    global _shared_writer
+    with _shared_lock:
+        if _shared_writer is None:
+            _shared_writer = BatchWriter()
+        return _shared_writer
@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-28
+
+"""
+Headless bird's-eye-view rendering of LiDAR object lists.
+
+Instead of screen-grabbing the vendor viewer (which needs a live X display
+and a 30 fps full-screen encode), batch videos can be drawn straight from
+the buffered frames: every object is a box of its dimensions rotated to its
+heading, with a heading tick and a "<CLASS> <id>" label, on top of the zone
+polygons and 10 m range rings. Only NumPy and Pillow are used, so it runs
+on a server without a display.
+
+The static layer (background, rings, zones) is drawn once per renderer and
+copied for each frame; the box corners of a frame are computed in one
+vectorized step, and each label is rasterised once and then pasted. write_video() pipes the raw RGB frames into ffmpeg's stdin
+(libx264). Each frame is held until the next one's timestamp, so the video
+plays in real time even when the sensor skipped frames. Without ffmpeg, the
+frames are saved as a PNG sequence (one image per sensor frame) in a
+directory named like the video without its extension.
+
+The ffmpeg binary is the ffmpeg argument, else $SHIELD_RSU_FFMPEG, else
+"ffmpeg" on the PATH. Run from the src directory to render a recording:
+
+    python utils/bev_renderer.py ../data/object_lists/1234.frames 1234.mp4
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from segment_recorder import FFMPEG_ENV
+
+# Sensor frame rate; also the video frame rate.
+FRAMERATE = 10
+
+# Image size in pixels (width, height); both must be even for yuv420p.
+IMAGE_SIZE = (1280, 720)
+
+# Metres from the sensor to the nearest image edge.
+RANGE_M = 45.0
+
+# Spacing of the range rings in metres.
+RING_SPACING_M = 10.0
+
+# A gap between two frame timestamps is held for at most this many seconds.
+MAX_HOLD_S = 1.0
+
+# Box size for objects without dimensions, in metres.
+DEFAULT_SIZE_M = 0.6
+
+BACKGROUND = (18, 18, 24)
+RING_COLOUR = (60, 60, 72)
+
+CLASS_COLOURS = {
+    "PERSON": (255, 80, 80),
+    "BICYCLE": (255, 170, 40),
+    "VEHICLE": (80, 160, 255),
+    "LARGE_VEHICLE": (150, 110, 255),
+    "UNKNOWN": (170, 170, 170)
+}
+
+ZONE_COLOURS = {
+    "crosswalk": (250, 250, 250),
+    "sidewalk": (120, 200, 120),
+    "approach_lane": (200, 200, 90)
+}
+
+# Opacity of the zone fill (0-255).
+ZONE_ALPHA = 40
+
+# Label images kept for reuse; object ids persist across frames.
+LABEL_CACHE_SIZE = 1024
+
+# Unit box corners (front-left, front-right, rear-right, rear-left).
+_UNIT_BOX = np.array([[0.5, 0.5], [0.5, -0.5], [-0.5, -0.5], [-0.5, 0.5]])
+
+
+def _object_arrays(objects: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (N, 2) positions, (N, 2) length/width and (N,) heading in radians.
+    """
+    positions = np.zeros((len(objects), 2))
+    sizes = np.full((len(objects), 2), DEFAULT_SIZE_M)
+    headings = np.zeros(len(objects))
+    for row, obj in enumerate(objects):
+        position = obj.get("position") or {}
+        positions[row] = position.get("x", 0.0), position.get("y", 0.0)
+        dimensions = obj.get("dimensions") or {}
+        sizes[row] = (dimensions.get("length") or DEFAULT_SIZE_M, dimensions.get("width") or DEFAULT_SIZE_M)
+        headings[row] = obj.get("heading") or 0.0
+    return positions, sizes, np.radians(headings)
+
+
+def hold_counts(frames: Sequence[Dict[str, Any]], fps: int = FRAMERATE) -> List[int]:
+    """
+    Number of video frames each sensor frame is shown for: the gap to the
+    next frame's timestamp (microseconds) at fps, at least 1 and at most
+    MAX_HOLD_S. Frames without a timestamp, and the last frame, are shown once.
+    """
+    counts = []
+    for frame, following in zip(frames, list(frames[1:]) + [None]):
+        count = 1
+        if following is not None and None not in (frame.get("timestamp"), following.get("timestamp")):
+            gap_s = (following["timestamp"] - frame["timestamp"]) / 1e6
+            count = int(min(max(round(gap_s * fps), 1), MAX_HOLD_S * fps))
+        counts.append(count)
+    return counts
+
+
+class BevRenderer:
+    """
+    stats:
+        frames_rendered     sensor frames drawn
+        videos_written      batches encoded by ffmpeg
+        sequences_written   batches saved as PNG sequences
+        render_ms           total time spent drawing
+    """
+    def __init__(self,
+                 zone_map: Any = None,
+                 size: Tuple[int, int] = IMAGE_SIZE,
+                 range_m: float = RANGE_M,
+                 fps: int = FRAMERATE,
+                 ffmpeg: Optional[str] = None):
+        """
+        Args:
+            zone_map: ZoneMap whose zones are drawn under the objects, or None.
+            size: (width, height) of the image, rounded down to even numbers.
+            range_m: Metres from the sensor (image centre) to the nearest edge.
+            fps: Video frame rate.
+            ffmpeg: ffmpeg binary, defaults to $SHIELD_RSU_FFMPEG or "ffmpeg".
+        """
+        self.size = (size[0] - size[0] % 2, size[1] - size[1] % 2)
+        self.zone_map = zone_map
+        self.fps = fps
+        self.ffmpeg = ffmpeg or os.environ.get(FFMPEG_ENV, "ffmpeg")
+        self.px_per_m = min(self.size) / (2 * range_m)
+        self.centre = np.array([self.size[0] / 2, self.size[1] / 2])
+        self.font = ImageFont.load_default()
+        self._labels: Dict[str, Image.Image] = {}
+        self.stats = {
+            'frames_rendered': 0,
+            'videos_written': 0,
+            'sequences_written': 0,
+            'render_ms': 0.0
+        }
+        self._background = self._draw_background()
+
+
+    @property
+    def has_ffmpeg(self) -> bool:
+        return shutil.which(self.ffmpeg) is not None
+
+
+    def to_pixels(self, points: np.ndarray) -> np.ndarray:
+        """
+        Maps (..., 2) x/y metres (x right, y up) to pixel coordinates.
+        """
+        pixels = np.asarray(points, dtype=np.float64) * self.px_per_m
+        pixels[..., 1] *= -1
+        return pixels + self.centre
+
+
+    def _draw_background(self) -> Image.Image:
+        image = Image.new("RGB", self.size, BACKGROUND)
+        if self.zone_map is not None:
+            overlay = Image.new("RGBA", self.size, (0, 0, 0, 0))
+            draw = ImageDraw.Draw(overlay)
+            for zone in self.zone_map.zones:
+                colour = ZONE_COLOURS.get(zone.kind, RING_COLOUR)
+                polygon = [tuple(p) for p in self.to_pixels(zone.polygon)]
+                draw.polygon(polygon, fill=colour + (ZONE_ALPHA,), outline=colour + (160,))
+            image.paste(overlay, (0, 0), overlay)
+
+        draw = ImageDraw.Draw(image)
+        cx, cy = self.centre
+        max_radius = np.hypot(*self.size) / 2
+        radius_m = RING_SPACING_M
+        while radius_m * self.px_per_m < max_radius:
+            r = radius_m * self.px_per_m
+            draw.ellipse((cx - r, cy - r, cx + r, cy + r), outline=RING_COLOUR)
+            draw.text((cx + r + 2, cy + 2), f"{radius_m:.0f} m", fill=RING_COLOUR, font=self.font)
+            radius_m += RING_SPACING_M
+        draw.line((cx - 6, cy, cx + 6, cy), fill=RING_COLOUR)
+        draw.line((cx, cy - 6, cx, cy + 6), fill=RING_COLOUR)
+        return image
+
+
+    def _label(self, text: str) -> Image.Image:
+        """Greyscale mask of text, drawn once and cached (glyph rendering dominates otherwise)."""
+        mask = self._labels.get(text)
+        if mask is None:
+            if len(self._labels) >= LABEL_CACHE_SIZE:
+                self._labels.clear()
+            left, top, right, bottom = self.font.getbbox(text)
+            mask = Image.new("L", (max(right, 1), max(bottom, 1)))
+            ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=self.font)
+            self._labels[text] = mask
+        return mask
+
+
+    def render(self, frame: Dict[str, Any]) -> Image.Image:
+        """
+        Draws one object_list entry ({"frame_count", "timestamp", "objects"}).
+        """
+        start = time.perf_counter()
+        image = self._background.copy()
+        draw = ImageDraw.Draw(image)
+        objects = frame.get("objects") or []
+
+        if objects:
+            positions, sizes, headings = _object_arrays(objects)
+            cos, sin = np.cos(headings)[:, None], np.sin(headings)[:, None]
+            local = _UNIT_BOX[None] * sizes[:, None, :]                    # (N, 4, 2)
+            corners = np.stack([local[..., 0] * cos - local[..., 1] * sin,
+                                local[..., 0] * sin + local[..., 1] * cos], axis=-1)
+            corners = self.to_pixels(corners + positions[:, None, :])
+            centres = self.to_pixels(positions)
+            tips = self.to_pixels(positions + (sizes[:, :1] / 2 + 1.0) * np.hstack([cos, sin]))
+
+            for obj, box, centre, tip in zip(objects, corners.tolist(), centres.tolist(), tips.tolist()):
+                classification = obj.get("classification") or "UNKNOWN"
+                colour = CLASS_COLOURS.get(classification, CLASS_COLOURS["UNKNOWN"])
+                draw.polygon([tuple(p) for p in box], outline=colour, width=2)
+                draw.line(centre + tip, fill=colour, width=2)
+                image.paste(colour, (int(centre[0]) + 6, int(centre[1]) - 14),
+                            self._label(f"{classification} {obj.get('id', '')}"))
+
+        draw.text((8, 8), f"frame {frame.get('frame_count', '?')}  ts {frame.get('timestamp', '?')}  "
+                          f"objects {len(objects)}", fill=(230, 230, 230), font=self.font)
+        self.stats['frames_rendered'] += 1
+        self.stats['render_ms'] += (time.perf_counter() - start) * 1e3
+        return image
+
+
+    def render_array(self, frame: Dict[str, Any]) -> np.ndarray:
+        """(height, width, 3) uint8 RGB array of render(frame)."""
+        return np.asarray(self.render(frame))
+
+
+    def _encode_command(self, output_path: str) -> List[str]:
+        width, height = self.size
+        return [
+            self.ffmpeg, "-y", "-v", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}", "-framerate", str(self.fps), "-i", "-",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", output_path
+        ]
+
+
+    def write_video(self, frames: Sequence[Dict[str, Any]], output_path: str) -> Optional[str]:
+        """
+        Renders the frames into a video at output_path, or into a PNG
+        sequence if ffmpeg is not available.
+
+        Return:
+            Path of the video or of the PNG sequence directory, or None if
+            there are no frames or ffmpeg failed.
+        """
+        frames = [frame for frame in frames if isinstance(frame, dict)]
+        if not frames:
+            return None
+        if not self.has_ffmpeg:
+            return self._write_sequence(frames, os.path.splitext(output_path)[0])
+
+        try:
+            process = subprocess.Popen(self._encode_command(output_path), stdin=subprocess.PIPE,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            print(f"Error starting ffmpeg: {e}")
+            return None
+        try:
+            for frame, count in zip(frames, hold_counts(frames, self.fps)):
+                data = self.render(frame).tobytes()
+                for _ in range(count):
+                    process.stdin.write(data)
+            _, error = process.communicate()
+        except (BrokenPipeError, OSError) as e:
+            process.kill()
+            _, error = process.communicate()
+            error = error or str(e).encode()
+
+        if process.returncode != 0:
+            print(f"Error rendering video: {error.decode(errors='replace').strip()}")
+            return None
+        self.stats['videos_written'] += 1
+        return output_path
+
+
+    def _write_sequence(self, frames: Sequence[Dict[str, Any]], directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        for index, frame in enumerate(frames):
+            self.render(frame).save(os.path.join(directory, f"{index:06d}.png"), compress_level=1)
+        self.stats['sequences_written'] += 1
+        return directory
+
+
+    def summary(self) -> str:
+        """
+        Returns the counters as a printable string.
+        """
+        s = self.stats
+        per_frame = s['render_ms'] / s['frames_rendered'] if s['frames_rendered'] else 0.0
+        return (f"  Frames Rendered: {s['frames_rendered']} ({per_frame:.2f} ms/frame), "
+                f"Videos: {s['videos_written']}, PNG Sequences: {s['sequences_written']}")
+
+
+def main():
+    from replay_server import load_recording
+    from zone_map import load_zone_map
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="Session file, session folder or object_list JSON file.")
+    parser.add_argument("output", help="Output .mp4 path (a PNG directory without ffmpeg).")
+    parser.add_argument("--zones", help="Zone map JSON file, defaults to properties/zones.json if present.")
+    args = parser.parse_args()
+
+    frames = [entry for message in load_recording(args.recording) for entry in message["object_list"]]
+    renderer = BevRenderer(load_zone_map(args.zones) if args.zones else load_zone_map())
+    print(f"Wrote {renderer.write_video(frames, args.output)}")
+    print(renderer.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,35 @@
 # Author: Fengze Yang <fred.yang@utah.edu>
 # Date: 2025-03-30
 
-import json
 import socket
 import ssl
-import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from batch_writer import BatchWriter
+from bev_renderer import BevRenderer
+from frame_decoder import DECODE_ERRORS, JsonDecoder, get_decoder
+from frame_reader import FrameReader
+from frame_ring import FrameRing
+from fp_filter import FalsePositiveFilter
+from instrumentation import format_summary, summary, timer
 from lidar_buffer import LidarBuffer
-from vru_detector import VruDetector
+from segment_recorder import SegmentRecorder
+from vru_detector import VRU_CLASSIFICATIONS, VruDetector
+from vru_tracker import VruTracker
+from zone_map import load_zone_map
 
 # Configuration for the TCP stream (Ouster Gemini Detect)
 HOST = "10.206.12.168"
 PORT = 3302
-ENDIAN_TYPE = "big"
-FRAME_SIZE_B = 4
 ADDRESS = (HOST, PORT)
 
 # Capture area: (width, height, offset_x, offset_y)
 CAPTURE_AREA = (1280, 720, 350, 300)
 
+# Source of the batch videos: "bev" draws them from the frames (headless,
+# see bev_renderer.py), "screen" cuts them from an x11grab capture of
+# CAPTURE_AREA (needs the vendor viewer on a live X display).
+VIDEO_SOURCE = "bev"
+
 # Maximum number of frames to keep in the buffer.
 # AKA the video length (MAX_BUFFER_SIZE * 0.1 seconds).
 MAX_BUFFER_SIZE = 70
@@ -27,65 +38,101 @@ MAX_BUFFER_SIZE = 70
 # Minimum valid video duration in seconds.
 MIN_VIDEO_DURATION = 6
 
+# Also measure every batch video with ffprobe and report lengths that differ
+# from the duration computed from the frames (one extra process per batch).
+VIDEO_AUDIT = False
+
 # Number of consecutive frames without a VRU before finalizing the session.
 NO_VRU_THRESHOLD = 15
 
+# Seconds of frames before the first VRU detection saved with each session
+# (kept in a pre-event ring of PRE_EVENT_SECONDS * 10 frames at 10 Hz).
+PRE_EVENT_SECONDS = 3
+PRE_EVENT_FRAMES = PRE_EVENT_SECONDS * 10
+
+# Compression of the saved session files ("zstd", "lz4" or "none"); None
+# picks the preferred one installed. See session_store.py.
+SESSION_CODEC = None
+
+# JSON decoder backend ("orjson", "msgspec" or "json"); None picks the
+# preferred one installed.
+DECODER_BACKEND = None
+DECODER = get_decoder(DECODER_BACKEND)
 
-def recv(socket_client: ssl.SSLSocket, num_bytes: int) -> bytearray:
+
+def parse_frame(payload: Any, decoder: JsonDecoder = None) -> Optional[Dict[str, Any]]:
     """
-    Reads exactly num_bytes from the socket_client or returns an empty bytearray if EOF is reached.
+    Decodes one frame payload.
+
+    Args:
+        payload: Raw JSON payload (bytes or a memoryview from FrameReader).
+        decoder: Decoder backend to use, defaults to DECODER.
+
+    Return:
+        The decoded frame, or None for invalid JSON and heartbeat messages.
     """
-    data = bytearray()
-    while len(data) < num_bytes:
-        remaining_bytes = num_bytes - len(data)
-        try:
-            packet = socket_client.recv(remaining_bytes)
-        except (socket.timeout, ConnectionResetError):
-            return bytearray()
-        if not packet:
-            return bytearray()
-        data.extend(packet)
+    decoder = decoder or DECODER
+    try:
+        data = decoder.decode(payload)
+    except DECODE_ERRORS:
+        return None  # Skip invalid JSON frames.
+
+    # Skip heartbeat messages.
+    if not isinstance(data, dict) or "heartbeat" in data.keys():
+        return None
     return data
 
 
-def read_frames(socket_client: ssl.SSLSocket, callback_function: Any) -> None:
+def read_frames(frame_reader: FrameReader, callback_function: Any, decoder: JsonDecoder = None,
+                prescreen: Any = None) -> None:
     """
     Reads frames indefinitely from the TCP stream.
-    Each frame begins with a 4-byte size indicator, followed by the JSON payload.
+    Each frame begins with a 4-byte size indicator, followed by the JSON payload;
+    the framing is handled by frame_reader, which hands out payload views into
+    its reusable receive buffer.
+    If prescreen is given, prescreen(payload) is called on the raw payload first
+    and the frame is skipped without decoding when it returns False.
     Calls callback_function(data) for every frame.
     The reading loop stops if callback_function returns True.
+    Receive, pre-screen, decode and callback (VRU detection) times are
+    recorded per frame, see instrumentation.py.
     """
+    frames = iter(frame_reader)
     while True:
-        # Read the frame size (first 4 bytes).
-        frame_size_b = recv(socket_client, FRAME_SIZE_B)
-        if len(frame_size_b) == 0:
-            return  # Connection closed or error.
-
-        frame_size = int.from_bytes(frame_size_b, ENDIAN_TYPE)
-        data_bytes = recv(socket_client, frame_size)
-        if len(data_bytes) == 0:
-            return
-
-        try:
-            data = json.loads(data_bytes.decode("utf-8"))
-        except json.JSONDecodeError:
-            continue  # Skip invalid JSON frames.
-
-        # Skip heartbeat messages.
-        if "heartbeat" in data.keys():
+        with timer("frame_receive"):
+            payload = next(frames, None)
+        if payload is None:
+            break
+
+        if prescreen is not None:
+            with timer("prescreen"):
+                keep = prescreen(payload)
+            if not keep:
+                continue
+
+        with timer("frame_decode"):
+            data = parse_frame(payload, decoder)
+        if data is None:
             continue
 
         # If callback_function returns True, break the reading loop.
-        if callback_function(data):
+        with timer("vru_detect"):
+            stop = callback_function(data)
+        if stop:
             break
 
 
-def print_session_statistics(session_counters):
+def print_session_statistics(session_counters, screen_counters=None, fp_filter=None, tracker=None,
+                             batch_writer=None):
     """
     Print statistics about the data collection sessions.
     
     Args:
         session_counters: Dictionary with session counting stats.
+        screen_counters: Optional dictionary with VruDetector pre-screen stats.
+        fp_filter: Optional FalsePositiveFilter whose per-rule counters to print.
+        tracker: Optional VruTracker whose track counters to print.
+        batch_writer: Optional BatchWriter whose save/backpressure counters to print.
     """
     total_sessions = session_counters['total_sessions']
     valid_sessions = session_counters['valid_sessions']
@@ -101,6 +148,25 @@ def print_session_statistics(session_counters):
     else:
         print("No sessions were recorded.")
 
+    if screen_counters and screen_counters['frames_screened'] > 0:
+        screened = screen_counters['frames_screened']
+        avoided = screen_counters['full_decodes_avoided']
+        print(f"  Frames Screened: {screened}")
+        print(f"  Full Decodes Avoided: {avoided} ({avoided / screened * 100:.1f}%)")
+
+    if fp_filter is not None:
+        print(fp_filter.summary())
+
+    if tracker is not None:
+        print(tracker.summary())
+
+    if batch_writer is not None:
+        print(batch_writer.summary())
+
+    if summary():
+        print("\nStage Latencies:")
+        print(format_summary())
+
 
 def main():
     # Create SSL context for secure connection.
@@ -114,35 +180,79 @@ def main():
         'current_session_valid': False
     }
 
-    # Connect to the TCP stream.
-    with ssl_context.wrap_socket(socket.create_connection(ADDRESS)) as socket_client:
-        print(f"Connected to {ADDRESS}. Listening for LiDAR data...")
-
-        while True:
-            # Create a new LidarBuffer for this session, passing in the session counters
-            lidar_buffer = LidarBuffer(
-                max_frames=MAX_BUFFER_SIZE,
-                min_video_duration=MIN_VIDEO_DURATION,
-                capture_area=CAPTURE_AREA,
-                session_counters=session_counters
-            )
+    # Pre-screen counters, shared by the detectors of all sessions
+    screen_counters = {
+        'frames_screened': 0,
+        'full_decodes_avoided': 0
+    }
+
+    # False-positive filter, shared by the detectors of all sessions
+    fp_filter = FalsePositiveFilter()
+
+    # VRU tracks, kept across sessions so a session can restart on a confirmed track
+    tracker = VruTracker(VRU_CLASSIFICATIONS)
+
+    # Regions of interest; None (whole field of view) if no zone file is configured
+    zone_map = load_zone_map()
+
+    # Writer thread saving the batches of all sessions
+    batch_writer = BatchWriter()
+
+    # Batch videos are drawn from the frames, or cut from one segmented screen capture for all sessions
+    renderer = BevRenderer(zone_map) if VIDEO_SOURCE == "bev" else None
+    recorder = SegmentRecorder(CAPTURE_AREA) if renderer is None else None
+
+    # Raw frames of the last PRE_EVENT_SECONDS while idle, shared by the detectors of all sessions
+    pre_event = FrameRing(PRE_EVENT_FRAMES)
+
+    try:
+        # Connect to the TCP stream.
+        with ssl_context.wrap_socket(socket.create_connection(ADDRESS)) as socket_client:
+            print(f"Connected to {ADDRESS}. Listening for LiDAR data...")
+
+            # One reader for the whole connection so bytes buffered past the end
+            # of a session are not lost when the next session starts.
+            frame_reader = FrameReader(socket_client)
+
+            while True:
+                # Create a new LidarBuffer for this session, passing in the session counters
+                lidar_buffer = LidarBuffer(
+                    max_frames=MAX_BUFFER_SIZE,
+                    min_video_duration=MIN_VIDEO_DURATION,
+                    capture_area=CAPTURE_AREA,
+                    session_counters=session_counters,
+                    session_codec=SESSION_CODEC,
+                    batch_writer=batch_writer,
+                    recorder=recorder,
+                    renderer=renderer,
+                    audit_video=VIDEO_AUDIT
+                )
             
-            # Create a new VruDetector using the LidarBuffer and NO_VRU_THRESHOLD.
-            vru_detector = VruDetector(lidar_buffer, NO_VRU_THRESHOLD)
+                # Create a new VruDetector using the LidarBuffer and NO_VRU_THRESHOLD.
+                vru_detector = VruDetector(lidar_buffer, NO_VRU_THRESHOLD, screen_counters, fp_filter, tracker, zone_map,
+                                           pre_event)
 
-            # Read frames until the detector signals the current session is complete.
-            # This call blocks until vru_detector.handle_frame() returns True.
-            read_frames(socket_client, vru_detector.handle_frame)
+                # Read frames until the detector signals the current session is complete.
+                # This call blocks until vru_detector.handle_frame() returns True.
+                # Frames without a VRU are skipped undecoded while no session is active.
+                read_frames(frame_reader, vru_detector.handle_frame, prescreen=vru_detector.should_decode)
             
-            # Increment session counters after a session completes
-            session_counters['total_sessions'] += 1
+                # Increment session counters after a session completes
+                session_counters['total_sessions'] += 1
             
-            # Update valid sessions counter if the session was valid
-            if session_counters['current_session_valid']:
-                session_counters['valid_sessions'] += 1
+                # Update valid sessions counter if the session was valid
+                if session_counters['current_session_valid']:
+                    session_counters['valid_sessions'] += 1
             
-            # Print current statistics after each session
-            print_session_statistics(session_counters)
+                # Print current statistics after each session
+                print_session_statistics(session_counters, screen_counters, fp_filter, tracker, batch_writer)
+    finally:
+        # The writer is a daemon thread: save the queued batches before the
+        # process exits, and before the capture their videos are cut from stops.
+        batch_writer.close()
+        # The capture process would otherwise outlive the collector.
+        if recorder is not None:
+            recorder.stop()
 
 
 if __name__ == "__main__":
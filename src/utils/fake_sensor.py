@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-10
+
+"""
+Local stand-in for an Ouster Gemini Detect object_list stream.
+
+Serves a fixed set of JSON payloads over TCP (optionally TLS) using the same
+4-byte big-endian length-prefix framing as the real sensor. Used by the unit
+tests and benchmarks so ingestion code can be exercised without hardware.
+"""
+
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from frame_reader import ENDIAN_TYPE, FRAME_SIZE_B
+
+HEARTBEAT_PAYLOAD = json.dumps({"heartbeat": [{}]}).encode("utf-8")
+
+
+def make_self_signed_contexts(workdir: str) -> Tuple[ssl.SSLContext, ssl.SSLContext]:
+    """
+    Creates a throw-away self-signed certificate with the openssl CLI.
+
+    Args:
+        workdir: Directory to write the certificate and key into.
+
+    Return:
+        (server_context, client_context) for a loopback TLS connection. The
+        client context does not verify the certificate, like the collector.
+    """
+    cert_path = os.path.join(workdir, "cert.pem")
+    key_path = os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key_path, "-out", cert_path],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert_path, key_path)
+
+    client_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+    return server_context, client_context
+
+
+def encode_frame(frame: Union[bytes, Dict[str, Any]]) -> bytes:
+    """
+    Returns a length-prefixed wire frame for a payload or a JSON-able dict.
+    """
+    if not isinstance(frame, (bytes, bytearray)):
+        frame = json.dumps(frame, separators=(",", ":")).encode("utf-8")
+    return len(frame).to_bytes(FRAME_SIZE_B, ENDIAN_TYPE) + bytes(frame)
+
+
+class FakeSensorServer:
+    """
+    Streams payloads to every connected client at a fixed rate.
+
+    Each client gets its own copy of the stream, starting from the first
+    payload. With loop=True the payloads are repeated until the client
+    disconnects or the server stops.
+    """
+    def __init__(self,
+                 payloads: Sequence[Union[bytes, Dict[str, Any]]],
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 ssl_context: Optional[ssl.SSLContext] = None,
+                 rate_hz: Optional[float] = 10.0,
+                 loop: bool = True,
+                 heartbeat_every: Optional[int] = None,
+                 max_frames: Optional[int] = None):
+        """
+        Args:
+            payloads: Frames to serve, as raw JSON bytes or dicts.
+            host: Interface to listen on.
+            port: Port to listen on, 0 picks a free one (see .port).
+            ssl_context: Server-side TLS context, None for plain TCP.
+            rate_hz: Frames per second per client, None for as fast as possible.
+            loop: Repeat the payloads once the end is reached.
+            heartbeat_every: Insert a heartbeat message every N frames.
+            max_frames: Close each connection after this many frames.
+        """
+        self.frames: List[bytes] = [encode_frame(p) for p in payloads]
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.rate_hz = rate_hz
+        self.loop = loop
+        self.heartbeat_every = heartbeat_every
+        self.max_frames = max_frames
+        self.connections = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        # Wait for a slow client (TCP backpressure) instead of dropping frames, see _skip().
+        self.wait_for_client = True
+        self._server = None
+        self._writers = set()
+        self._thread = None
+        self._thread_loop = None
+
+
+    async def start(self) -> None:
+        """
+        Starts listening; the chosen port is available as self.port afterwards.
+        """
+        self._server = await asyncio.start_server(
+            self._serve_client, self.host, self.port, ssl=self.ssl_context
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+
+    async def stop(self) -> None:
+        """
+        Stops listening and drops every connected client.
+        """
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+
+    async def drop_clients(self) -> None:
+        """
+        Closes all current client connections but keeps listening, to
+        simulate a sensor-side reset.
+        """
+        for writer in list(self._writers):
+            writer.close()
+
+
+    def _interval_after(self, index: int) -> float:
+        """
+        Seconds between payload index and the next one; 0 sends at once.
+        """
+        return 1.0 / self.rate_hz if self.rate_hz else 0.0
+
+
+    def _skip(self, writer: asyncio.StreamWriter) -> bool:
+        """
+        Whether to drop the frame due now instead of sending it.
+        """
+        return False
+
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        loop = asyncio.get_running_loop()
+        next_send = loop.time()
+        sent = 0
+        heartbeat = encode_frame(HEARTBEAT_PAYLOAD)
+
+        try:
+            while True:
+                for index, frame in enumerate(self.frames):
+                    if self.max_frames is not None and sent >= self.max_frames:
+                        return
+                    if self.heartbeat_every and sent and sent % self.heartbeat_every == 0:
+                        writer.write(heartbeat)
+                    if self._skip(writer):
+                        self.frames_dropped += 1
+                    else:
+                        writer.write(frame)
+                        if self.wait_for_client:
+                            await writer.drain()
+                        self.frames_sent += 1
+                    sent += 1
+
+                    interval = self._interval_after(index)
+                    if interval:
+                        next_send += interval
+                        delay = next_send - loop.time()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        else:
+                            next_send = loop.time()
+                    if not self.wait_for_client:
+                        await asyncio.sleep(0)  # Without drain() nothing else yields to the event loop
+                if not self.loop:
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+    def start_in_thread(self) -> int:
+        """
+        Runs the server on its own event loop in a daemon thread, for use
+        from blocking code.
+
+        Return:
+            The port the server is listening on.
+        """
+        started = threading.Event()
+
+        def run():
+            self._thread_loop = asyncio.new_event_loop()
+            self._thread_loop.run_until_complete(self.start())
+            started.set()
+            self._thread_loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.port
+
+
+    def stop_thread(self) -> None:
+        """
+        Stops a server started with start_in_thread().
+        """
+        if self._thread_loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._thread_loop).result()
+        self._thread_loop.call_soon_threadsafe(self._thread_loop.stop)
+        self._thread.join()
+        self._thread_loop.close()
+        self._thread_loop = None
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-21
+
+"""
+Rule-based false-positive filter for VRU detections.
+
+FP_eval_log.txt shows 253 of 268 recorded events were false positives. The
+example invalid videos point at a few recurring causes: vehicle parts
+classified as person/bike, a vehicle on the sidewalk read as a person, and
+objects that appear from behind an occluder. Each rule below targets one of
+those causes using only fields already present in every Gemini object, and
+VruDetector ignores a VRU detection if any rule suppresses it.
+
+Rules are pluggable: anything with a 'name' attribute and a
+suppress(obj, context) method can be passed to FalsePositiveFilter.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Classifications whose bounding boxes can swallow a "VRU" detection.
+VEHICLE_CLASSIFICATIONS = {"VEHICLE", "LARGE_VEHICLE"}
+
+# Rule defaults.
+MIN_CLASSIFICATION_CONFIDENCE = 0.5
+MIN_NUM_POINTS = 10
+MIN_TRACK_AGE_S = 0.5
+VEHICLE_BOX_MARGIN_M = 0.3
+
+# Plausible dimension ranges in metres: (min, max) for length, width, height.
+CLASS_DIMENSION_PRIORS = {
+    "PERSON": {"length": (0.1, 2.0), "width": (0.1, 1.5), "height": (0.8, 2.3)},
+    "BICYCLE": {"length": (0.8, 2.5), "width": (0.1, 1.2), "height": (0.7, 2.3)},
+}
+
+
+class FrameContext:
+    """
+    Per-frame data shared by the rules, computed lazily at most once per frame.
+    """
+    def __init__(self, frame_obj: Dict[str, Any]):
+        self.frame_obj = frame_obj
+        self._vehicle_boxes = None
+
+
+    @property
+    def vehicle_boxes(self) -> List[Tuple[float, float, float, float, float, float, Any]]:
+        """
+        (x, y, cos(heading), sin(heading), half_length, half_width, id) for
+        every vehicle in the frame.
+        """
+        if self._vehicle_boxes is None:
+            boxes = []
+            for obj in self.frame_obj.get("objects", []):
+                if obj.get("classification") not in VEHICLE_CLASSIFICATIONS:
+                    continue
+                position = obj.get("position") or {}
+                dimensions = obj.get("dimensions") or {}
+                heading = math.radians(obj.get("heading", 0.0))
+                boxes.append((
+                    position.get("x", 0.0), position.get("y", 0.0),
+                    math.cos(heading), math.sin(heading),
+                    dimensions.get("length", 0.0) / 2, dimensions.get("width", 0.0) / 2,
+                    obj.get("id")
+                ))
+            self._vehicle_boxes = boxes
+        return self._vehicle_boxes
+
+
+class LowConfidenceRule:
+    """
+    Suppresses detections the classifier itself is unsure about.
+    """
+    name = "low_confidence"
+
+    def __init__(self, min_confidence: float = MIN_CLASSIFICATION_CONFIDENCE):
+        self.min_confidence = min_confidence
+
+    def suppress(self, obj: Dict[str, Any], context: FrameContext) -> bool:
+        return obj.get("classification_confidence", 0.0) < self.min_confidence
+
+
+class SparsePointsRule:
+    """
+    Suppresses detections backed by too few LiDAR returns (fragments,
+    partially hidden objects).
+    """
+    name = "sparse_points"
+
+    def __init__(self, min_points: int = MIN_NUM_POINTS):
+        self.min_points = min_points
+
+    def suppress(self, obj: Dict[str, Any], context: FrameContext) -> bool:
+        return obj.get("num_points", 0) < self.min_points
+
+
+class DimensionPriorRule:
+    """
+    Suppresses detections whose box does not fit the size of the class,
+    e.g. a car door or trailer hitch labelled as a person.
+    """
+    name = "dimension_prior"
+
+    def __init__(self, priors: Optional[Dict[str, Dict[str, Tuple[float, float]]]] = None):
+        self.priors = priors or CLASS_DIMENSION_PRIORS
+
+    def suppress(self, obj: Dict[str, Any], context: FrameContext) -> bool:
+        prior = self.priors.get(obj.get("classification"))
+        dimensions = obj.get("dimensions")
+        if prior is None or not dimensions:
+            return False
+        for key, (low, high) in prior.items():
+            value = dimensions.get(key)
+            if value is not None and not low <= value <= high:
+                return True
+        return False
+
+
+class VehicleOverlapRule:
+    """
+    Suppresses VRU detections whose centre lies inside the (oriented)
+    bounding box of a vehicle in the same frame: vehicle parts, or a vehicle
+    on the sidewalk split into a vehicle and a "person".
+    """
+    name = "vehicle_overlap"
+
+    def __init__(self, margin_m: float = VEHICLE_BOX_MARGIN_M):
+        self.margin_m = margin_m
+
+    def suppress(self, obj: Dict[str, Any], context: FrameContext) -> bool:
+        position = obj.get("position") or {}
+        x, y = position.get("x"), position.get("y")
+        if x is None or y is None:
+            return False
+
+        for vx, vy, cos_h, sin_h, half_length, half_width, vehicle_id in context.vehicle_boxes:
+            if vehicle_id == obj.get("id"):
+                continue
+            dx, dy = x - vx, y - vy
+            # Project onto the vehicle's own axes.
+            along = dx * cos_h + dy * sin_h
+            across = -dx * sin_h + dy * cos_h
+            if abs(along) <= half_length + self.margin_m and abs(across) <= half_width + self.margin_m:
+                return True
+        return False
+
+
+class TrackAgeRule:
+    """
+    Suppresses tracks that were only just created; flickering detections of
+    hidden objects rarely live longer than a few frames.
+    """
+    name = "track_age"
+
+    def __init__(self, min_age_s: float = MIN_TRACK_AGE_S):
+        self.min_age_us = min_age_s * 1e6
+
+    def suppress(self, obj: Dict[str, Any], context: FrameContext) -> bool:
+        creation_ts = obj.get("creation_ts")
+        update_ts = obj.get("update_ts")
+        if not creation_ts or not update_ts:
+            return False
+        return update_ts - creation_ts < self.min_age_us
+
+
+def default_rules() -> List[Any]:
+    """
+    Returns one instance of every built-in rule, cheapest checks first.
+    """
+    return [
+        LowConfidenceRule(),
+        SparsePointsRule(),
+        DimensionPriorRule(),
+        TrackAgeRule(),
+        VehicleOverlapRule(),
+    ]
+
+
+class FalsePositiveFilter:
+    """
+    Applies the rules to the VRU candidates of a frame and keeps per-rule counters:
+
+        rule_hits[name]         VRU detections the rule flagged (a detection
+                                can be flagged by several rules)
+        sessions_avoided[name]  sessions (and therefore recordings and LLM
+                                calls) that would have started if the
+                                detections had not been suppressed; credited
+                                to the first rule that fired
+        detections_checked      VRU candidates seen
+        detections_suppressed   VRU candidates suppressed by at least one rule
+    """
+    def __init__(self, rules: Optional[Sequence[Any]] = None):
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.rule_hits = {rule.name: 0 for rule in self.rules}
+        self.sessions_avoided = {rule.name: 0 for rule in self.rules}
+        self.detections_checked = 0
+        self.detections_suppressed = 0
+        self._suppressing = False  # Inside a run of idle frames with only suppressed VRUs.
+
+
+    def check_frame(self, frame_obj: Dict[str, Any],
+                    candidates: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+        """
+        Runs every rule on the VRU candidates of one frame.
+
+        Args:
+            frame_obj: The frame ({"frame_count", "objects"}) the candidates belong to.
+            candidates: Objects of the frame classified as VRU.
+
+        Returns:
+            (accepted, suppressed) where suppressed holds (object, first rule name).
+        """
+        accepted, suppressed = [], []
+        context = FrameContext(frame_obj)
+
+        for obj in candidates:
+            self.detections_checked += 1
+            first_rule = None
+            for rule in self.rules:
+                if rule.suppress(obj, context):
+                    self.rule_hits[rule.name] += 1
+                    if first_rule is None:
+                        first_rule = rule.name
+            if first_rule is None:
+                accepted.append(obj)
+            else:
+                self.detections_suppressed += 1
+                suppressed.append((obj, first_rule))
+
+        return accepted, suppressed
+
+
+    def record_idle_frame(self, suppressed: List[Tuple[Dict[str, Any], str]]) -> None:
+        """
+        Called by VruDetector for every frame processed while no session is
+        active. The first frame of a run of frames in which VRUs were seen
+        but all suppressed counts as one avoided session.
+        """
+        if suppressed and not self._suppressing:
+            self.sessions_avoided[suppressed[0][1]] += 1
+        self._suppressing = bool(suppressed)
+
+
+    def summary(self) -> str:
+        """
+        Returns the counters as a printable multi-line string.
+        """
+        lines = [f"  FP Filter: {self.detections_suppressed}/{self.detections_checked} VRU detections suppressed"]
+        for rule in self.rules:
+            lines.append(f"    {rule.name:<16} hits: {self.rule_hits[rule.name]:>6}  "
+                         f"sessions avoided: {self.sessions_avoided[rule.name]:>4}")
+        return "\n".join(lines)
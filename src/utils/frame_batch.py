@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-16
+
+"""
+Columnar representation of the objects in one LiDAR frame.
+
+A FrameBatch keeps every object of a frame as one row of a structured NumPy
+array instead of a nested dict, so geometry filters, TTC math and
+serialization can run over all objects at once. Converters are provided for
+the Gemini Detect object_list format and for the simplified scene format
+returned by DataIngestion.get_lidar_data().
+
+This module has no imports from its siblings, so it can be used both from
+src/utils scripts and from src/modules.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Classification <-> compact integer code. The first entry is the fallback.
+CLASS_NAMES = ("UNKNOWN", "PERSON", "BICYCLE", "VEHICLE", "LARGE_VEHICLE")
+CLASS_CODES = {name: code for code, name in enumerate(CLASS_NAMES)}
+# DataIngestion uses "PEDESTRIAN" where Gemini uses "PERSON".
+CLASS_CODES["PEDESTRIAN"] = CLASS_CODES["PERSON"]
+VRU_CODES = (CLASS_CODES["PERSON"], CLASS_CODES["BICYCLE"])
+
+OBJECT_DTYPE = np.dtype([
+    ("id", "U24"),
+    ("class_code", np.int8),
+    ("confidence", np.float32),
+    ("x", np.float32),
+    ("y", np.float32),
+    ("z", np.float32),
+    ("vx", np.float32),
+    ("vy", np.float32),
+    ("vz", np.float32),
+    ("heading", np.float32),  # Degrees, counter-clockwise from the +x axis.
+    ("length", np.float32),
+    ("width", np.float32),
+    ("height", np.float32),
+    ("num_points", np.int32),
+    ("track_frames", np.int32),  # Gemini per-object frame_count.
+    ("creation_ts", np.int64),   # Microseconds.
+    ("update_ts", np.int64),
+])
+
+# Header for to_bytes(): frame_count, timestamp, number of objects.
+_HEADER_DTYPE = np.dtype([("frame_count", "<i8"), ("timestamp", "<i8"), ("count", "<i8")])
+
+
+def class_code(classification: Optional[str]) -> int:
+    """
+    Returns the integer code of a classification name (UNKNOWN if not known).
+    """
+    return CLASS_CODES.get(classification or "", 0)
+
+
+class FrameBatch:
+    """
+    All objects of one frame as a structured array (see OBJECT_DTYPE).
+
+    Column access returns views, e.g. batch.objects["x"]; select() returns a
+    new batch holding a subset of the rows.
+    """
+    __slots__ = ("objects", "frame_count", "timestamp")
+
+    def __init__(self, objects: Optional[np.ndarray] = None, frame_count: int = 0, timestamp: int = 0):
+        self.objects = objects if objects is not None else np.zeros(0, dtype=OBJECT_DTYPE)
+        self.frame_count = frame_count
+        self.timestamp = timestamp
+
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+
+    def __repr__(self) -> str:
+        return f"FrameBatch(frame_count={self.frame_count}, objects={len(self)})"
+
+
+    # ------------------------------------------------------------------
+    # Converters
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_gemini(cls, frame: Dict[str, Any]) -> "FrameBatch":
+        """
+        Builds a batch from one entry of a Gemini "object_list"
+        ({"frame_count": ..., "timestamp": ..., "objects": [...]}).
+        """
+        rows = []
+        for obj in frame.get("objects", []):
+            position = obj.get("position") or {}
+            velocity = obj.get("velocity") or {}
+            dimensions = obj.get("dimensions") or {}
+            rows.append((
+                str(obj.get("id", "")),
+                class_code(obj.get("classification")),
+                obj.get("classification_confidence", 0.0),
+                position.get("x", np.nan), position.get("y", np.nan), position.get("z", np.nan),
+                velocity.get("x", np.nan), velocity.get("y", np.nan), velocity.get("z", np.nan),
+                obj.get("heading", np.nan),
+                dimensions.get("length", 0.0), dimensions.get("width", 0.0), dimensions.get("height", 0.0),
+                obj.get("num_points", 0),
+                obj.get("frame_count", 0),
+                obj.get("creation_ts", 0),
+                obj.get("update_ts", 0),
+            ))
+        return cls(np.array(rows, dtype=OBJECT_DTYPE),
+                   frame.get("frame_count", 0), frame.get("timestamp", 0))
+
+
+    def to_gemini(self) -> Dict[str, Any]:
+        """
+        Converts back to a Gemini object_list entry. Only the columns held by
+        the batch are written; fields such as orientation or uuid are lost.
+        """
+        objects = []
+        for row in self.objects.tolist():
+            (obj_id, code, confidence, x, y, z, vx, vy, vz, heading,
+             length, width, height, num_points, track_frames, creation_ts, update_ts) = row
+            objects.append({
+                "classification": CLASS_NAMES[code],
+                "classification_confidence": round(confidence, 3),
+                "creation_ts": creation_ts,
+                "dimensions": {"height": round(height, 3), "length": round(length, 3), "width": round(width, 3)},
+                "frame_count": track_frames,
+                "heading": round(heading, 4),
+                "id": int(obj_id) if obj_id.isdigit() else obj_id,
+                "num_points": num_points,
+                "position": {"x": round(x, 3), "y": round(y, 3), "z": round(z, 3)},
+                "update_ts": update_ts,
+                "velocity": {"x": round(vx, 3), "y": round(vy, 3), "z": round(vz, 3)},
+            })
+        return {"frame_count": self.frame_count, "objects": objects, "timestamp": self.timestamp}
+
+
+    @classmethod
+    def from_scene_objects(cls, scene_objects: List[Dict[str, Any]],
+                           frame_count: int = 0, timestamp: int = 0) -> "FrameBatch":
+        """
+        Builds a batch from the DataIngestion.get_lidar_data() format
+        ({"id", "type", "position": {"x", "y"}, "speed_mps", "heading_deg"}).
+        Missing kinematic fields become NaN.
+        """
+        rows = []
+        for obj in scene_objects:
+            position = obj.get("position") or {}
+            speed = obj.get("speed_mps", np.nan)
+            heading = obj.get("heading_deg", np.nan)
+            rows.append((
+                str(obj.get("id", "")),
+                class_code(obj.get("type")),
+                obj.get("confidence", 1.0),
+                position.get("x", np.nan), position.get("y", np.nan), position.get("z", 0.0),
+                speed * math.cos(math.radians(heading)), speed * math.sin(math.radians(heading)), 0.0,
+                heading,
+                0.0, 0.0, 0.0,
+                0, 0, 0, 0,
+            ))
+        objects = np.array(rows, dtype=OBJECT_DTYPE)
+        return cls(objects, frame_count, timestamp)
+
+
+    def to_scene_objects(self) -> List[Dict[str, Any]]:
+        """
+        Converts to the DataIngestion.get_lidar_data() format used by the
+        LLM prompt and the communication messages.
+        """
+        speeds = self.speeds()
+        scene_objects = []
+        for row, speed in zip(self.objects.tolist(), speeds.tolist()):
+            scene_objects.append({
+                "id": row[0],
+                "type": CLASS_NAMES[row[1]],
+                "position": {"x": round(row[3], 2), "y": round(row[4], 2)},
+                "speed_mps": round(speed, 2),
+                "heading_deg": round(row[9], 1)
+            })
+        return scene_objects
+
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the batch to a compact binary record (header + raw rows,
+        rows in native byte order).
+        """
+        header = np.array([(self.frame_count, self.timestamp, len(self))], dtype=_HEADER_DTYPE)
+        return header.tobytes() + self.objects.tobytes()
+
+
+    @classmethod
+    def from_bytes(cls, data: Any) -> "FrameBatch":
+        """
+        Restores a batch written by to_bytes(). The rows are copied out of
+        data, so the source buffer may be reused afterwards.
+        """
+        header = np.frombuffer(data, dtype=_HEADER_DTYPE, count=1)[0]
+        objects = np.frombuffer(data, dtype=OBJECT_DTYPE, count=int(header["count"]),
+                                offset=_HEADER_DTYPE.itemsize).copy()
+        return cls(objects, int(header["frame_count"]), int(header["timestamp"]))
+
+
+    # ------------------------------------------------------------------
+    # Vectorized helpers
+    # ------------------------------------------------------------------
+
+    def select(self, mask: np.ndarray) -> "FrameBatch":
+        """
+        Returns a new batch with the rows selected by a boolean mask or index array.
+        """
+        return FrameBatch(self.objects[mask], self.frame_count, self.timestamp)
+
+
+    def vru_mask(self) -> np.ndarray:
+        """
+        Boolean mask of the objects classified as VRU (person or bicycle).
+        """
+        return np.isin(self.objects["class_code"], VRU_CODES)
+
+
+    def positions(self) -> np.ndarray:
+        """
+        (N, 2) float array of x/y positions.
+        """
+        return np.stack([self.objects["x"], self.objects["y"]], axis=1)
+
+
+    def velocities(self) -> np.ndarray:
+        """
+        (N, 2) float array of x/y velocities.
+        """
+        return np.stack([self.objects["vx"], self.objects["vy"]], axis=1)
+
+
+    def speeds(self) -> np.ndarray:
+        """
+        Planar speed of every object in m/s.
+        """
+        return np.hypot(self.objects["vx"], self.objects["vy"])
+
+
+    def distances_to(self, x: float, y: float) -> np.ndarray:
+        """
+        Planar distance of every object to the point (x, y).
+        """
+        return np.hypot(self.objects["x"] - x, self.objects["y"] - y)
+
+
+    def within_radius(self, x: float, y: float, radius: float) -> "FrameBatch":
+        """
+        Returns the objects within radius metres of (x, y).
+        """
+        return self.select(self.distances_to(x, y) <= radius)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-12
+
+"""
+Pluggable JSON decoders for Gemini Detect object_list payloads.
+
+Three backends are provided, in order of preference:
+    orjson  - fastest dict decoding (pip install orjson)
+    msgspec - fastest typed decoding, straight into the schema below
+              (pip install msgspec)
+    json    - stdlib fallback, always available
+get_decoder() picks the first one installed; see
+test/benchmark/bench_frame_decoder.py for per-frame timings.
+
+Every decoder offers decode() for plain dicts (what VruDetector and
+LidarBuffer consume) and decode_typed() for the slotted ObjectListMessage
+schema. msgspec and orjson read the receive buffer view directly; only the
+stdlib backend needs a bytes copy of the payload.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ---------------------------------------------------------------------------
+# Typed frame schema (fields as seen in data/example_object_list.json).
+# Fields not listed here (orientation, initial_position, ...) are ignored.
+# ---------------------------------------------------------------------------
+
+@dataclass(slots=True)
+class Vector3:
+    x: float = 0.0
+    y: float = 0.0
+    z: float = 0.0
+
+
+@dataclass(slots=True)
+class Dimensions:
+    length: float = 0.0
+    width: float = 0.0
+    height: float = 0.0
+
+
+@dataclass(slots=True)
+class DetectedObject:
+    id: int = 0
+    uuid: str = ""
+    classification: str = ""
+    classification_confidence: float = 0.0
+    sub_classification: str = ""
+    sub_classification_confidence: float = 0.0
+    position: Vector3 = field(default_factory=Vector3)
+    velocity: Vector3 = field(default_factory=Vector3)
+    dimensions: Dimensions = field(default_factory=Dimensions)
+    position_uncertainty: Vector3 = field(default_factory=Vector3)
+    velocity_uncertainty: Vector3 = field(default_factory=Vector3)
+    heading: float = 0.0
+    num_points: int = 0
+    distance_to_primary_sensor: float = 0.0
+    primary_sensor: str = ""
+    frame_count: int = 0  # Number of frames the object has been tracked.
+    creation_ts: int = 0  # Timestamps are in microseconds.
+    classification_ts: int = 0
+    update_ts: int = 0
+
+
+@dataclass(slots=True)
+class Frame:
+    frame_count: int = 0
+    timestamp: int = 0
+    objects: List[DetectedObject] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ObjectListMessage:
+    object_list: List[Frame] = field(default_factory=list)
+    heartbeat: Optional[List[Any]] = None
+
+
+def _vector3(data: Optional[Dict[str, Any]]) -> Vector3:
+    if not data:
+        return Vector3()
+    return Vector3(data.get("x", 0.0), data.get("y", 0.0), data.get("z", 0.0))
+
+
+def _dimensions(data: Optional[Dict[str, Any]]) -> Dimensions:
+    if not data:
+        return Dimensions()
+    return Dimensions(data.get("length", 0.0), data.get("width", 0.0), data.get("height", 0.0))
+
+
+def object_from_dict(data: Dict[str, Any]) -> DetectedObject:
+    """
+    Builds a DetectedObject from a decoded Gemini object dict.
+    """
+    return DetectedObject(
+        id=data.get("id", 0),
+        uuid=data.get("uuid", ""),
+        classification=data.get("classification", ""),
+        classification_confidence=data.get("classification_confidence", 0.0),
+        sub_classification=data.get("sub_classification", ""),
+        sub_classification_confidence=data.get("sub_classification_confidence", 0.0),
+        position=_vector3(data.get("position")),
+        velocity=_vector3(data.get("velocity")),
+        dimensions=_dimensions(data.get("dimensions")),
+        position_uncertainty=_vector3(data.get("position_uncertainty")),
+        velocity_uncertainty=_vector3(data.get("velocity_uncertainty")),
+        heading=data.get("heading", 0.0),
+        num_points=data.get("num_points", 0),
+        distance_to_primary_sensor=data.get("distance_to_primary_sensor", 0.0),
+        primary_sensor=data.get("primary_sensor", ""),
+        frame_count=data.get("frame_count", 0),
+        creation_ts=data.get("creation_ts", 0),
+        classification_ts=data.get("classification_ts", 0),
+        update_ts=data.get("update_ts", 0),
+    )
+
+
+def message_from_dict(data: Dict[str, Any]) -> ObjectListMessage:
+    """
+    Builds an ObjectListMessage from a decoded payload dict.
+    """
+    frames = [
+        Frame(
+            frame_count=frame.get("frame_count", 0),
+            timestamp=frame.get("timestamp", 0),
+            objects=[object_from_dict(obj) for obj in frame.get("objects", [])],
+        )
+        for frame in data.get("object_list", [])
+    ]
+    return ObjectListMessage(object_list=frames, heartbeat=data.get("heartbeat"))
+
+
+# ---------------------------------------------------------------------------
+# Decoder backends.
+# ---------------------------------------------------------------------------
+
+class JsonDecoder:
+    """
+    Stdlib json backend.
+    """
+    name = "json"
+
+    def decode(self, payload: Any) -> Dict[str, Any]:
+        # The stdlib parser has no buffer-protocol support, so this is the
+        # one copy made of the payload before parsing.
+        return json.loads(bytes(payload))
+
+    def decode_typed(self, payload: Any) -> ObjectListMessage:
+        return message_from_dict(self.decode(payload))
+
+
+class OrjsonDecoder(JsonDecoder):
+    """
+    orjson backend; reads memoryview payloads without copying them.
+    """
+    name = "orjson"
+
+    def decode(self, payload: Any) -> Dict[str, Any]:
+        return orjson.loads(payload)
+
+
+class MsgspecDecoder(JsonDecoder):
+    """
+    msgspec backend; decode_typed() validates straight into the schema
+    without building intermediate dicts.
+    """
+    name = "msgspec"
+
+    def __init__(self):
+        self._dict_decoder = msgspec.json.Decoder()
+        self._typed_decoder = msgspec.json.Decoder(ObjectListMessage)
+
+    def decode(self, payload: Any) -> Dict[str, Any]:
+        return self._dict_decoder.decode(payload)
+
+    def decode_typed(self, payload: Any) -> ObjectListMessage:
+        return self._typed_decoder.decode(payload)
+
+
+# Backends in order of preference, with their availability. The collector
+# works on dicts, so the fastest dict decoder comes first.
+BACKENDS = {
+    "orjson": (OrjsonDecoder, orjson is not None),
+    "msgspec": (MsgspecDecoder, msgspec is not None),
+    "json": (JsonDecoder, True),
+}
+
+# Exceptions raised by any backend for a malformed payload (the json,
+# orjson and msgspec decode errors all derive from ValueError).
+DECODE_ERRORS = (ValueError, UnicodeDecodeError)
+
+
+def available_backends() -> List[str]:
+    """
+    Return:
+        Names of the installed backends, in order of preference.
+    """
+    return [name for name, (_, available) in BACKENDS.items() if available]
+
+
+def get_decoder(name: Optional[str] = None) -> JsonDecoder:
+    """
+    Returns a decoder instance.
+
+    Args:
+        name: Backend name ("orjson", "msgspec" or "json"). Defaults to the
+          preferred installed backend.
+    """
+    if name is None:
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown decoder backend: {name}")
+
+    decoder_class, available = BACKENDS[name]
+    if not available:
+        raise ImportError(f"Decoder backend '{name}' is not installed.")
+    return decoder_class()
+
+
+def compile_classification_screen(classifications: Iterable[str]) -> Pattern[bytes]:
+    """
+    Compiles a bytes regex matching '"classification": "<VALUE>"' for any of
+    the given values. Searching the raw payload with it tells whether a frame
+    contains one of those classes without decoding it. "sub_classification"
+    keys do not match, since the pattern requires a quote right before
+    "classification".
+
+    Args:
+        classifications: Classification values to look for, e.g. {"PERSON"}.
+    """
+    values = b"|".join(re.escape(c.encode("utf-8")) for c in sorted(classifications))
+    return re.compile(rb'"classification"\s*:\s*"(?:' + values + rb')"')
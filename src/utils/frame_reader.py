@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-08
+
+import socket
+from typing import Iterator, Optional
+
+# Ouster Gemini Detect framing: every payload is preceded by a 4-byte
+# big-endian size indicator.
+ENDIAN_TYPE = "big"
+FRAME_SIZE_B = 4
+
+# Initial size of the reusable receive buffer. Grows (doubles) only when a
+# single frame does not fit.
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+class FrameReader:
+    """
+    Buffered reader for the length-prefixed Gemini Detect TCP stream.
+
+    All bytes are received with recv_into() straight into one reusable
+    bytearray, the 4-byte size indicators are parsed inside that buffer,
+    and each payload is handed out as a memoryview slice of it. No per-frame
+    bytes objects are built on the receive path.
+
+    The memoryview returned by read_frame() is only valid until the next
+    call to read_frame(); callers that need to keep a payload must copy it.
+    """
+    def __init__(self, socket_client: socket.socket, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.socket_client = socket_client
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # First unread byte in the buffer.
+        self._end = 0    # One past the last received byte.
+        self.frames_read = 0
+        self.bytes_read = 0
+
+
+    def _compact(self) -> None:
+        """
+        Moves the unread bytes to the front of the buffer.
+        """
+        pending = self._end - self._start
+        if pending and self._start:
+            self._view[:pending] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = pending
+
+
+    def _grow(self, min_size: int) -> None:
+        """
+        Replaces the buffer with a larger one holding the unread bytes.
+        A new bytearray is allocated instead of resizing in place, because
+        payload views handed out earlier may still export the old buffer.
+        """
+        new_size = len(self._buffer)
+        while new_size < min_size:
+            new_size *= 2
+
+        pending = self._end - self._start
+        new_buffer = bytearray(new_size)
+        new_view = memoryview(new_buffer)
+        new_view[:pending] = self._view[self._start:self._end]
+
+        self._buffer = new_buffer
+        self._view = new_view
+        self._start = 0
+        self._end = pending
+
+
+    def _fill(self, num_bytes: int) -> bool:
+        """
+        Ensures at least num_bytes unread bytes are buffered.
+
+        Return:
+            True on success, False on EOF, timeout or connection reset.
+        """
+        if self._end - self._start >= num_bytes:
+            return True
+
+        if len(self._buffer) < num_bytes:
+            self._grow(num_bytes)
+        elif len(self._buffer) - self._start < num_bytes:
+            self._compact()
+
+        while self._end - self._start < num_bytes:
+            try:
+                received = self.socket_client.recv_into(self._view[self._end:])
+            except (socket.timeout, ConnectionResetError):
+                return False
+            if not received:
+                return False
+            self._end += received
+            self.bytes_read += received
+        return True
+
+
+    def read_frame(self) -> Optional[memoryview]:
+        """
+        Reads the next frame from the stream.
+
+        Return:
+            A memoryview over the frame payload, or None if the connection
+            was closed or reset.
+        """
+        if not self._fill(FRAME_SIZE_B):
+            return None
+
+        frame_size = int.from_bytes(self._view[self._start:self._start + FRAME_SIZE_B], ENDIAN_TYPE)
+        self._start += FRAME_SIZE_B
+
+        if not self._fill(frame_size):
+            return None
+
+        payload = self._view[self._start:self._start + frame_size]
+        self._start += frame_size
+        self.frames_read += 1
+        return payload
+
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """
+        Yields frame payloads until the connection is closed.
+        """
+        while True:
+            payload = self.read_frame()
+            if payload is None:
+                return
+            yield payload
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-21
+
+"""
+Pre-event ring buffer of raw frame payloads.
+
+While no session is active, VruDetector.should_decode() stores every
+payload here, still undecoded. When a VRU starts a session, flush() hands
+the last `capacity` payloads to the LidarBuffer so the saved session also
+covers the lead-up to the event.
+
+All memory is allocated up front: two byte arenas of capacity *
+frame_bytes bytes, each with an offset/length table of capacity entries.
+append() copies the payload (the receive buffer view it comes from is
+reused for the next frame) into the active arena right after the newest
+frame, or at the arena start when it does not fit before the end, and
+drops the oldest frames it overlaps; the oldest frame is also dropped once
+capacity frames are stored. Payloads are packed by their actual length, so
+a dense frame well above the average fits as long as the whole window
+does. flush() returns memoryviews into the active arena, oldest first, and
+switches to the other arena, so nothing is copied on flush and the views
+stay valid until the next flush(). Memory use is 2 * capacity *
+frame_bytes bytes however long the stream runs.
+"""
+
+from array import array
+from typing import Any, Dict, List
+
+# Arena bytes per frame of capacity. Payloads are packed by length, so this
+# is the average a full window may use, not a limit on one frame; only a
+# payload larger than the whole arena is not kept (frames_too_large).
+FRAME_BYTES = 128 * 1024
+
+
+class FrameRing:
+    """
+    stats:
+        frames_stored       payloads appended
+        frames_overwritten  payloads dropped for newer ones before a flush
+        frames_too_large    payloads larger than the arena, not kept
+        frames_flushed      payloads handed out by flush()
+    """
+    def __init__(self, capacity: int, frame_bytes: int = FRAME_BYTES):
+        """
+        Args:
+            capacity: Number of frames kept (e.g. seconds * 10 Hz).
+            frame_bytes: Arena bytes per frame; the arena holds
+              capacity * frame_bytes bytes of payloads.
+        """
+        self.capacity = capacity
+        self.arena_size = capacity * frame_bytes
+        self._arenas = [bytearray(self.arena_size) for _ in range(2)]
+        self._views = [memoryview(arena) for arena in self._arenas]
+        self._offsets = [array("I", bytes(4 * capacity)) for _ in range(2)]
+        self._lengths = [array("I", bytes(4 * capacity)) for _ in range(2)]
+        self._active = 0
+        self._head = 0   # Next table entry to write
+        self._count = 0  # Entries holding a frame
+        self.stats: Dict[str, int] = {
+            'frames_stored': 0,
+            'frames_overwritten': 0,
+            'frames_too_large': 0,
+            'frames_flushed': 0
+        }
+
+
+    def __len__(self) -> int:
+        return self._count
+
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes allocated for the payloads (constant)."""
+        return 2 * self.arena_size
+
+
+    def _drop_oldest(self) -> None:
+        self._count -= 1
+        self.stats['frames_overwritten'] += 1
+
+
+    def append(self, payload: Any) -> bool:
+        """
+        Copies a payload (bytes or memoryview) into the ring.
+
+        Return:
+            False if the payload was not kept (larger than the arena, or
+            capacity 0).
+        """
+        if not self.capacity:
+            return False
+        size = len(payload)
+        if size > self.arena_size:
+            self.stats['frames_too_large'] += 1
+            return False
+
+        offsets = self._offsets[self._active]
+        lengths = self._lengths[self._active]
+        if self._count == self.capacity:
+            self._drop_oldest()
+        start = 0
+        if self._count:
+            newest = (self._head - 1) % self.capacity
+            start = offsets[newest] + lengths[newest]
+        # Frames at or after the write position are the oldest, in arena
+        # order. Wrapping skips the rest of the arena and the frames in it.
+        if start + size > self.arena_size:
+            while self._count and offsets[(self._head - self._count) % self.capacity] >= start:
+                self._drop_oldest()
+            start = 0
+        while self._count and start <= offsets[(self._head - self._count) % self.capacity] < start + size:
+            self._drop_oldest()
+
+        self._views[self._active][start:start + size] = payload
+        offsets[self._head] = start
+        lengths[self._head] = size
+        self._head = (self._head + 1) % self.capacity
+        self._count += 1
+        self.stats['frames_stored'] += 1
+        return True
+
+
+    def flush(self) -> List[memoryview]:
+        """
+        Empties the ring.
+
+        Return:
+            Views of the stored payloads, oldest first, valid until the
+            next flush().
+        """
+        view = self._views[self._active]
+        offsets = self._offsets[self._active]
+        lengths = self._lengths[self._active]
+        first = (self._head - self._count) % max(self.capacity, 1)
+        payloads = []
+        for i in range(self._count):
+            entry = (first + i) % self.capacity
+            start = offsets[entry]
+            payloads.append(view[start:start + lengths[entry]])
+
+        self.stats['frames_flushed'] += self._count
+        self._active = 1 - self._active
+        self._head = 0
+        self._count = 0
+        return payloads
+
+
+    def clear(self) -> None:
+        self._head = 0
+        self._count = 0
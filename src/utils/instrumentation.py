@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-14
+
+"""
+Lightweight per-stage latency instrumentation.
+
+Stages are timed with a context manager or a decorator:
+
+    with timer("frame_decode"):
+        data = parse_frame(payload)
+
+    @timed("message_send")
+    def send_broadcast_message(...): ...
+
+or with record(stage, seconds) for durations measured elsewhere (e.g. the
+LLM prefill/decode split). Each stage has an HDR-style log-linear latency
+histogram in microseconds: exact below 256 us, then 128 sub-buckets per
+power of two, i.e. under 0.8% relative error up to an hour, with O(1)
+recording.
+
+When disabled (enable(False)), timer() returns a shared no-op context
+manager and timed() calls the function straight through, so the cost is
+one flag check.
+
+Export:
+    format_summary()     text table of count / mean / p50 / p90 / p99 / max
+    prometheus_text()    Prometheus text exposition (histogram per stage)
+    serve(port)          /metrics endpoint on a local HTTP server thread
+    start_periodic_summary(interval_s, emit)
+"""
+
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+# Histogram resolution: values below 2**SUB_BUCKET_BITS us are exact, larger
+# ones fall into 2**(SUB_BUCKET_BITS - 1) buckets per power of two.
+SUB_BUCKET_BITS = 8
+
+# Largest recorded value; longer durations are clamped to it.
+MAX_VALUE_US = 3600 * 10**6
+
+# Bucket bounds of the Prometheus export, in seconds.
+PROMETHEUS_BUCKETS_S = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                        0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Local metrics endpoint.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+
+METRIC_NAME = "shield_rsu_stage_latency_seconds"
+
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF = _SUB_BUCKETS // 2
+
+
+def _bucket_index(value_us: int) -> int:
+    if value_us < _SUB_BUCKETS:
+        return value_us
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    return _SUB_BUCKETS + (shift - 1) * _HALF + (value_us >> shift) - _HALF
+
+
+def _bucket_bounds(index: int):
+    """(lowest value, width) of a bucket."""
+    if index < _SUB_BUCKETS:
+        return index, 1
+    shift = (index - _SUB_BUCKETS) // _HALF + 1
+    sub = (index - _SUB_BUCKETS) % _HALF + _HALF
+    return sub << shift, 1 << shift
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in microseconds.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0] * (_bucket_index(MAX_VALUE_US) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+
+    def record_us(self, value_us: int) -> None:
+        value_us = min(max(int(value_us), 0), MAX_VALUE_US)
+        with self._lock:
+            self.counts[_bucket_index(value_us)] += 1
+            self.count += 1
+            self.total_us += value_us
+            if self.min_us is None or value_us < self.min_us:
+                self.min_us = value_us
+            if value_us > self.max_us:
+                self.max_us = value_us
+
+
+    def percentile(self, q: float) -> float:
+        """q-th percentile (0-100) in microseconds, to bucket resolution."""
+        if self.count == 0:
+            return 0.0
+        target = max(1, -(-self.count * q // 100))  # ceil
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                low, width = _bucket_bounds(index)
+                return float(min(max(low + (width - 1) / 2, self.min_us), self.max_us))
+        return float(self.max_us)
+
+
+    def count_at_or_below(self, value_us: float) -> int:
+        """Number of values in buckets up to the one holding value_us."""
+        last = _bucket_index(min(int(value_us), MAX_VALUE_US))
+        return sum(self.counts[:last + 1])
+
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.count = 0
+            self.total_us = 0
+            self.min_us = None
+            self.max_us = 0
+
+
+    def summary(self) -> Dict[str, float]:
+        """count plus mean / p50 / p90 / p99 / max in milliseconds."""
+        return {
+            'count': self.count,
+            'mean_ms': self.total_us / self.count / 1e3 if self.count else 0.0,
+            'p50_ms': self.percentile(50) / 1e3,
+            'p90_ms': self.percentile(90) / 1e3,
+            'p99_ms': self.percentile(99) / 1e3,
+            'max_ms': self.max_us / 1e3,
+        }
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record_us((time.perf_counter_ns() - self.start) // 1000)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Instrumentation:
+    """
+    Registry of stage histograms.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(stage))
+        return histogram
+
+
+    def timer(self, stage: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+
+    def timed(self, stage: str) -> Callable:
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.histogram(stage).record_us((time.perf_counter_ns() - start) // 1000)
+            return wrapper
+        return decorate
+
+
+    def record(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(stage).record_us(seconds * 1e6)
+
+
+    def summary(self, reset: bool = False) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, histogram in sorted(list(self.histograms.items())):
+            result[stage] = histogram.summary()
+            if reset:
+                histogram.reset()
+        return result
+
+
+    def format_summary(self, reset: bool = False) -> str:
+        lines = [f"{'stage':<16} {'count':>8} {'mean ms':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for stage, s in self.summary(reset).items():
+            lines.append(f"{stage:<16} {s['count']:>8} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} "
+                         f"{s['p90_ms']:>9.3f} {s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}")
+        return "\n".join(lines)
+
+
+    def prometheus_text(self) -> str:
+        lines = [f"# HELP {METRIC_NAME} Latency of each SHIELD-RSU pipeline stage.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        for stage, histogram in sorted(list(self.histograms.items())):
+            label = f'stage="{stage}"'
+            for bound_s in PROMETHEUS_BUCKETS_S:
+                lines.append(f'{METRIC_NAME}_bucket{{{label},le="{bound_s:g}"}} '
+                             f'{histogram.count_at_or_below(bound_s * 1e6)}')
+            lines.append(f'{METRIC_NAME}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f'{METRIC_NAME}_sum{{{label}}} {histogram.total_us / 1e6:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{{label}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+    def serve(self, port: int = METRICS_PORT, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+        """
+        Serves prometheus_text() at http://host:port/metrics from a daemon
+        thread. Call shutdown() on the returned server to stop it.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # No access log per scrape.
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+    def start_periodic_summary(self,
+                               interval_s: float,
+                               emit: Callable[[str], Any] = print,
+                               stop: Optional[threading.Event] = None) -> threading.Event:
+        """
+        Emits format_summary() every interval_s seconds from a daemon thread
+        until the returned (or given) event is set.
+        """
+        stop = stop or threading.Event()
+
+        def run():
+            while not stop.wait(interval_s):
+                if self.histograms:
+                    emit(self.format_summary())
+
+        threading.Thread(target=run, name="metrics-summary", daemon=True).start()
+        return stop
+
+
+# Process-wide registry and its shortcuts.
+REGISTRY = Instrumentation()
+
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+record = REGISTRY.record
+summary = REGISTRY.summary
+format_summary = REGISTRY.format_summary
+prometheus_text = REGISTRY.prometheus_text
+serve = REGISTRY.serve
+start_periodic_summary = REGISTRY.start_periodic_summary
+
+
+def enable(enabled: bool = True) -> None:
+    REGISTRY.enabled = enabled
+
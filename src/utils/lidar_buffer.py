@@ -2,14 +2,22 @@
 # Author: Fengze Yang <fred.yang@utah.edu>
 # Date: 2025-03-31
 
-import json
 import os
 import time
 import subprocess
-import threading
-import copy
 import uuid
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from batch_writer import BatchWriter, shared_writer
+from bev_renderer import FRAMERATE, BevRenderer
+from frame_decoder import DECODE_ERRORS, get_decoder
+from instrumentation import timer
+from segment_recorder import SegmentRecorder, shared_recorder
+from session_store import SESSION_SUFFIX, SessionWriter
+
+# Computed and ffprobe-measured video durations may differ by this many
+# seconds (one capture segment) before the audit reports the batch.
+AUDIT_TOLERANCE_S = 1.0
 
 
 class LidarBuffer:
@@ -18,7 +26,12 @@ class LidarBuffer:
                  max_frames: int,
                  min_video_duration: int,
                  capture_area: Tuple[int, int, int, int] = (1920, 1080, 0, 0),
-                 session_counters: Dict[str, int] = None):
+                 session_counters: Dict[str, int] = None,
+                 session_codec: Optional[str] = None,
+                 batch_writer: Optional[BatchWriter] = None,
+                 recorder: Optional[SegmentRecorder] = None,
+                 renderer: Optional[BevRenderer] = None,
+                 audit_video: bool = False):
         """
         Initialize LidarBuffer with an optional capture area and max frames setting.
         
@@ -30,13 +43,30 @@ class LidarBuffer:
               at (0, 0).
             session_counters: Dictionary with session counting stats, should have
               'total_sessions', 'valid_sessions', and 'current_session_valid' keys.
+            session_codec: Compression of the saved session files ("zstd", "lz4"
+              or "none"), None for the preferred installed codec. See session_store.py.
+            batch_writer: Writer thread that saves the batches, None for the
+              process-wide shared_writer().
+            recorder: Continuous segmented screen capture the batch videos are
+              cut from, None for the process-wide shared_recorder().
+            renderer: Draws the batch videos from the batch's own frames
+              instead (no screen capture, no display needed); the recorder
+              is then not used.
+            audit_video: Also measure every batch video with ffprobe and report
+              lengths that differ from the computed batch duration.
         """
         self.capture_area = capture_area  # (width, height, offset_x, offset_y)
         self.raw_data = []  # List to accumulate raw frames from incoming JSON data
         self.recording_active = False
-        self.recording_process = None
+        self.batch_started_at = None  # Wall-clock start of the current batch's video
         self.max_frames = max_frames  # Maximum number of frames before saving batch
         self.min_video_duration = min_video_duration  # Minimum video duration in seconds
+        self.audit_video = audit_video
+        self.session_codec = session_codec
+        self.batch_writer = batch_writer or shared_writer()
+        self.pending_saves = []  # Futures of this buffer's batches
+        self.renderer = renderer
+        self.recorder = None if renderer is not None else recorder or shared_recorder(capture_area)
         
         # Session tracking - using externally provided counters if available
         self.session_counters = session_counters or {
@@ -77,62 +107,56 @@ class LidarBuffer:
 
     def start_screen_recording(self):
         """
-        Starts screen recording using ffmpeg on screen 1.
-        Generates a unique temporary video path for each recording session.
+        Starts the session's video: the segmented screen capture on screen 1
+        is launched unless it is already running (see segment_recorder.py),
+        and the current time marks the start of the first batch. With a
+        renderer, nothing is captured; the videos are drawn when saved.
+        Generates a unique temporary video path for the batch video.
         
         Return:
             Path to the temporary video file or None if recording fails
         """
-        if not self.recording_active:
-            print("Starting screen recording.")
-            
-            # Generate a new temporary video path
-            temp_video_path = self._generate_temp_video_path()
-            print(f"Recording to temporary file: {temp_video_path}")
-
-            width, height, offset_x, offset_y = self.capture_area
-
-            # Use screen 1: note the input string is ":1.0+{offset_x},{offset_y}"
-            ffmpeg_cmd = [
-                "ffmpeg", "-y", "-video_size", f"{width}x{height}", "-framerate", "30",
-                "-f", "x11grab", "-i", f":1.0+{offset_x},{offset_y}", temp_video_path
-            ]
-            try:
-                self.recording_process = subprocess.Popen(
-                    ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-                )
-                self.recording_active = True
-                print("Screen recording started.")
-                
-                # Reset session validity for the new recording
-                self.session_counters['current_session_valid'] = False
-                
-                return temp_video_path
-            except Exception as e:
-                print(f"Failed to start screen recording: {e}")
-                return None
-        else:
+        if self.recording_active:
             print("Screen recording is already active.")
             return None
 
+        if self.recorder is not None and not self.recorder.start():
+            return None
+
+        temp_video_path = self._generate_temp_video_path()
+        print(f"Recording to temporary file: {temp_video_path}")
+        self.batch_started_at = time.time()
+        self.recording_active = True
+
+        # Reset session validity for the new recording
+        self.session_counters['current_session_valid'] = False
+
+        return temp_video_path
+
 
     def stop_screen_recording(self):
         """
-        Stops the screen recording by terminating the ffmpeg process.
+        Ends the session's video. The capture process keeps running for the
+        next session.
+
+        Return:
+            (start, end) wall-clock times of the last batch's video, or None.
         """
-        if self.recording_active and self.recording_process:
-            print("Stopping screen recording.")
-            try:
-                self.recording_process.terminate()
-                self.recording_process.wait(timeout=5)
-                print("Screen recording stopped.")
-            except Exception as e:
-                print(f"Error stopping screen recording: {e}")
-            finally:
-                self.recording_active = False
-                self.recording_process = None
-        else:
+        if not self.recording_active:
             print("No active screen recording to stop.")
+            return None
+        self.recording_active = False
+        return self._end_batch_span()
+
+
+    def _end_batch_span(self):
+        """
+        Closes the current batch's time span; the next batch starts now.
+        """
+        now = time.time()
+        span = (self.batch_started_at, now) if self.batch_started_at is not None else None
+        self.batch_started_at = now
+        return span
 
 
     def add_data(self, incoming_data: Dict[str, Any], video_path: str = None):
@@ -148,15 +172,16 @@ class LidarBuffer:
                     ...
                 ]
             }
-        After adding, if more than max_frames are accumulated, the current batch is saved
-        in the background and a new recording is started immediately.
+        After adding, if more than max_frames are accumulated, the current batch is handed
+        to the batch writer as is (the buffer starts a new list instead of copying it) and
+        the next batch's video starts where this one ends, without restarting the capture.
         
         Args:
             incoming_data: JSON data to add to the buffer
             video_path: Current video path associated with this data
             
         Returns:
-            The current video path or a new video path if recording was restarted
+            The current video path or a new video path if a new batch was started
         """
         if "object_list" not in incoming_data:
             return video_path
@@ -167,34 +192,88 @@ class LidarBuffer:
         # If more than max_frames frames have been accumulated, save the current batch.
         if len(self.raw_data) > self.max_frames:
             print(f"Raw data length exceeded {self.max_frames} frames. Saving current batch in background...")
-            # Stop the current screen recording.
-            self.stop_screen_recording()
-
-            # Make a deep copy of raw_data for saving.
-            data_to_save = copy.deepcopy(self.raw_data)
+            # Hand the batch and its video time span over to the writer thread and start a new one.
+            batch_span = self._end_batch_span() if self.recording_active else None
+            data_to_save = self.raw_data
+            self.raw_data = []
+            self.pending_saves.append(
+                self.batch_writer.submit(self._save_batch, data_to_save, video_path, batch_span))
+
+            return self._generate_temp_video_path() if self.recording_active else None
             
-            # Clear the current buffer for the new session.
-            self.raw_data.clear()
+        return video_path
 
-            # Start background saving.
-            threading.Thread(target=self._save_batch,
-                             args=(data_to_save, video_path), 
-                             daemon=True).start()
 
-            # Start a new recording immediately.
-            new_video_path = self.start_screen_recording()
-            
-            return new_video_path
-            
-        return video_path
+    def add_pre_event(self, payloads: List[Any]) -> int:
+        """
+        Puts the frames received before the session started (raw payloads
+        from a FrameRing, oldest first) at the front of the buffer. They are
+        decoded here, as idle frames are not decoded on arrival; heartbeats
+        and invalid payloads are skipped. The start of the current batch's
+        video is moved back by the time the frames cover.
+
+        Returns:
+            Number of object_list entries added.
+        """
+        decoder = get_decoder()
+        entries = []
+        for payload in payloads:
+            try:
+                data = decoder.decode(payload)
+            except DECODE_ERRORS:
+                continue
+            if isinstance(data, dict):
+                entries.extend(data.get("object_list", []))
 
+        self.raw_data[:0] = entries
+        print(f"Added {len(entries)} pre-event frames")
 
-    def _validate_video_duration(self, video_path):
+        # The screen capture ran during the pre-event frames too; start the
+        # batch's video with them so video and frames cover the same time.
+        if entries and self.recording_active and self.batch_started_at is not None:
+            self.batch_started_at -= self._batch_duration(entries)
+        return len(entries)
+
+
+    def _batch_duration(self, data_to_save, batch_span=None) -> float:
+        """
+        Seconds of data a batch covers, computed from the batch itself: the span
+        of its frame timestamps (microseconds) plus one frame period, or of its
+        frame_counts if timestamps are missing, at FRAMERATE frames per second.
+        If the video was cut from the screen capture, it covers no more than
+        the capture's (start, end) span, so the shorter of the two is used.
+
+        Args:
+            data_to_save: List of raw frames of the batch
+            batch_span: (start, end) wall-clock times of the batch's video
+
+        Return:
+            Duration in seconds.
+        """
+        frames = [frame for frame in data_to_save if frame.get("frame_count") is not None]
+        if not frames:
+            return 0.0
+
+        first, last = frames[0], frames[-1]
+        if first.get("timestamp") is not None and last.get("timestamp") is not None:
+            duration = (last["timestamp"] - first["timestamp"]) / 1e6 + 1 / FRAMERATE
+        else:
+            duration = (last["frame_count"] - first["frame_count"] + 1) / FRAMERATE
+
+        if batch_span is not None and self.recorder is not None:
+            duration = min(duration, batch_span[1] - batch_span[0])
+        return duration
+
+
+    def _validate_video_duration(self, video_path, duration):
         """
         Validates if the recorded video meets the minimum duration requirement.
+        The duration comes from _batch_duration(), so no video is parsed; with
+        audit_video, ffprobe also measures the video and mismatches are reported.
         
         Args:
-            video_path: Path to the video file to validate
+            video_path: Path to the video file (or PNG sequence directory) to validate
+            duration: Duration of the batch in seconds
         
         Return:
             True if video is valid, False otherwise.
@@ -203,6 +282,23 @@ class LidarBuffer:
             print(f"Screen recording file not found: {video_path}")
             return False
 
+        if self.audit_video and not os.path.isdir(video_path):
+            self._audit_video_duration(video_path, duration)
+
+        if duration < self.min_video_duration:
+            print(f"Video length ({duration:.2f} seconds) is less than {self.min_video_duration} seconds. Moving to invalid videos directory.")
+            return False
+        return True
+
+
+    def _audit_video_duration(self, video_path, duration):
+        """
+        Measures the video with ffprobe and reports it if its length differs
+        from the computed duration by more than AUDIT_TOLERANCE_S.
+
+        Return:
+            The measured duration in seconds, or None if ffprobe failed.
+        """
         try:
             ffprobe_cmd = [
                 "ffprobe", "-v", "error", "-show_entries", "format=duration",
@@ -212,25 +308,24 @@ class LidarBuffer:
                                     stdout=subprocess.PIPE, 
                                     stderr=subprocess.PIPE, 
                                     text=True)
-            
-            duration_str = result.stdout.strip()
-            duration = float(duration_str)
-
-            if duration < self.min_video_duration:
-                print(f"Video length ({duration:.2f} seconds) is less than {self.min_video_duration} seconds. Moving to invalid videos directory.")
-                return False
-            return True
+            probed = float(result.stdout.strip())
         except Exception as e:
-            print(f"Error checking video duration: {e}")
-            return False
+            print(f"Error auditing video duration: {e}")
+            return None
+
+        if abs(probed - duration) > AUDIT_TOLERANCE_S:
+            print(f"Video audit: {video_path} is {probed:.2f} seconds long, batch covers {duration:.2f} seconds.")
+        return probed
 
 
-    def _save_json_data(self, identifier: str, data_to_save, is_valid=True):
+    def _save_session_data(self, identifier: str, data_to_save, is_valid=True):
         """
-        Saves each raw JSON frame as a separate file in a folder named with the identifier.
+        Saves the raw JSON frames as one packed session file named with the
+        identifier (compact records plus a frame_count index, see
+        session_store.py).
         
         Args:
-            identifier: Folder name to use (first frame's frame_count).
+            identifier: File name to use (first frame's frame_count).
             data_to_save: List of raw frames (dictionaries) to save.
             is_valid: Whether to save to the valid or invalid directory.
         """
@@ -238,28 +333,22 @@ class LidarBuffer:
             base_dir = os.path.join("data", "object_lists")
         else:
             base_dir = os.path.join("data", "invalid_objects")
-            
-        json_folder = os.path.join(base_dir, identifier)
-        os.makedirs(json_folder, exist_ok=True)
-
-        for frame in data_to_save:
-            frame_count = frame.get("frame_count")
 
-            if frame_count is None:
-                continue
-
-            key = str(frame_count)
-            json_path = os.path.join(json_folder, f"{key}.json")
+        session_path = os.path.join(base_dir, f"{identifier}{SESSION_SUFFIX}")
 
-            with open(json_path, "w") as f:
-                json.dump(frame, f, indent=4)
+        with SessionWriter(session_path, self.session_codec) as writer:
+            for frame in data_to_save:
+                if frame.get("frame_count") is None:
+                    continue
+                writer.append(frame)
 
-            print(f"Saved JSON for frame {key} to {json_path}")
+        print(f"Saved {len(writer.index)} frames ({writer.codec.name}) to {session_path}")
 
 
     def _save_video_file(self, identifier: str, video_path: str, is_valid=True):
         """
-        Moves the temporary video file to its final location with the identifier as filename.
+        Moves the temporary video file (or PNG sequence directory) to its final location
+        with the identifier as filename, keeping its extension.
         
         Args:
             identifier: Filename to use for the saved video (first frame's frame_count).
@@ -275,7 +364,7 @@ class LidarBuffer:
         else:
             target_dir = os.path.join("data", "invalid_videos")
             
-        final_video_path = os.path.join(target_dir, f"{identifier}.mp4")
+        final_video_path = os.path.join(target_dir, identifier + os.path.splitext(video_path)[1])
         
         try:
             os.rename(video_path, final_video_path)
@@ -285,12 +374,13 @@ class LidarBuffer:
             print(f"Error saving screen recording: {e}")
 
 
-    def _save_batch(self, data_to_save, video_path):
+    def _save_batch(self, data_to_save, video_path, batch_span=None):
         """
         Saves a batch of accumulated frames.
         Uses the frame_count of the first frame in the batch as the identifier.
-        Checks the video duration; if valid, saves JSON files under data/object_lists
-        (in a folder named with the identifier) and moves the temporary video file
+        Renders the batch's video from its frames, or exports it from the recorded
+        segments, then checks the batch duration (from its frames); if valid, saves the frames under data/object_lists
+        (in a session file named with the identifier) and moves the temporary video file
         into data/videos using the identifier.
         
         If invalid, saves to data/invalid_videos and data/invalid_objects instead.
@@ -298,6 +388,7 @@ class LidarBuffer:
         Args:
             data_to_save: List of raw frames to save
             video_path: Path to the temporary video file associated with this batch
+            batch_span: (start, end) wall-clock times of the batch's video
         """
         if not data_to_save:
             print("No data to save in batch.")
@@ -310,24 +401,32 @@ class LidarBuffer:
             print("First frame in batch does not have a frame_count.")
             return
 
-        # Validate video duration.
-        is_valid = self._validate_video_duration(video_path)
-        
-        # Mark session as having a valid batch if at least one batch is valid
-        if is_valid:
-            self.session_counters['current_session_valid'] = True
+        with timer("batch_save"):
+            # Draw the batch's video, or cut it out of the recorded segments.
+            if video_path and self.renderer is not None:
+                video_path = self.renderer.write_video(data_to_save, video_path)
+            elif video_path and batch_span is not None:
+                self.recorder.export(*batch_span, video_path)
 
-        # Save JSON data
-        self._save_json_data(first_key, data_to_save, is_valid)
-        
-        # Save video file
-        self._save_video_file(first_key, video_path, is_valid)
+            # Validate video duration.
+            is_valid = self._validate_video_duration(video_path, self._batch_duration(data_to_save, batch_span))
+
+            # Mark session as having a valid batch if at least one batch is valid
+            if is_valid:
+                self.session_counters['current_session_valid'] = True
+
+            # Save JSON data
+            self._save_session_data(first_key, data_to_save, is_valid)
+
+            # Save video file
+            self._save_video_file(first_key, video_path, is_valid)
 
 
     def stop_recording(self, video_path=None):
         """
         Finalizes the recording by stopping the screen recording and saving any
-          remaining frames.
+          remaining frames. Waits until the writer has saved all of this buffer's
+          batches, as the session's validity depends on them.
         
         Args:
             video_path: Path to the current video file (if not provided, nothing
@@ -336,15 +435,19 @@ class LidarBuffer:
         Returns:
             True if the session had at least one valid batch, False otherwise
         """
-        self.stop_screen_recording()
+        batch_span = self.stop_screen_recording()
         
         if self.raw_data:
             print("Final save of remaining frames...")
-            
-            # Save remaining frames directly (not in background) for this final save
-            data_to_save = copy.deepcopy(self.raw_data)
-            self.raw_data.clear()
-            self._save_batch(data_to_save, video_path)
+            data_to_save = self.raw_data
+            self.raw_data = []
+            self.pending_saves.append(
+                self.batch_writer.submit(self._save_batch, data_to_save, video_path, batch_span))
+
+        # The session's validity is known once all of its batches are saved.
+        for future in self.pending_saves:
+            future.exception()  # Waits; errors are counted by the writer
+        self.pending_saves = []
         
         # Return the current session validity 
         session_valid = self.session_counters['current_session_valid']
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-16
+
+"""
+Replay of recorded Gemini Detect frames as a live sensor stream.
+
+Recordings are read from:
+- a session file written by LidarBuffer (data/object_lists/<id>.frames,
+  see session_store.py),
+- a session folder of the older per-frame layout
+  (data/object_lists/<id>/<frame_count>.json, one object_list entry each),
+- an object_lists folder holding several sessions, replayed in order,
+- a JSON file with an object_list message (e.g. data/example_object_list.json),
+- a packed capture file (see write_capture()): the raw length-prefixed
+  stream, as received from the sensor.
+
+Every entry is served as its own {"object_list": [entry]} message over the
+sensor's 4-byte length-prefixed framing, on TLS or plain TCP. Frames are
+spaced by their recorded timestamps divided by speed (1 = real time, 0 =
+as fast as the client reads). With drop_late, frames due while the client
+is still behind are dropped, like a sensor that does not wait for slow
+readers, and counted in frames_dropped. Run from the src directory:
+
+    python utils/replay_server.py ../data/object_lists/1234.frames --speed 2 --port 3302
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fake_sensor import FakeSensorServer, encode_frame, make_self_signed_contexts
+from frame_reader import ENDIAN_TYPE, FRAME_SIZE_B
+from session_store import SESSION_SUFFIX, read_session
+
+# Extension of packed capture files.
+CAPTURE_SUFFIX = ".bin"
+
+# Gap used for frames without a usable timestamp, and before looping back to
+# the first frame (the sensor runs at 10 Hz).
+DEFAULT_GAP_S = 0.1
+
+# Longest replayed gap; pauses in a recording (e.g. between sessions) are
+# shortened to it.
+MAX_GAP_S = 1.0
+
+# With drop_late, frames are dropped while this many bytes are still waiting
+# in the socket's send buffer.
+MAX_BACKLOG_B = 256 * 1024
+
+
+def _messages_from(data: Any) -> List[Dict[str, Any]]:
+    """Splits decoded JSON into one object_list message per entry."""
+    if isinstance(data, dict) and "object_list" in data:
+        return [{"object_list": [entry]} for entry in data["object_list"]]
+    if isinstance(data, dict) and "objects" in data:
+        return [{"object_list": [data]}]
+    return []  # Heartbeats and anything else
+
+
+def _frame_key(path: str):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return (0, int(name), name) if name.isdigit() else (1, 0, name)
+
+
+def read_capture(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads the messages of a packed capture file, skipping heartbeats.
+    """
+    messages = []
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(FRAME_SIZE_B)
+            if len(header) < FRAME_SIZE_B:
+                break
+            payload = f.read(int.from_bytes(header, ENDIAN_TYPE))
+            try:
+                messages.extend(_messages_from(json.loads(payload)))
+            except ValueError:
+                continue  # Truncated or invalid frame
+    return messages
+
+
+def write_capture(path: str, messages: Iterable[Dict[str, Any]]) -> int:
+    """
+    Packs messages into a capture file in the sensor's wire format.
+
+    Return:
+        Number of frames written.
+    """
+    count = 0
+    with open(path, "wb") as f:
+        for message in messages:
+            f.write(encode_frame(message))
+            count += 1
+    return count
+
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """
+    Loads a recording (see the module docstring) as a list of
+    {"object_list": [entry]} messages in replay order.
+    """
+    if os.path.isfile(path):
+        if path.endswith(CAPTURE_SUFFIX):
+            return read_capture(path)
+        if path.endswith(SESSION_SUFFIX):
+            return [{"object_list": [entry]} for entry in read_session(path)]
+        with open(path) as f:
+            return _messages_from(json.load(f))
+
+    files = sorted((os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json")),
+                   key=_frame_key)
+    if files:
+        messages = []
+        for file_path in files:
+            with open(file_path) as f:
+                messages.extend(_messages_from(json.load(f)))
+        return messages
+
+    # Folder of session files and folders
+    messages = []
+    for name in sorted(os.listdir(path), key=_frame_key):
+        if os.path.isdir(os.path.join(path, name)) or name.endswith(SESSION_SUFFIX):
+            messages.extend(load_recording(os.path.join(path, name)))
+    return messages
+
+
+def recorded_gaps(messages: Sequence[Dict[str, Any]]) -> List[float]:
+    """
+    Seconds between each message and the next one from the entries'
+    timestamps (microseconds), clamped to [0, MAX_GAP_S]. The last gap,
+    before looping back, is DEFAULT_GAP_S.
+    """
+    timestamps = []
+    for message in messages:
+        entries = message.get("object_list") or [{}]
+        timestamps.append(entries[0].get("timestamp"))
+
+    gaps = []
+    for current, following in zip(timestamps, timestamps[1:]):
+        if isinstance(current, (int, float)) and isinstance(following, (int, float)):
+            gaps.append(min(max((following - current) / 1e6, 0.0), MAX_GAP_S))
+        else:
+            gaps.append(DEFAULT_GAP_S)
+    gaps.append(DEFAULT_GAP_S)
+    return gaps
+
+
+class ReplayServer(FakeSensorServer):
+    """
+    FakeSensorServer that spaces frames by their recorded timestamps.
+    """
+    def __init__(self,
+                 messages: Sequence[Dict[str, Any]],
+                 speed: Optional[float] = 1.0,
+                 drop_late: bool = False,
+                 max_backlog_b: int = MAX_BACKLOG_B,
+                 **kwargs):
+        """
+        Args:
+            messages: object_list messages, e.g. from load_recording().
+            speed: Replay speed factor, 0 or None for as fast as possible.
+            drop_late: Drop frames while the client is behind instead of
+              waiting for it.
+            max_backlog_b: Unsent bytes above which frames count as late.
+            kwargs: host, port, ssl_context, loop, heartbeat_every and
+              max_frames of FakeSensorServer.
+        """
+        super().__init__(messages, rate_hz=None, **kwargs)
+        self.speed = speed
+        self.gaps = recorded_gaps(messages)
+        self.max_backlog_b = max_backlog_b
+        self.wait_for_client = not drop_late
+
+
+    def _interval_after(self, index: int) -> float:
+        if not self.speed:
+            return 0.0
+        return self.gaps[index] / self.speed
+
+
+    def _skip(self, writer: asyncio.StreamWriter) -> bool:
+        if self.wait_for_client:
+            return False
+        return writer.transport.get_write_buffer_size() > self.max_backlog_b
+
+
+async def _serve(server: ReplayServer) -> None:
+    await server.start()
+    print(f"Replaying {len(server.frames)} frames on {server.host}:{server.port} "
+          f"({'TLS' if server.ssl_context else 'TCP'}, speed {server.speed or 'max'})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(f"Frames sent: {server.frames_sent}, dropped: {server.frames_dropped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="Session file or folder, object_lists folder, JSON or capture file.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 0 for as fast as possible.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3302)
+    parser.add_argument("--no-tls", action="store_true", help="Serve plain TCP.")
+    parser.add_argument("--once", action="store_true", help="Close each connection after one pass.")
+    parser.add_argument("--drop-late", action="store_true", help="Drop frames a slow client is not ready for.")
+    args = parser.parse_args()
+
+    messages = load_recording(args.recording)
+    if not messages:
+        parser.error(f"No frames found in {args.recording}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ssl_context = None if args.no_tls else make_self_signed_contexts(workdir)[0]
+        server = ReplayServer(messages, speed=args.speed, drop_late=args.drop_late, host=args.host,
+                              port=args.port, ssl_context=ssl_context, loop=not args.once)
+        try:
+            asyncio.run(_serve(server))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
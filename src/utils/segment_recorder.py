@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-26
+
+"""
+Continuous screen capture cut into short segments by one ffmpeg process.
+
+Instead of stopping ffmpeg at every batch rollover and launching a new one
+(a stall of up to seconds on the ingest thread, and a gap in the video),
+a single x11grab process runs ffmpeg's segment muxer: it writes
+SEGMENT_S-second files (key frame at every cut) into segment_dir and lists
+each finished one in a CSV segment list. A batch only notes the wall-clock
+time it started and ended. Its video is exported later, on the batch writer
+thread: export() waits until the segments covering that time span are
+finished, then joins them with ffmpeg's concat demuxer (stream copy, no
+re-encoding). Segments older than RETAIN_S are deleted, so disk use stays
+bounded while no session is active.
+
+The ffmpeg binary is the ffmpeg argument, else $SHIELD_RSU_FFMPEG, else
+"ffmpeg" on the PATH; tests point it to a stand-in script.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+# Environment variable overriding the ffmpeg binary.
+FFMPEG_ENV = "SHIELD_RSU_FFMPEG"
+
+# Length of one segment in seconds; batch videos are cut to this granularity.
+SEGMENT_S = 1.0
+
+# Finished segments older than this many seconds are deleted.
+RETAIN_S = 120.0
+
+# Longest wait in export() for the segments of a batch to be finished.
+EXPORT_TIMEOUT_S = 10.0
+
+# Capture frame rate.
+FRAMERATE = 30
+
+SEGMENT_LIST = "segments.csv"
+SEGMENT_PATTERN = "seg_%06d.mp4"
+
+
+class Segment(NamedTuple):
+    path: str
+    start: float  # Wall-clock seconds
+    end: float
+
+
+class SegmentRecorder:
+    """
+    stats:
+        processes_started   ffmpeg capture processes launched
+        segments_deleted    segments removed after RETAIN_S
+        exports             batch videos written
+        export_failures     batches whose video could not be exported
+    """
+    def __init__(self,
+                 capture_area: Tuple[int, int, int, int] = (1920, 1080, 0, 0),
+                 segment_dir: str = os.path.join("data", "segments"),
+                 ffmpeg: Optional[str] = None,
+                 segment_s: float = SEGMENT_S,
+                 retain_s: float = RETAIN_S,
+                 display: str = ":1.0"):
+        """
+        Args:
+            capture_area: (width, height, offset_x, offset_y) of the screen region.
+            segment_dir: Directory for the segments and the segment list.
+            ffmpeg: ffmpeg binary, defaults to $SHIELD_RSU_FFMPEG or "ffmpeg".
+            segment_s: Segment length in seconds.
+            retain_s: Age after which finished segments are deleted.
+            display: X display and screen to capture.
+        """
+        self.capture_area = capture_area
+        self.segment_dir = segment_dir
+        self.ffmpeg = ffmpeg or os.environ.get(FFMPEG_ENV, "ffmpeg")
+        self.segment_s = segment_s
+        self.retain_s = retain_s
+        self.display = display
+        self.process = None
+        self.started_at = None  # Wall-clock time of the capture start
+        self.stats = {
+            'processes_started': 0,
+            'segments_deleted': 0,
+            'exports': 0,
+            'export_failures': 0
+        }
+        self._lock = threading.Lock()
+        self._segments_lock = threading.Lock()
+        self._deleted = set()
+
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+    def _capture_command(self) -> List[str]:
+        width, height, offset_x, offset_y = self.capture_area
+        gop = max(int(FRAMERATE * self.segment_s), 1)
+        return [
+            self.ffmpeg, "-y", "-video_size", f"{width}x{height}", "-framerate", str(FRAMERATE),
+            "-f", "x11grab", "-i", f"{self.display}+{offset_x},{offset_y}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop),
+            "-force_key_frames", f"expr:gte(t,n_forced*{self.segment_s})",
+            "-f", "segment", "-segment_time", str(self.segment_s), "-reset_timestamps", "1",
+            "-segment_list", os.path.join(self.segment_dir, SEGMENT_LIST), "-segment_list_type", "csv",
+            os.path.join(self.segment_dir, SEGMENT_PATTERN)
+        ]
+
+
+    def start(self) -> bool:
+        """
+        Launches the capture process unless it is running; segments of an
+        earlier run are removed first.
+
+        Return:
+            True if the capture process is running.
+        """
+        with self._lock:
+            if self.running:
+                return True
+            os.makedirs(self.segment_dir, exist_ok=True)
+            for name in os.listdir(self.segment_dir):
+                if name.startswith("seg_") or name == SEGMENT_LIST:
+                    os.remove(os.path.join(self.segment_dir, name))
+            self._deleted.clear()
+            try:
+                self.process = subprocess.Popen(self._capture_command(), stdin=subprocess.PIPE,
+                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                print(f"Failed to start screen recording: {e}")
+                self.process = None
+                return False
+            self.started_at = time.time()
+            self.stats['processes_started'] += 1
+            threading.Thread(target=self._prune_while_running, args=(self.process,),
+                             name="segment-prune", daemon=True).start()
+            print(f"Segmented screen recording started in {self.segment_dir}")
+            return True
+
+
+    def _prune_while_running(self, process: subprocess.Popen) -> None:
+        """Deletes expired segments while no export does, e.g. between sessions."""
+        while process.poll() is None:
+            time.sleep(self.retain_s / 4)
+            self.completed_segments()
+
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stops the capture process; "q" lets ffmpeg finish the last segment.
+        """
+        with self._lock:
+            if self.process is None:
+                return
+            try:
+                self.process.communicate(b"q", timeout=timeout)
+            except (subprocess.TimeoutExpired, OSError, ValueError):
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+            print("Segmented screen recording stopped.")
+
+
+    def completed_segments(self) -> List[Segment]:
+        """
+        Finished segments in time order, read from the segment list. Also
+        deletes the ones older than retain_s.
+        """
+        list_path = os.path.join(self.segment_dir, SEGMENT_LIST)
+        if self.started_at is None or not os.path.exists(list_path):
+            return []
+
+        with self._segments_lock:
+            return self._read_and_prune(list_path)
+
+
+    def _read_and_prune(self, list_path: str) -> List[Segment]:
+        segments = []
+        with open(list_path) as f:
+            for line in f:
+                parts = line.strip().rsplit(",", 2)
+                if len(parts) != 3:
+                    continue  # Line still being written
+                name, start, end = parts
+                try:
+                    segment = Segment(os.path.join(self.segment_dir, name),
+                                      self.started_at + float(start), self.started_at + float(end))
+                except ValueError:
+                    continue
+                if segment.path not in self._deleted:
+                    segments.append(segment)
+
+        expired = time.time() - self.retain_s
+        for segment in [s for s in segments if s.end < expired]:
+            try:
+                os.remove(segment.path)
+            except FileNotFoundError:
+                pass
+            self._deleted.add(segment.path)
+            self.stats['segments_deleted'] += 1
+        return [s for s in segments if s.end >= expired]
+
+
+    def export(self, start: float, end: float, output_path: str,
+               timeout: float = EXPORT_TIMEOUT_S) -> Optional[str]:
+        """
+        Writes the video between two wall-clock times to output_path by
+        joining the segments that overlap them. Blocks until the segment
+        holding end is finished, at most timeout seconds; meant for the
+        batch writer thread.
+
+        Return:
+            output_path, or None if no segment covers the span.
+        """
+        deadline = time.monotonic() + timeout
+        segments = self.completed_segments()
+        while not any(s.end >= end for s in segments) and self.running and time.monotonic() < deadline:
+            time.sleep(min(self.segment_s / 4, 0.25))
+            segments = self.completed_segments()
+
+        covering = [s for s in segments if s.end > start and s.start < end]
+        if not covering:
+            print(f"No recorded segments between {start:.1f} and {end:.1f}")
+            self.stats['export_failures'] += 1
+            return None
+
+        concat_list = output_path + ".txt"
+        with open(concat_list, "w") as f:
+            for segment in covering:
+                f.write(f"file '{os.path.abspath(segment.path)}'\n")
+        try:
+            result = subprocess.run([self.ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                                     "-i", concat_list, "-c", "copy", output_path],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        except OSError as e:
+            print(f"Error exporting video: {e}")
+            self.stats['export_failures'] += 1
+            return None
+        finally:
+            os.remove(concat_list)
+
+        if result.returncode != 0:
+            print(f"Error exporting video: {result.stderr.strip()}")
+            self.stats['export_failures'] += 1
+            return None
+        self.stats['exports'] += 1
+        return output_path
+
+
+_shared_recorder = None
+_shared_lock = threading.Lock()
+
+
+def shared_recorder(capture_area: Tuple[int, int, int, int] = (1920, 1080, 0, 0)) -> SegmentRecorder:
+    """
+    Returns the process-wide recorder, created for capture_area on first use.
+    """
+    global _shared_recorder
+    with _shared_lock:
+        if _shared_recorder is None:
+            _shared_recorder = SegmentRecorder(capture_area)
+        return _shared_recorder
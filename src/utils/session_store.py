@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-19
+
+"""
+Packed session files: one append-only file per saved batch instead of one
+pretty-printed JSON file per frame.
+
+Layout of <identifier>.frames (integers big-endian):
+
+    header   b"SRSF" | version u8 | codec u8 | 2 reserved bytes
+    records  length u32 | payload, one per object_list entry in arrival
+             order; the payload is the compact JSON of the entry,
+             compressed on its own with the header's codec
+    index    (frame_count i64, record offset u64) per record
+    footer   index offset u64 | record count u32 | b"SRSI"
+
+Records are compressed one by one so any frame can be read without
+decompressing the ones before it. The index is written by close(); a file
+cut short (e.g. by a crash) is still readable, its index is rebuilt by
+scanning the records.
+
+Codecs, in order of preference:
+    zstd - pip install zstandard
+    lz4  - pip install lz4
+    none - always available
+get_codec() picks the first one installed.
+
+Existing data/object_lists/<identifier>/<frame_count>.json folders are
+converted with:
+
+    python utils/session_store.py convert data/object_lists [--codec zstd] [--remove]
+    python utils/session_store.py show data/object_lists/1234.frames [--frame 1240]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import struct
+from typing import Any, Dict, Iterator, List, Optional
+
+from frame_decoder import get_decoder
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SESSION_SUFFIX = ".frames"
+
+FORMAT_VERSION = 1
+MAGIC = b"SRSF"
+INDEX_MAGIC = b"SRSI"
+
+HEADER = struct.Struct(">4sBB2x")
+RECORD_SIZE = struct.Struct(">I")
+INDEX_ENTRY = struct.Struct(">qQ")
+FOOTER = struct.Struct(">QI4s")
+
+# Index key of entries without a frame_count.
+NO_FRAME_COUNT = -1
+
+# zstd compression level; low levels keep the save thread cheap.
+ZSTD_LEVEL = 3
+
+
+class Codec:
+    """
+    No compression.
+    """
+    name = "none"
+    code = 0
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    code = 1
+
+    def __init__(self, level: int = ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class Lz4Codec(Codec):
+    name = "lz4"
+    code = 2
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+# Codecs in order of preference, with their availability.
+CODECS = {
+    "zstd": (ZstdCodec, zstandard is not None),
+    "lz4": (Lz4Codec, lz4_frame is not None),
+    "none": (Codec, True),
+}
+
+
+def available_codecs() -> List[str]:
+    """
+    Return:
+        Names of the installed codecs, in order of preference.
+    """
+    return [name for name, (_, available) in CODECS.items() if available]
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """
+    Returns a codec instance.
+
+    Args:
+        name: Codec name ("zstd", "lz4" or "none"). Defaults to the
+          preferred installed codec.
+    """
+    if name is None:
+        name = available_codecs()[0]
+    if name not in CODECS:
+        raise ValueError(f"Unknown session codec: {name}")
+
+    codec_class, available = CODECS[name]
+    if not available:
+        raise ImportError(f"Session codec '{name}' is not installed.")
+    return codec_class()
+
+
+def _codec_by_code(code: int) -> Codec:
+    for name, (codec_class, _) in CODECS.items():
+        if codec_class.code == code:
+            return get_codec(name)
+    raise ValueError(f"Unknown session codec id: {code}")
+
+
+def _encode(frame: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(frame)
+    return json.dumps(frame, separators=(",", ":")).encode("utf-8")
+
+
+class SessionWriter:
+    """
+    Appends object_list entries to a new session file.
+
+        with SessionWriter("data/object_lists/1234.frames") as writer:
+            for frame in frames:
+                writer.append(frame)
+    """
+    def __init__(self, path: str, codec: Optional[str] = None):
+        """
+        Args:
+            path: File to create (overwritten if it exists).
+            codec: Codec name, None for the preferred installed one.
+        """
+        self.path = path
+        self.codec = get_codec(codec)
+        self.index = []  # (frame_count, offset) per record
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.codec.code))
+        self._offset = HEADER.size
+
+
+    def append(self, frame: Dict[str, Any]) -> None:
+        payload = self.codec.compress(_encode(frame))
+        frame_count = frame.get("frame_count")
+        self.index.append((frame_count if isinstance(frame_count, int) else NO_FRAME_COUNT, self._offset))
+        self._file.write(RECORD_SIZE.pack(len(payload)))
+        self._file.write(payload)
+        self._offset += RECORD_SIZE.size + len(payload)
+
+
+    def close(self) -> None:
+        """
+        Writes the index and footer and closes the file.
+        """
+        if self._file is None:
+            return
+        for entry in self.index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(FOOTER.pack(self._offset, len(self.index), INDEX_MAGIC))
+        self._file.close()
+        self._file = None
+
+
+    def __enter__(self) -> "SessionWriter":
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SessionReader:
+    """
+    Random and sequential access to a session file.
+
+        with SessionReader("data/object_lists/1234.frames") as reader:
+            frame = reader.get(1240)
+            for frame in reader: ...
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.decoder = get_decoder()
+        self._file = open(path, "rb")
+        magic, version, codec_code = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"Not a session file: {path}")
+        if version > FORMAT_VERSION:
+            self._file.close()
+            raise ValueError(f"Unsupported session file version {version}: {path}")
+        self.codec = _codec_by_code(codec_code)
+        self.recovered = False  # Index rebuilt from the records
+        self.index = self._read_index()
+        self._offsets = {}
+        for frame_count, offset in self.index:
+            self._offsets.setdefault(frame_count, offset)
+
+
+    def _read_index(self) -> List[tuple]:
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= HEADER.size + FOOTER.size:
+            self._file.seek(size - FOOTER.size)
+            index_offset, count, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if magic == INDEX_MAGIC and index_offset + count * INDEX_ENTRY.size + FOOTER.size == size:
+                self._file.seek(index_offset)
+                data = self._file.read(count * INDEX_ENTRY.size)
+                return list(INDEX_ENTRY.iter_unpack(data))
+
+        # No (valid) footer: scan the complete records.
+        self.recovered = True
+        index = []
+        offset = HEADER.size
+        self._file.seek(offset)
+        while True:
+            header = self._file.read(RECORD_SIZE.size)
+            if len(header) < RECORD_SIZE.size:
+                break
+            (length,) = RECORD_SIZE.unpack(header)
+            payload = self._file.read(length)
+            if len(payload) < length:
+                break
+            try:
+                frame = self._decode(payload)
+            except Exception:
+                break  # Torn last record or partial index
+            frame_count = frame.get("frame_count")
+            index.append((frame_count if isinstance(frame_count, int) else NO_FRAME_COUNT, offset))
+            offset += RECORD_SIZE.size + length
+        return index
+
+
+    def _decode(self, payload: bytes) -> Dict[str, Any]:
+        return self.decoder.decode(self.codec.decompress(payload))
+
+
+    def _read_at(self, offset: int) -> Dict[str, Any]:
+        self._file.seek(offset)
+        (length,) = RECORD_SIZE.unpack(self._file.read(RECORD_SIZE.size))
+        return self._decode(self._file.read(length))
+
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+    @property
+    def frame_counts(self) -> List[int]:
+        return [frame_count for frame_count, _ in self.index]
+
+
+    def get(self, frame_count: int) -> Dict[str, Any]:
+        """
+        Returns the entry with this frame_count (the first one if repeated).
+        Raises KeyError if there is none.
+        """
+        return self._read_at(self._offsets[frame_count])
+
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for _, offset in self.index:
+            yield self._read_at(offset)
+
+
+    def close(self) -> None:
+        self._file.close()
+
+
+    def __enter__(self) -> "SessionReader":
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_session(path: str, frames: List[Dict[str, Any]], codec: Optional[str] = None) -> int:
+    """
+    Writes frames to a new session file.
+
+    Return:
+        Number of frames written.
+    """
+    with SessionWriter(path, codec) as writer:
+        for frame in frames:
+            writer.append(frame)
+    return len(writer.index)
+
+
+def read_session(path: str) -> List[Dict[str, Any]]:
+    """
+    Returns all entries of a session file in order.
+    """
+    with SessionReader(path) as reader:
+        return list(reader)
+
+
+def _frame_key(name: str):
+    stem = os.path.splitext(name)[0]
+    return (0, int(stem), stem) if stem.isdigit() else (1, 0, stem)
+
+
+def convert_folder(folder: str, codec: Optional[str] = None, remove: bool = False) -> Optional[str]:
+    """
+    Packs a <identifier>/<frame_count>.json folder into <identifier>.frames
+    next to it, in frame_count order.
+
+    Args:
+        folder: Session folder written by the per-frame JSON layout.
+        codec: Codec name, None for the preferred installed one.
+        remove: Delete the folder once the session file is written.
+
+    Return:
+        Path of the session file, None if the folder holds no JSON frames.
+    """
+    names = sorted((name for name in os.listdir(folder) if name.endswith(".json")), key=_frame_key)
+    if not names:
+        return None
+
+    output = os.path.normpath(folder) + SESSION_SUFFIX
+    with SessionWriter(output, codec) as writer:
+        for name in names:
+            with open(os.path.join(folder, name)) as f:
+                writer.append(json.load(f))
+    if remove:
+        shutil.rmtree(folder)
+    return output
+
+
+def convert_tree(base_dir: str, codec: Optional[str] = None, remove: bool = False) -> List[str]:
+    """
+    Converts every session folder under base_dir (e.g. data/object_lists).
+
+    Return:
+        Paths of the session files written.
+    """
+    written = []
+    for name in sorted(os.listdir(base_dir), key=_frame_key):
+        folder = os.path.join(base_dir, name)
+        if os.path.isdir(folder):
+            output = convert_folder(folder, codec, remove)
+            if output is not None:
+                written.append(output)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="Pack per-frame JSON folders into session files.")
+    convert.add_argument("path", help="Session folder, or a folder of them (e.g. data/object_lists).")
+    convert.add_argument("--codec", choices=list(CODECS), help="Default: preferred installed codec.")
+    convert.add_argument("--remove", action="store_true", help="Delete the JSON folders afterwards.")
+
+    show = commands.add_parser("show", help="Summarise a session file or print one frame.")
+    show.add_argument("path")
+    show.add_argument("--frame", type=int, help="frame_count of the frame to print.")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        output = convert_folder(args.path, args.codec, args.remove)
+        written = [output] if output else convert_tree(args.path, args.codec, args.remove)
+        for path in written:
+            print(f"Wrote {path}")
+        print(f"Converted {len(written)} session(s).")
+        return
+
+    with SessionReader(args.path) as reader:
+        if args.frame is not None:
+            print(json.dumps(reader.get(args.frame), indent=4))
+            return
+        frame_counts = reader.frame_counts
+        print(f"{args.path}: {len(reader)} frames, codec {reader.codec.name}, "
+              f"{os.path.getsize(args.path)} bytes"
+              + (f", frame_count {frame_counts[0]}-{frame_counts[-1]}" if frame_counts else "")
+              + (", index rebuilt" if reader.recovered else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,19 @@
 # Date: 2025-03-30
 
 from typing import Any, Dict
+from frame_decoder import compile_classification_screen
+from frame_ring import FrameRing
+from fp_filter import FalsePositiveFilter
 from lidar_buffer import LidarBuffer
+from vru_tracker import VruTracker
+from zone_map import ZoneMap
 
 # Define VRU classifications
 VRU_CLASSIFICATIONS = {"PERSON", "BICYCLE"}
 
+# Matches a VRU classification value in a raw, undecoded payload.
+VRU_SCREEN = compile_classification_screen(VRU_CLASSIFICATIONS)
+
 class VruDetector:
     """
     Helper class to detect VRU presence in incoming LiDAR data.
@@ -16,13 +24,84 @@ class VruDetector:
     If no VRU is detected for a specified number of consecutive frames,
     the detector finalizes the current session by calling LidarBuffer.stop_recording()
     and resets its state.
+
+    should_decode() pre-screens raw payloads so frames without any VRU are
+    never fully decoded while no session is active. An optional
+    FalsePositiveFilter drops implausible VRU detections before they can
+    start (or extend) a session. With a VruTracker, only VRU tracks confirmed
+    over several frames count as a detection, and with a ZoneMap only VRUs
+    inside a zone (crosswalk, sidewalk, ...) do. With a pre-event FrameRing,
+    should_decode() keeps the raw payloads seen while idle, and the ones in
+    the ring when a session starts are prepended to it.
     """
-    def __init__(self, lidar_buffer: LidarBuffer, no_vru_threshold: int):
+    def __init__(self, lidar_buffer: LidarBuffer, no_vru_threshold: int,
+                 screen_counters: Dict[str, int] = None,
+                 fp_filter: FalsePositiveFilter = None,
+                 tracker: VruTracker = None,
+                 zone_map: ZoneMap = None,
+                 pre_event: FrameRing = None):
+        """
+        Args:
+            lidar_buffer: Buffer that records the session data.
+            no_vru_threshold: Consecutive frames without a VRU that end a session.
+            screen_counters: Dictionary with pre-screen stats, should have
+              'frames_screened' and 'full_decodes_avoided' keys. Pass the same
+              dictionary to every detector to count across sessions.
+            fp_filter: False-positive filter applied to VRU detections, None to
+              accept every detection. Pass the same filter to every detector
+              to count across sessions.
+            tracker: Track-level VRU state, None to decide from every frame
+              alone. Pass the same tracker to every detector so tracks
+              survive the end of a session.
+            zone_map: Regions of interest, None to consider the whole field of view.
+            pre_event: Ring of the frames before a session, None to record
+              from the first VRU frame on. Pass the same ring to every detector.
+        """
         self.lidar_buffer = lidar_buffer
         self.no_vru_threshold = no_vru_threshold
         self.consecutive_no_vru_count = 0
         self.vru_started = False
         self.current_video_path = None  # Track the current video path
+        self.screen_counters = screen_counters or {
+            'frames_screened': 0,
+            'full_decodes_avoided': 0
+        }
+        self.fp_filter = fp_filter
+        self.tracker = tracker
+        self.zone_map = zone_map
+        self.pre_event = pre_event
+        self._payload_in_ring = False  # The frame being handled is the ring's newest
+
+
+    def should_decode(self, payload: Any) -> bool:
+        """
+        Pre-screens a raw frame payload before it is decoded.
+
+        While no session is active, a frame only matters if it contains a
+        VRU, so the payload bytes are searched for a VRU classification value
+        and frames without one are skipped. During a session every frame is
+        recorded and therefore always decoded. Idle payloads also go to the
+        pre-event ring, if any.
+
+        Args:
+            payload: Raw JSON payload (bytes or memoryview).
+
+        Returns:
+            True if the frame must be decoded and passed to handle_frame().
+        """
+        self.screen_counters['frames_screened'] += 1
+        if self.vru_started:
+            return True
+        if self.pre_event is not None:
+            self._payload_in_ring = self.pre_event.append(payload)
+        if VRU_SCREEN.search(payload):
+            return True
+
+        self.screen_counters['full_decodes_avoided'] += 1
+        if self.fp_filter is not None:
+            # A skipped frame has no VRU, so it ends a run of suppressed detections.
+            self.fp_filter.record_idle_frame([])
+        return False
 
 
     def handle_frame(self, data: Dict[str, Any]) -> bool:
@@ -35,19 +114,41 @@ class VruDetector:
             False to continue processing frames.
         """
         vru_found = False
+        suppressed = []
 
         if "object_list" in data:
             for frame_obj in data["object_list"]:
                 if "objects" not in frame_obj:
                     continue
-                for obj in frame_obj["objects"]:
-                    classification = obj.get("classification", "")
-                    if classification in VRU_CLASSIFICATIONS:
-                        vru_found = True
-                        print(f"VRU detected: {classification}, frame_count: {frame_obj.get('frame_count')}")
+                objects = frame_obj["objects"]
+                candidates = [obj for obj in objects
+                              if obj.get("classification", "") in VRU_CLASSIFICATIONS]
+                rejected = []
+                if candidates and self.zone_map is not None:
+                    in_zone = self.zone_map.filter_objects(candidates)
+                    if len(in_zone) < len(candidates):
+                        kept = {id(obj) for obj in in_zone}
+                        rejected = [obj for obj in candidates if id(obj) not in kept]
+                    candidates = in_zone
+                if candidates and self.fp_filter is not None:
+                    candidates, frame_suppressed = self.fp_filter.check_frame(frame_obj, candidates)
+                    suppressed.extend(frame_suppressed)
+                    rejected.extend(obj for obj, _ in frame_suppressed)
+                if self.tracker is not None:
+                    if rejected:
+                        # Rejected detections must not feed the tracks either.
+                        rejected_ids = {id(obj) for obj in rejected}
+                        objects = [obj for obj in objects if id(obj) not in rejected_ids]
+                    # Every frame goes to the tracker, so keep scanning after a detection.
+                    candidates = self.tracker.update(frame_obj.get("frame_count", 0), objects)
+                if candidates and not vru_found:
+                    vru_found = True
+                    print(f"VRU detected: {candidates[0].get('classification')}, frame_count: {frame_obj.get('frame_count')}")
+                    if self.tracker is None:
                         break
-                if vru_found:
-                    break
+
+        if self.fp_filter is not None and not self.vru_started:
+            self.fp_filter.record_idle_frame([] if vru_found else suppressed)
 
         if vru_found:
             if not self.vru_started:
@@ -59,6 +160,12 @@ class VruDetector:
                 self.current_video_path = self.lidar_buffer.start_screen_recording()
                 print(f"Started recording to: {self.current_video_path}")
 
+                if self.pre_event is not None:
+                    payloads = self.pre_event.flush()
+                    if self._payload_in_ring:
+                        payloads = payloads[:-1]  # The current frame, added below
+                    self.lidar_buffer.add_pre_event(payloads)
+
             # Add the current frame data and reset the no-VRU counter.
             # Save the potentially new video path if returned
             new_path = self.lidar_buffer.add_data(data, self.current_video_path)
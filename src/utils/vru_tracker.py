@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-23
+
+"""
+Track-level VRU state for VruDetector.
+
+Gemini already assigns every object a persistent id/uuid, so instead of
+deciding from each frame alone the tracker keeps a small state per object:
+first/last seen frame, recent classification votes and a smoothed
+classification confidence. A track only counts as a VRU once it has been
+seen as one in k of the last n frames, and stays confirmed until it times
+out. This hysteresis stops single-frame detections from starting (and
+flickering ones from splitting) a recording session.
+
+update() is incremental: it only touches the objects present in the frame,
+and stale tracks are expired from the front of an insertion-ordered dict,
+so the cost per frame is O(objects in the frame).
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+# A track is confirmed once it is seen as a VRU in CONFIRM_HITS of the last
+# CONFIRM_WINDOW frames.
+CONFIRM_HITS = 3
+CONFIRM_WINDOW = 5
+
+# Number of recent classifications the class vote is taken over.
+VOTE_WINDOW = 10
+
+# Tracks not seen for this many frames are dropped.
+TRACK_TIMEOUT_FRAMES = 20
+
+# Weight of the newest value in the confidence moving average.
+CONFIDENCE_SMOOTHING = 0.3
+
+
+@dataclass(slots=True)
+class Track:
+    track_id: Any
+    first_seen: int
+    last_seen: int
+    smoothed_confidence: float = 0.0
+    confirmed: bool = False
+    vru_votes: int = 0
+    # Frame counts of the most recent VRU observations (at most CONFIRM_HITS).
+    hit_frames: Deque[int] = field(default_factory=deque)
+    # Most recent classifications (at most VOTE_WINDOW), oldest first.
+    class_history: Deque[str] = field(default_factory=deque)
+
+    @property
+    def classification(self) -> Optional[str]:
+        """The most recent classification of the track."""
+        return self.class_history[-1] if self.class_history else None
+
+    @property
+    def is_vru(self) -> bool:
+        """True if most of the recent classification votes are VRU classes."""
+        return 2 * self.vru_votes > len(self.class_history)
+
+
+class VruTracker:
+    """
+    Keeps per-object state across frames and reports the confirmed VRU
+    tracks present in each frame.
+
+    Only objects classified as a VRU at least once get a track; objects that
+    already have one keep voting with whatever class they are given later,
+    so a track that turns out to be a vehicle loses its VRU status.
+
+    counters:
+        tracks_created    tracks opened for a VRU detection
+        tracks_confirmed  tracks that reached k-of-n confirmation
+        tracks_expired    tracks dropped after TRACK_TIMEOUT_FRAMES
+    """
+    def __init__(self,
+                 vru_classifications: Iterable[str],
+                 confirm_hits: int = CONFIRM_HITS,
+                 confirm_window: int = CONFIRM_WINDOW,
+                 vote_window: int = VOTE_WINDOW,
+                 timeout_frames: int = TRACK_TIMEOUT_FRAMES,
+                 smoothing: float = CONFIDENCE_SMOOTHING):
+        if confirm_hits > confirm_window:
+            raise ValueError("confirm_hits cannot exceed confirm_window")
+
+        self.vru_classifications = frozenset(vru_classifications)
+        self.confirm_hits = confirm_hits
+        self.confirm_window = confirm_window
+        self.vote_window = vote_window
+        self.timeout_frames = timeout_frames
+        self.smoothing = smoothing
+        self.tracks: "OrderedDict[Any, Track]" = OrderedDict()  # Least recently seen first
+        self.last_frame = None
+        self.counters = {
+            'tracks_created': 0,
+            'tracks_confirmed': 0,
+            'tracks_expired': 0
+        }
+
+
+    def reset(self) -> None:
+        """Drops every track, e.g. after the sensor restarted its frame counter."""
+        self.tracks.clear()
+        self.last_frame = None
+
+
+    def update(self, frame_count: int, objects: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Updates the tracks with the objects of one frame.
+
+        Args:
+            frame_count: The Gemini frame_count of the frame. Frames skipped by
+              the pre-screen simply count as frames in which nothing was seen.
+            objects: The objects of the frame (Gemini object dicts).
+
+        Returns:
+            The objects of this frame whose track is a confirmed VRU.
+        """
+        if self.last_frame is not None and frame_count < self.last_frame:
+            self.reset()
+        self.last_frame = frame_count
+
+        confirmed = []
+        for obj in objects:
+            track_id = obj.get("uuid") or obj.get("id")
+            if track_id is None:
+                continue
+            classification = obj.get("classification", "")
+            is_vru = classification in self.vru_classifications
+
+            track = self.tracks.get(track_id)
+            if track is None:
+                if not is_vru:
+                    continue
+                track = Track(track_id, first_seen=frame_count, last_seen=frame_count,
+                              smoothed_confidence=obj.get("classification_confidence", 0.0))
+                self.tracks[track_id] = track
+                self.counters['tracks_created'] += 1
+            else:
+                self.tracks.move_to_end(track_id)
+
+            self._observe(track, frame_count, classification, is_vru,
+                          obj.get("classification_confidence", 0.0))
+            if track.confirmed and track.is_vru:
+                confirmed.append(obj)
+
+        self._expire(frame_count)
+        return confirmed
+
+
+    def _observe(self, track: Track, frame_count: int, classification: str,
+                 is_vru: bool, confidence: float) -> None:
+        track.last_seen = frame_count
+        track.smoothed_confidence += self.smoothing * (confidence - track.smoothed_confidence)
+
+        track.class_history.append(classification)
+        track.vru_votes += is_vru
+        if len(track.class_history) > self.vote_window:
+            track.vru_votes -= track.class_history.popleft() in self.vru_classifications
+
+        if not is_vru:
+            return
+        if track.hit_frames and track.hit_frames[-1] == frame_count:
+            return  # Same object listed twice in one frame.
+        track.hit_frames.append(frame_count)
+        if len(track.hit_frames) > self.confirm_hits:
+            track.hit_frames.popleft()
+
+        # The k-th most recent hit must lie within the last n frames.
+        if (not track.confirmed and len(track.hit_frames) == self.confirm_hits
+                and track.hit_frames[0] > frame_count - self.confirm_window):
+            track.confirmed = True
+            self.counters['tracks_confirmed'] += 1
+
+
+    def _expire(self, frame_count: int) -> None:
+        oldest = frame_count - self.timeout_frames
+        while self.tracks:
+            track = next(iter(self.tracks.values()))
+            if track.last_seen >= oldest:
+                break
+            self.tracks.popitem(last=False)
+            self.counters['tracks_expired'] += 1
+
+
+    def summary(self) -> str:
+        """
+        Returns the counters as a printable string.
+        """
+        return (f"  VRU Tracks: {self.counters['tracks_created']} created, "
+                f"{self.counters['tracks_confirmed']} confirmed, "
+                f"{self.counters['tracks_expired']} expired, {len(self.tracks)} active")
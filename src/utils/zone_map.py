@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-25
+
+"""
+Region-of-interest zones (crosswalks, sidewalks, approach lanes) of the
+intersection, in the LiDAR frame.
+
+Zones are polygons read from a JSON file:
+
+    {
+        "cell_size_m": 1.0,
+        "zones": [
+            {"name": "crosswalk_west", "kind": "crosswalk",
+             "polygon": [[-9.0, -3.0], [-5.0, -3.0], [-5.0, 9.0], [-9.0, 9.0]]},
+            ...
+        ]
+    }
+
+At load time the zones are rasterised into a uniform grid. Every cell is
+either empty, fully inside one zone, or on a zone boundary. Tagging a frame
+is one batched call: a cell lookup resolves most points, and only points in
+boundary cells get an exact (vectorized) point-in-polygon test. If zones
+overlap, the first one in the file wins.
+
+The pipeline only uses a zone map if DEFAULT_ZONE_FILE exists; see
+properties/zones.example.json for the format.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+ZONE_KINDS = ("crosswalk", "sidewalk", "approach_lane")
+
+DEFAULT_ZONE_FILE = Path(__file__).resolve().parents[1] / "properties" / "zones.json"
+
+DEFAULT_CELL_SIZE_M = 1.0
+
+# Grid cell states besides a zone index.
+_EMPTY = -1
+_BOUNDARY = -2
+
+
+class Zone(NamedTuple):
+    name: str
+    kind: str
+    polygon: np.ndarray  # (V, 2) vertices
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    Vectorized even-odd (ray casting) test.
+
+    Args:
+        points: (N, 2) x/y points.
+        polygon: (V, 2) vertices, open or closed.
+
+    Returns:
+        (N,) bool array, True for points inside the polygon.
+    """
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = straddles & (x < x_cross)
+    return (np.count_nonzero(crossings, axis=1) % 2) == 1
+
+
+class ZoneMap:
+    """
+    Polygon zones with a precomputed grid index for batched lookups.
+    """
+    def __init__(self, zones: Sequence[Zone], cell_size_m: float = DEFAULT_CELL_SIZE_M):
+        if not zones:
+            raise ValueError("A zone map needs at least one zone")
+        for zone in zones:
+            if zone.kind not in ZONE_KINDS:
+                raise ValueError(f"Unknown zone kind '{zone.kind}' for zone '{zone.name}'")
+            if len(zone.polygon) < 3:
+                raise ValueError(f"Zone '{zone.name}' needs at least 3 vertices")
+
+        self.zones = list(zones)
+        self.names = np.array([zone.name for zone in self.zones] + [None], dtype=object)
+        self.kinds = np.array([zone.kind for zone in self.zones])
+        self.cell_size_m = cell_size_m
+        self._bboxes = np.array([[*zone.polygon.min(axis=0), *zone.polygon.max(axis=0)]
+                                 for zone in self.zones])
+        self._build_grid()
+
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "ZoneMap":
+        zones = [Zone(entry["name"], entry["kind"], np.asarray(entry["polygon"], dtype=np.float64))
+                 for entry in config["zones"]]
+        return cls(zones, config.get("cell_size_m", DEFAULT_CELL_SIZE_M))
+
+
+    @classmethod
+    def from_json(cls, path) -> "ZoneMap":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+    def _build_grid(self) -> None:
+        cell = self.cell_size_m
+        self.origin = self._bboxes[:, :2].min(axis=0)
+        extent = self._bboxes[:, 2:].max(axis=0) - self.origin
+        self.shape = (max(1, math.ceil(extent[1] / cell)), max(1, math.ceil(extent[0] / cell)))
+        self.cells = np.full(self.shape, _EMPTY, dtype=np.int16)
+
+        for index, zone in enumerate(self.zones):
+            x0, y0 = np.floor((self._bboxes[index, :2] - self.origin) / cell).astype(int)
+            x1, y1 = np.floor((self._bboxes[index, 2:] - self.origin) / cell).astype(int)
+            x1, y1 = min(x1, self.shape[1] - 1), min(y1, self.shape[0] - 1)
+            ix, iy = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+            corners = np.stack([ix.ravel(), iy.ravel()], axis=-1)
+
+            # Cells crossed by an edge are boundary cells; every other cell
+            # is entirely inside or outside, which its centre decides.
+            boundary = self._edge_cells(zone.polygon)[corners[:, 1], corners[:, 0]]
+            centres = (corners + 0.5) * cell + self.origin
+            inside = points_in_polygon(centres, zone.polygon)
+            keep = boundary | inside
+            corners, full = corners[keep], ~boundary[keep]
+
+            # Cells already fully covered by an earlier zone keep it; boundary
+            # cells stay boundary cells and are resolved exactly at lookup.
+            state = self.cells[corners[:, 1], corners[:, 0]]
+            unset = state == _EMPTY
+            state[unset] = np.where(full[unset], index, _BOUNDARY)
+            self.cells[corners[:, 1], corners[:, 0]] = state
+
+
+    def _edge_cells(self, polygon: np.ndarray) -> np.ndarray:
+        """
+        Grid mask of the cells within one cell of the polygon outline. Edges are
+        sampled every half cell, so the one-cell dilation covers every cell an
+        edge passes through.
+        """
+        cell = self.cell_size_m
+        start, end = polygon, np.roll(polygon, -1, axis=0)
+        steps = np.maximum(np.ceil(np.linalg.norm(end - start, axis=1) / (cell / 2)).astype(int), 1)
+        t = np.concatenate([np.linspace(0.0, 1.0, n + 1) for n in steps])
+        edge = np.repeat(np.arange(len(polygon)), steps + 1)
+        samples = start[edge] + (end[edge] - start[edge]) * t[:, None]
+        sample_cells = np.floor((samples - self.origin) / cell).astype(int)
+
+        mask = np.zeros(self.shape, dtype=bool)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                mask[np.clip(sample_cells[:, 1] + dy, 0, self.shape[0] - 1),
+                     np.clip(sample_cells[:, 0] + dx, 0, self.shape[1] - 1)] = True
+        return mask
+
+
+    def zone_indices(self, points: np.ndarray) -> np.ndarray:
+        """
+        Tags every point with the index of the zone containing it.
+
+        Args:
+            points: (N, 2) x/y points; NaN rows are outside every zone.
+
+        Returns:
+            (N,) int array, -1 for points outside every zone.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.full(len(points), _EMPTY, dtype=np.int64)
+
+        cell = np.floor((points - self.origin) / self.cell_size_m)
+        on_grid = np.isfinite(cell).all(axis=1)
+        on_grid[on_grid] = ((cell[on_grid] >= 0).all(axis=1)
+                            & (cell[on_grid, 0] < self.shape[1]) & (cell[on_grid, 1] < self.shape[0]))
+        grid_rows = np.flatnonzero(on_grid)
+        cell = cell[grid_rows].astype(np.int64)
+        result[grid_rows] = self.cells[cell[:, 1], cell[:, 0]]
+
+        # Exact test for points in boundary cells, zones in priority order.
+        pending = np.flatnonzero(result == _BOUNDARY)
+        result[pending] = _EMPTY
+        for index, zone in enumerate(self.zones):
+            if not len(pending):
+                break
+            x0, y0, x1, y1 = self._bboxes[index]
+            candidate = points[pending]
+            in_bbox = ((candidate[:, 0] >= x0) & (candidate[:, 0] <= x1)
+                       & (candidate[:, 1] >= y0) & (candidate[:, 1] <= y1))
+            rows = pending[in_bbox]
+            hits = rows[points_in_polygon(points[rows], zone.polygon)]
+            result[hits] = index
+            pending = np.setdiff1d(pending, hits, assume_unique=True)
+
+        return result
+
+
+    def contains(self, points: np.ndarray, kinds: Optional[Iterable[str]] = None) -> np.ndarray:
+        """
+        (N,) bool mask of the points inside any zone (of the given kinds).
+        """
+        indices = self.zone_indices(points)
+        inside = indices >= 0
+        if kinds is not None:
+            inside[inside] = np.isin(self.kinds[indices[inside]], list(kinds))
+        return inside
+
+
+    def tag_objects(self, objects: Sequence[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Returns the zone name of every object (Gemini or DataIngestion dicts,
+        both carry position.x / position.y), None if outside every zone.
+        """
+        return self.names[self.zone_indices(_object_points(objects))].tolist()
+
+
+    def filter_objects(self, objects: Sequence[Dict[str, Any]],
+                       kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the objects inside any zone (of the given kinds), in order.
+        """
+        if not objects:
+            return []
+        mask = self.contains(_object_points(objects), kinds)
+        return [obj for obj, inside in zip(objects, mask) if inside]
+
+
+def _object_points(objects: Sequence[Dict[str, Any]]) -> np.ndarray:
+    points = np.full((len(objects), 2), np.nan)
+    for row, obj in enumerate(objects):
+        position = obj.get("position") or {}
+        points[row] = position.get("x", np.nan), position.get("y", np.nan)
+    return points
+
+
+def load_zone_map(path=DEFAULT_ZONE_FILE) -> Optional[ZoneMap]:
+    """
+    Loads the zone map, or returns None if the file does not exist (zones
+    are optional; without them every object is treated as relevant).
+    """
+    if not Path(path).exists():
+        return None
+    return ZoneMap.from_json(path)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-10
+
+"""
+Throughput benchmark of the asyncio ingestion service against N local fake
+TLS sensors streaming the example object_list frame.
+
+The per-sensor pipeline only decodes the frame and scans it for VRUs, so the
+numbers measure ingestion (TLS, framing, queueing, decode) rather than
+recording. One sensor can be made artificially slow to check that it does
+not hold back the others. Run from the src directory:
+
+    python ../test/benchmark/bench_async_ingestion.py --sensors 4 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+
+from async_ingestion import AsyncIngestionService, SensorEndpoint  # noqa: E402
+from data_collector import parse_frame  # noqa: E402
+from fake_sensor import FakeSensorServer, make_self_signed_contexts  # noqa: E402
+from vru_detector import VRU_CLASSIFICATIONS  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+
+class ScanPipeline:
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.frames = 0
+        self.vru_frames = 0
+
+    def process_payload(self, payload):
+        data = parse_frame(payload)
+        if data is None:
+            return
+        self.frames += 1
+        if any(obj.get("classification") in VRU_CLASSIFICATIONS
+               for frame in data.get("object_list", []) for obj in frame.get("objects", [])):
+            self.vru_frames += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+
+async def run(args, workdir):
+    server_context, client_context = make_self_signed_contexts(workdir)
+    frame = json.loads(EXAMPLE_FRAME.read_text())
+    rate = args.rate if args.rate > 0 else None
+
+    servers = [FakeSensorServer([frame], ssl_context=server_context, rate_hz=rate) for _ in range(args.sensors)]
+    for server in servers:
+        await server.start()
+
+    pipelines = {}
+
+    def factory(name):
+        delay = args.slow_delay if name == "sensor-0" and args.slow_delay else 0.0
+        pipelines[name] = ScanPipeline(name, delay)
+        return pipelines[name]
+
+    endpoints = [SensorEndpoint(f"sensor-{i}", "127.0.0.1", s.port) for i, s in enumerate(servers)]
+    service = AsyncIngestionService(endpoints, pipeline_factory=factory, ssl_context=client_context)
+
+    task = asyncio.create_task(service.run())
+    await asyncio.sleep(args.seconds)
+    service.stop()
+    await task
+    for server in servers:
+        await server.stop()
+
+    total = 0
+    print(f"{'sensor':<10} {'received':>9} {'processed':>10} {'dropped':>8} {'frames/s':>9}")
+    for endpoint in endpoints:
+        stats = service.stats[endpoint.name]
+        processed = pipelines[endpoint.name].frames
+        total += processed
+        print(f"{endpoint.name:<10} {stats['frames_received']:>9} {processed:>10} "
+              f"{stats['frames_dropped']:>8} {processed / args.seconds:>9.1f}")
+    print(f"{'total':<10} {'':>9} {total:>10} {'':>8} {total / args.seconds:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sensors", type=int, default=4, help="Number of fake sensors.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Benchmark duration.")
+    parser.add_argument("--rate", type=float, default=0, help="Frames/s per sensor, 0 for unthrottled.")
+    parser.add_argument("--slow-delay", type=float, default=0.0,
+                        help="Extra seconds per frame spent by sensor-0's pipeline.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(run(args, workdir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-28
+
+"""
+Render throughput of the headless bird's-eye-view renderer
+(utils/bev_renderer.py), on the example object_list frame or a recording.
+
+Reported per image size:
+    render  - BevRenderer.render() alone, ms/frame and frames/s
+    video   - write_video() of --frames frames end to end: ffmpeg encode
+              if ffmpeg is installed, else the PNG sequence fallback
+
+The sensor sends 10 frames/s, so render frames/s must stay well above 10
+for the batch writer to keep up. Runs without a display. Run from the src
+directory:
+
+    python ../test/benchmark/bench_bev_renderer.py --frames 70
+    python ../test/benchmark/bench_bev_renderer.py --recording ../data/object_lists/1234.frames
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+
+from bev_renderer import IMAGE_SIZE, BevRenderer  # noqa: E402
+from replay_server import load_recording  # noqa: E402
+from zone_map import ZoneMap  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+EXAMPLE_ZONES = Path(__file__).resolve().parents[2] / "src" / "properties" / "zones.example.json"
+SIZES = ((640, 360), IMAGE_SIZE, (1920, 1080))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", default=str(EXAMPLE_FRAME),
+                        help="Session file, session folder or object_list JSON file.")
+    parser.add_argument("--frames", type=int, default=70, help="Frames per measurement (one batch).")
+    args = parser.parse_args()
+
+    entries = [entry for message in load_recording(args.recording) for entry in message["object_list"]]
+    # Cycle short recordings, with timestamps 100 ms apart as from the sensor.
+    frames = [dict(entry, timestamp=i * 100_000) for i, entry in zip(range(args.frames), itertools.cycle(entries))]
+    zone_map = ZoneMap.from_json(EXAMPLE_ZONES)
+    print(f"{len(frames)} frames, {sum(len(f.get('objects', [])) for f in frames) / len(frames):.1f} objects/frame")
+    print(f"{'size':<10} {'render ms/frame':>16} {'render frames/s':>16} {'video ms/frame':>15}  output")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in SIZES:
+            renderer = BevRenderer(zone_map, size=size)
+            renderer.render(frames[0])  # Warm up.
+            start = time.perf_counter()
+            for frame in frames:
+                renderer.render(frame)
+            render_s = (time.perf_counter() - start) / len(frames)
+
+            output = os.path.join(tmp_dir, f"{size[0]}x{size[1]}.mp4")
+            start = time.perf_counter()
+            written = renderer.write_video(frames, output)
+            video_s = (time.perf_counter() - start) / len(frames)
+            kind = "ffmpeg" if renderer.stats['videos_written'] else "png sequence"
+            print(f"{size[0]}x{size[1]:<6} {render_s * 1e3:>16.2f} {1 / render_s:>16.1f} {video_s * 1e3:>15.2f}  "
+                  f"{kind if written else 'failed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-12
+
+"""
+Per-frame decode + VRU classification scan time for every installed JSON
+decoder backend, on the example object_list payload.
+
+Reported for each backend:
+    dict   - decode() to plain dicts, then the VruDetector-style .get() scan
+    typed  - decode_typed() to the slotted schema, then an attribute scan
+
+Run from the src directory:
+
+    python ../test/benchmark/bench_frame_decoder.py --repeat 500
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+
+from frame_decoder import available_backends, get_decoder  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+VRU_CLASSIFICATIONS = {"PERSON", "BICYCLE"}
+
+
+def scan_dict(data):
+    for frame_obj in data.get("object_list", []):
+        for obj in frame_obj.get("objects", []):
+            if obj.get("classification", "") in VRU_CLASSIFICATIONS:
+                return True
+    return False
+
+
+def scan_typed(message):
+    for frame in message.object_list:
+        for obj in frame.objects:
+            if obj.classification in VRU_CLASSIFICATIONS:
+                return True
+    return False
+
+
+def time_per_frame(fn, payload, repeat):
+    view = memoryview(payload)
+    fn(view)  # Warm up.
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(view)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=300, help="Decodes per measurement.")
+    args = parser.parse_args()
+
+    payload = EXAMPLE_FRAME.read_bytes()
+    print(f"Payload size: {len(payload)} bytes")
+    print(f"{'backend':<10} {'dict ms/frame':>14} {'typed ms/frame':>15}")
+
+    for name in available_backends():
+        decoder = get_decoder(name)
+        dict_s = time_per_frame(lambda p: scan_dict(decoder.decode(p)), payload, args.repeat)
+        typed_s = time_per_frame(lambda p: scan_typed(decoder.decode_typed(p)), payload, args.repeat)
+        print(f"{name:<10} {dict_s * 1e3:>14.3f} {typed_s * 1e3:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-08
+
+"""
+Benchmark of the Gemini Detect frame reader against a local loopback TLS server.
+
+Compares the old recv()/bytearray.extend + decode("utf-8") path with the
+buffered recv_into()/memoryview FrameReader. Run from the src directory:
+
+    python ../test/benchmark/bench_frame_reader.py --frames 5000
+"""
+
+import argparse
+import json
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+
+from fake_sensor import make_self_signed_contexts  # noqa: E402
+from frame_reader import FrameReader  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+
+def serve(listener: socket.socket, server_context: ssl.SSLContext, stream: bytes, repeat: int):
+    """
+    Accepts one connection and writes the pre-framed stream repeat times.
+    """
+    conn, _ = listener.accept()
+    with server_context.wrap_socket(conn, server_side=True) as tls_conn:
+        for _ in range(repeat):
+            tls_conn.sendall(stream)
+
+
+def legacy_recv(socket_client, num_bytes):
+    data = bytearray()
+    while len(data) < num_bytes:
+        packet = socket_client.recv(num_bytes - len(data))
+        if not packet:
+            return bytearray()
+        data.extend(packet)
+    return data
+
+
+def run_legacy(socket_client, num_frames):
+    for _ in range(num_frames):
+        frame_size = int.from_bytes(legacy_recv(socket_client, 4), "big")
+        data = json.loads(legacy_recv(socket_client, frame_size).decode("utf-8"))
+        assert "object_list" in data
+
+
+def run_frame_reader(socket_client, num_frames):
+    reader = FrameReader(socket_client)
+    for _ in range(num_frames):
+        data = json.loads(bytes(reader.read_frame()))
+        assert "object_list" in data
+
+
+def run_frame_reader_no_decode(socket_client, num_frames):
+    reader = FrameReader(socket_client)
+    for _ in range(num_frames):
+        assert reader.read_frame() is not None
+
+
+def bench(name, runner, server_context, client_context, stream, num_frames):
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    server = threading.Thread(target=serve, args=(listener, server_context, stream, num_frames), daemon=True)
+    server.start()
+
+    with client_context.wrap_socket(socket.create_connection(("127.0.0.1", port))) as socket_client:
+        start = time.perf_counter()
+        runner(socket_client, num_frames)
+        elapsed = time.perf_counter() - start
+
+    server.join()
+    listener.close()
+    mb = len(stream) * num_frames / 1e6
+    print(f"{name:<28} {num_frames / elapsed:>10.0f} frames/s {mb / elapsed:>8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000, help="Number of frames per run.")
+    args = parser.parse_args()
+
+    payload = json.dumps(json.loads(EXAMPLE_FRAME.read_text())).encode("utf-8")
+    stream = len(payload).to_bytes(4, "big") + payload
+    print(f"Payload size: {len(payload)} bytes, {args.frames} frames per run")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server_context, client_context = make_self_signed_contexts(workdir)
+        bench("legacy recv + decode", run_legacy, server_context, client_context, stream, args.frames)
+        bench("FrameReader + json.loads", run_frame_reader, server_context, client_context, stream, args.frames)
+        bench("FrameReader framing only", run_frame_reader_no_decode, server_context, client_context, stream, args.frames)
+
+
+if __name__ == "__main__":
+    main()
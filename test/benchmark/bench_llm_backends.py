@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-07
+
+"""
+Startup-time and resident-memory benchmark of the LLM backends in
+modules/llm_backends.py.
+
+Every backend runs in a fresh Python process so its memory numbers are not
+mixed with the others. Per backend it reports the time to create the
+(lazy) backend, the load time, the resident memory after loading and after
+a first short generation, and that generation's latency. Use a small
+checkpoint (--model Qwen/Qwen2.5-0.5B-Instruct and a matching --gguf) for
+a quick comparison. Run from the src directory:
+
+    python ../test/benchmark/bench_llm_backends.py --backends hf hf-int8 llama.cpp
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from modules import llm_backends  # noqa: E402
+
+PROMPT = 'Answer with JSON. Which objects are dangerous? Objects: PED at 5 m, VEHICLE at 40 m.\n'
+
+
+def measure(name: str, args: argparse.Namespace) -> dict:
+    """Runs in the child process."""
+    kwargs = {"model_path": Path(args.gguf)} if name == "llama.cpp" else {"model_name": args.model}
+
+    start = time.perf_counter()
+    backend = llm_backends.get_backend(name, **kwargs)
+    create_s = time.perf_counter() - start
+
+    backend.load()
+
+    start = time.perf_counter()
+    if backend.hf_generate:
+        import torch
+        inputs = backend.tokenizer([PROMPT], return_tensors="pt")
+        with torch.no_grad():
+            backend.model.generate(**inputs, max_new_tokens=args.new_tokens, do_sample=False,
+                                   pad_token_id=backend.tokenizer.pad_token_id)
+    else:
+        backend.complete([PROMPT], args.new_tokens, constrained=False)
+    generate_s = time.perf_counter() - start
+
+    return {
+        "backend": name,
+        "create_s": create_s,
+        **backend.load_stats,
+        "generate_s": generate_s,
+        "rss_after_generate_mb": llm_backends.resident_memory_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(llm_backends.BACKENDS),
+                        choices=list(llm_backends.BACKENDS))
+    parser.add_argument("--model", default=llm_backends.HF_MODEL_NAME, help="HF model name or path")
+    parser.add_argument("--gguf", default=str(llm_backends.GGUF_MODEL_PATH), help="GGUF model path")
+    parser.add_argument("--new-tokens", type=int, default=16)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args)))
+        return
+
+    print(f"{'backend':<10} {'create s':>9} {'load s':>8} {'RSS load MB':>12} "
+          f"{'gen s':>7} {'RSS gen MB':>11}")
+    for name in args.backends:
+        child = subprocess.run([sys.executable, __file__, "--child", name, "--model", args.model,
+                                "--gguf", args.gguf, "--new-tokens", str(args.new_tokens)],
+                               capture_output=True, text=True)
+        if child.returncode != 0:
+            error = child.stderr.strip().splitlines()[-1] if child.stderr.strip() else "failed"
+            print(f"{name:<10} skipped: {error}")
+            continue
+        stats = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{name:<10} {stats['create_s']:>9.4f} {stats['load_s']:>8.2f} "
+              f"{stats['rss_after_mb'] - stats['rss_before_mb']:>12.0f} "
+              f"{stats['generate_s']:>7.2f} {stats['rss_after_generate_mb'] - stats['rss_before_mb']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
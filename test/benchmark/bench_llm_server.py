@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-04-28
+
+"""
+CPU benchmark of LLMServer request batching against one blocking generate
+call per request, the way LLMInference._call_llm works.
+
+By default a tiny randomly initialised Qwen2 model with a byte-level
+vocabulary is built in memory, so no download is needed; pass --checkpoint
+to use a small local HF checkpoint instead. Every request generates exactly
+--new-tokens tokens, so both modes do the same work per request. Run from
+the src directory:
+
+    python ../test/benchmark/bench_llm_server.py --clients 8 --requests 64
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, Qwen2Config, Qwen2ForCausalLM
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from modules.llm_server import LLMServer  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+# Byte-level vocabulary of the tiny model: 256 byte values plus special tokens.
+PAD_ID, EOS_ID = 256, 257
+
+
+class TinyByteGenerator:
+    """generate_fn over a random tiny Qwen2 model, prompts encoded as UTF-8 bytes."""
+
+    def __init__(self, new_tokens: int):
+        config = Qwen2Config(vocab_size=260, hidden_size=128, intermediate_size=256,
+                             num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=2,
+                             max_position_embeddings=8192, pad_token_id=PAD_ID,
+                             bos_token_id=EOS_ID, eos_token_id=EOS_ID)
+        torch.manual_seed(0)
+        self.model = Qwen2ForCausalLM(config).eval()
+        self.new_tokens = new_tokens
+
+    def __call__(self, prompts):
+        encoded = [list(prompt.encode("utf-8")) for prompt in prompts]
+        width = max(len(ids) for ids in encoded)
+        input_ids = torch.full((len(encoded), width), PAD_ID, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        for row, ids in enumerate(encoded):  # Left padding
+            input_ids[row, width - len(ids):] = torch.tensor(ids)
+            attention_mask[row, width - len(ids):] = 1
+
+        with torch.no_grad():
+            output_ids = self.model.generate(input_ids=input_ids, attention_mask=attention_mask,
+                                             max_new_tokens=self.new_tokens, min_new_tokens=self.new_tokens,
+                                             do_sample=False, pad_token_id=PAD_ID)
+        return [bytes(token for token in row.tolist() if token < 256).decode("utf-8", "replace")
+                for row in output_ids[:, width:]]
+
+
+class CheckpointGenerator:
+    """generate_fn over a local HF checkpoint, batched like LLMInference.generate_batch."""
+
+    def __init__(self, checkpoint: str, new_tokens: int):
+        self.tokenizer = AutoTokenizer.from_pretrained(checkpoint, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(checkpoint).eval()
+        self.new_tokens = new_tokens
+
+    def __call__(self, prompts):
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        with torch.no_grad():
+            output_ids = self.model.generate(**inputs, max_new_tokens=self.new_tokens,
+                                             min_new_tokens=self.new_tokens, do_sample=False,
+                                             pad_token_id=self.tokenizer.pad_token_id)
+        return self.tokenizer.batch_decode(output_ids[:, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+
+
+def make_prompts(count: int, prompt_chars: int):
+    """Scene prompts of one ego vehicle each, built from the example frame."""
+    objects = json.loads(EXAMPLE_FRAME.read_text())["object_list"][0]["objects"]
+    prompts = []
+    for i in range(count):
+        scene = {"ego": {"location_x": float(i), "location_y": 0.0, "speed_mps": 10.0},
+                 "objects": objects[i % len(objects):][:8]}
+        prompts.append(json.dumps(scene)[:prompt_chars])
+    return prompts
+
+
+def report(label, latencies_s, elapsed_s, extra=""):
+    latencies_ms = np.array(latencies_s) * 1e3
+    print(f"{label:<10} {len(latencies_ms) / elapsed_s:8.2f} req/s  "
+          f"p50 {np.percentile(latencies_ms, 50):8.1f} ms  p99 {np.percentile(latencies_ms, 99):8.1f} ms{extra}")
+
+
+def bench_sequential(generate_fn, prompts):
+    latencies = []
+    start = time.perf_counter()
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        generate_fn([prompt])
+        latencies.append(time.perf_counter() - t0)
+    report("blocking", latencies, time.perf_counter() - start)
+
+
+def bench_server(generate_fn, prompts, clients, max_batch_size):
+    """clients threads each submit a request and wait for it, until all prompts are served."""
+    server = LLMServer(generate_fn, max_batch_size=max_batch_size).start()
+    latencies, lock = [], threading.Lock()
+    pending = iter(prompts)
+
+    def client():
+        while True:
+            with lock:
+                prompt = next(pending, None)
+            if prompt is None:
+                return
+            t0 = time.perf_counter()
+            server.submit(prompt).result()
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.stop()
+    report("server", latencies, elapsed, f"  mean batch {server.summary()['mean_batch_size']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", help="Local HF checkpoint (default: tiny random Qwen2)")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent requesters (ego vehicles / sensors)")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--prompt-chars", type=int, default=1024)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0: default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    generate_fn = CheckpointGenerator(args.checkpoint, args.new_tokens) if args.checkpoint \
+        else TinyByteGenerator(args.new_tokens)
+    prompts = make_prompts(args.requests, args.prompt_chars)
+
+    generate_fn(prompts[:1])  # Warm-up
+    print(f"{args.requests} requests, {args.clients} clients, {args.new_tokens} new tokens each")
+    bench_sequential(generate_fn, prompts)
+    bench_server(generate_fn, prompts, args.clients, args.max_batch_size)
+
+
+if __name__ == "__main__":
+    main()
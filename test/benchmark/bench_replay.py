@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-16
+
+"""
+End-to-end throughput benchmark on a replayed recording.
+
+A ReplayServer (utils/replay_server.py) serves the recording over loopback
+TLS at --speed times real time (0 = as fast as possible, with --drop-late
+frames the client is not ready for are dropped). Each target then runs for
+--seconds in a fresh Python process connected to it:
+
+    collector   data_collector.read_frames() with pre-screen, pre-event ring,
+                VRU detection, false-positive filter and tracker; recording
+                is replaced by a counting buffer so no screen capture or
+                disk I/O happens
+    system      SHIELDRSUSystem pipeline fed by SensorIngestion; the LLM is
+                skipped (rule-based result) unless --llm is given
+
+Reported per target: frames/s received, frames dropped by the
+server and by the client (superseded before being processed), peak resident
+memory and the per-stage latency table of instrumentation.py. Run from the
+src directory:
+
+    python ../test/benchmark/bench_replay.py ../data/object_lists/1234.frames --speed 0 --seconds 10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(SRC_DIR / "utils"))
+
+from replay_server import ReplayServer, load_recording  # noqa: E402
+from fake_sensor import make_self_signed_contexts  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+TARGETS = ("collector", "system")
+
+
+class CountingBuffer:
+    """LidarBuffer stand-in that only counts what would be recorded."""
+
+    def __init__(self, counters):
+        self.counters = counters
+
+    def start_screen_recording(self):
+        self.counters['sessions'] += 1
+        return "replay.mp4"
+
+    def add_pre_event(self, payloads):
+        self.counters['pre_event_frames'] += len(payloads)
+        return len(payloads)
+
+    def add_data(self, data, video_path=None):
+        self.counters['frames_recorded'] += 1
+        return video_path
+
+    def stop_recording(self, video_path=None):
+        return True
+
+
+def client_context():
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run_collector(args):
+    from data_collector import NO_VRU_THRESHOLD, PRE_EVENT_FRAMES, read_frames
+    from fp_filter import FalsePositiveFilter
+    from frame_reader import FrameReader
+    from frame_ring import FrameRing
+    from instrumentation import summary
+    from vru_detector import VRU_CLASSIFICATIONS, VruDetector
+    from vru_tracker import VruTracker
+
+    counters = {'sessions': 0, 'frames_recorded': 0, 'pre_event_frames': 0}
+    screen_counters = {'frames_screened': 0, 'full_decodes_avoided': 0}
+    fp_filter = FalsePositiveFilter()
+    tracker = VruTracker(VRU_CLASSIFICATIONS)
+    pre_event = FrameRing(PRE_EVENT_FRAMES)
+    buffer = CountingBuffer(counters)
+
+    with client_context().wrap_socket(socket.create_connection(("127.0.0.1", args.port))) as sock:
+        frame_reader = FrameReader(sock)
+        deadline = time.monotonic() + args.seconds
+        start = time.perf_counter()
+        while time.monotonic() < deadline:
+            detector = VruDetector(buffer, NO_VRU_THRESHOLD, screen_counters, fp_filter, tracker,
+                                   pre_event=pre_event)
+
+            def handle_frame(data):
+                return detector.handle_frame(data) or time.monotonic() >= deadline
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                read_frames(frame_reader, handle_frame, prescreen=detector.should_decode)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "frames": frame_reader.frames_read,
+        "elapsed_s": elapsed,
+        "client_dropped": 0,  # The collector reads every frame it is sent
+        **counters,
+        **screen_counters,
+        "stages": summary(),
+    }
+
+
+def run_system(args):
+    from main import SHIELDRSUSystem
+    from modules.data_ingestion import SensorIngestion
+    from utils.instrumentation import summary
+
+    system = SHIELDRSUSystem(pipelined=True)
+    if not args.llm:
+        system._llm_analysis = lambda ego_data, lidar_objects, fallback: fallback
+    system.data_ingestion = SensorIngestion(("127.0.0.1", args.port), client_context()).start()
+
+    start = time.perf_counter()
+    system.start_pipeline()
+    time.sleep(args.seconds)
+    system.stop_pipeline()
+    elapsed = time.perf_counter() - start
+    system.data_ingestion.stop()
+
+    stats = system.data_ingestion.stats
+    pipeline = system.pipeline_summary()
+    return {
+        "frames": stats['frames_received'],
+        "elapsed_s": elapsed,
+        "client_dropped": stats['frames_replaced'] + pipeline['frames_dropped'],
+        "frames_analysed": pipeline['frames_analysed'],
+        "broadcasts_sent": pipeline['broadcasts_sent'],
+        "deadline_misses": sum(pipeline[name]['deadline_misses'] for name in system.schedulers),
+        "stages": summary(),
+    }
+
+
+def run_child(args):
+    result = run_collector(args) if args.child == "collector" else run_system(args)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def report(target, result, server_dropped):
+    print(f"\n{target}: {result['frames']} frames in {result['elapsed_s']:.1f} s "
+          f"({result['frames'] / result['elapsed_s']:.1f} frames/s), dropped by server {server_dropped}, "
+          f"by client {result['client_dropped']}, peak RSS {result['peak_rss_mb']:.0f} MB")
+    extra = {k: v for k, v in result.items()
+             if k not in ("frames", "elapsed_s", "client_dropped", "peak_rss_mb", "stages")}
+    if extra:
+        print("  " + ", ".join(f"{k} {v}" for k, v in extra.items()))
+    print(f"  {'stage':<16} {'count':>8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, s in result["stages"].items():
+        print(f"  {stage:<16} {s['count']:>8} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} "
+              f"{s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", default=str(EXAMPLE_FRAME),
+                        help="Session file or folder, object_lists folder, JSON or capture file.")
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=TARGETS)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 0 for as fast as possible.")
+    parser.add_argument("--drop-late", action="store_true", help="Server drops frames the client is not ready for.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration per target.")
+    parser.add_argument("--llm", action="store_true", help="Run the LLM on ambiguous scenes (system target).")
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child", choices=TARGETS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    messages = load_recording(args.recording)
+    print(f"Replaying {len(messages)} recorded frames at speed {args.speed or 'max'}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server_context, _ = make_self_signed_contexts(workdir)
+        server = ReplayServer(messages, speed=args.speed, drop_late=args.drop_late, ssl_context=server_context)
+        port = server.start_in_thread()
+        try:
+            for target in args.targets:
+                server.frames_dropped = 0
+                command = [sys.executable, __file__, "--child", target, "--port", str(port),
+                           "--seconds", str(args.seconds)] + (["--llm"] if args.llm else [])
+                child = subprocess.run(command, capture_output=True, text=True, cwd=str(SRC_DIR),
+                                       env={**os.environ, "PYTHONPATH": str(SRC_DIR)})
+                if child.returncode != 0:
+                    error = child.stderr.strip().splitlines()[-1] if child.stderr.strip() else "failed"
+                    print(f"\n{target}: skipped: {error}")
+                    continue
+                report(target, json.loads(child.stdout.strip().splitlines()[-1]), server.frames_dropped)
+        finally:
+            server.stop_thread()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Author: Fengze Yang <fred.yang@utah.edu>
+# Date: 2025-05-09
+
+"""
+Speculative decoding benchmark of LLMInference on recorded scenes.
+
+Every frame of an object_list recording (default: the example frame) is
+turned into a scene prompt and analysed twice: token by token, and with
+the draft model proposing --draft-tokens tokens per round. Reported: the
+latency of both modes, the share of drafted tokens the target model
+accepted, and whether the two outputs are identical. Frames are reused
+when --scenes is larger than the recording. Run from the src directory:
+
+    python ../test/benchmark/bench_speculative.py --model Qwen/Qwen2.5-7B-Instruct \
+        --draft Qwen/Qwen2.5-0.5B-Instruct --scenes 20
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from modules.llm_backends import HF_MODEL_NAME, HFBackend  # noqa: E402
+from modules.llm_inference import LLMInference  # noqa: E402
+from utils.frame_batch import FrameBatch  # noqa: E402
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+EGO_DATA = {"location_x": 0.0, "location_y": 0.0, "speed_mps": 10.0, "heading_deg": 0.0}
+
+
+def load_scenes(path: Path, count: int):
+    frames = json.loads(path.read_text())["object_list"]
+    return [FrameBatch.from_gemini(frames[i % len(frames)]).to_scene_objects() for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=HF_MODEL_NAME)
+    parser.add_argument("--draft", default="Qwen/Qwen2.5-0.5B-Instruct")
+    parser.add_argument("--draft-tokens", type=int, default=4)
+    parser.add_argument("--frames", type=Path, default=EXAMPLE_FRAME, help="object_list JSON recording")
+    parser.add_argument("--scenes", type=int, default=10)
+    args = parser.parse_args()
+
+    inference = LLMInference(backend=HFBackend(args.model), draft_model=args.draft)
+    decoder = inference.speculative
+    decoder.num_draft_tokens = args.draft_tokens
+    inference.load()
+
+    greedy_s, speculative_s, identical, drafted, accepted = [], [], 0, 0, 0
+    for objects in load_scenes(args.frames, args.scenes):
+        prompt = inference._format_prompt(EGO_DATA, objects)
+
+        inference.speculative = None
+        start = time.perf_counter()
+        greedy = inference._call_llm(prompt)
+        greedy_s.append(time.perf_counter() - start)
+
+        inference.speculative = decoder
+        start = time.perf_counter()
+        speculative = inference._call_llm(prompt)
+        speculative_s.append(time.perf_counter() - start)
+
+        identical += greedy == speculative
+        drafted += inference.last_metrics["drafted_tokens"]
+        accepted += inference.last_metrics["accepted_tokens"]
+
+    for label, latencies in (("greedy", greedy_s), ("speculative", speculative_s)):
+        latencies_ms = np.array(latencies) * 1e3
+        print(f"{label:<12} mean {latencies_ms.mean():8.1f} ms  p50 {np.percentile(latencies_ms, 50):8.1f} ms  "
+              f"p99 {np.percentile(latencies_ms, 99):8.1f} ms")
+    print(f"speedup {np.mean(greedy_s) / np.mean(speculative_s):.2f}x, "
+          f"accepted {accepted}/{drafted} drafted tokens ({accepted / max(drafted, 1):.1%}), "
+          f"identical outputs {identical}/{len(greedy_s)}")
+
+
+if __name__ == "__main__":
+    main()
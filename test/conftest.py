@@ -0,0 +1,44 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-30
+
+"""
+Puts src (for modules.* and utils.*) and src/utils (for the flat sibling
+imports of the utils scripts, e.g. "from instrumentation import timer") on
+sys.path, as the benchmarks do.
+
+utils.<name> is served as the flat <name> module, so a utils module is
+loaded once and shared state such as the instrumentation REGISTRY is not
+split between the two names.
+"""
+
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+UTILS_DIR = SRC_DIR / "utils"
+
+
+class _SharedUtilsModules(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+
+    def find_spec(self, fullname, path, target=None):
+        package, _, name = fullname.rpartition(".")
+        if package == "utils" and (UTILS_DIR / f"{name}.py").is_file():
+            return importlib.util.spec_from_loader(fullname, self)
+        return None
+
+
+    def create_module(self, spec):
+        return importlib.import_module(spec.name.rpartition(".")[2])
+
+
+    def exec_module(self, module):
+        pass  # Already executed under its flat name.
+
+
+for directory in (UTILS_DIR, SRC_DIR):
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+sys.meta_path.insert(0, _SharedUtilsModules())
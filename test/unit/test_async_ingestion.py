@@ -0,0 +1,134 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-10
+
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+from utils.async_ingestion import AsyncIngestionService, SensorEndpoint
+from utils.fake_sensor import FakeSensorServer, make_self_signed_contexts
+
+
+class RecordingPipeline:
+    """Pipeline stub that records payloads, optionally sleeping per frame."""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.payloads = []
+        self.batch_writer = MagicMock()
+        self.recorder = MagicMock()
+
+    def process_payload(self, payload):
+        if self.delay:
+            time.sleep(self.delay)
+        self.payloads.append(json.loads(payload))
+
+
+def _frames(n):
+    return [{"object_list": [{"frame_count": i, "objects": []}]} for i in range(n)]
+
+
+class TestAsyncIngestionService(unittest.TestCase):
+
+    def _run(self, coro):
+        return asyncio.run(coro)
+
+
+    def test_slow_sensor_does_not_stall_fast_sensor(self):
+        """A slow pipeline drops its own frames while the other keeps up."""
+        async def scenario():
+            fast = FakeSensorServer(_frames(50), rate_hz=200)
+            slow = FakeSensorServer(_frames(50), rate_hz=200)
+            await fast.start()
+            await slow.start()
+
+            pipelines = {}
+
+            def factory(name):
+                pipelines[name] = RecordingPipeline(name, delay=0.1 if name == "slow" else 0.0)
+                return pipelines[name]
+
+            service = AsyncIngestionService(
+                [SensorEndpoint("fast", "127.0.0.1", fast.port),
+                 SensorEndpoint("slow", "127.0.0.1", slow.port)],
+                pipeline_factory=factory, use_tls=False, queue_size=2
+            )
+            task = asyncio.create_task(service.run())
+            await asyncio.sleep(0.5)
+            service.stop()
+            await task
+            await fast.stop()
+            await slow.stop()
+            return service, pipelines
+
+        service, pipelines = self._run(scenario())
+        self.assertGreater(len(pipelines["fast"].payloads), 50)
+        self.assertLess(len(pipelines["slow"].payloads), 10)
+        self.assertGreater(service.stats["slow"]["frames_dropped"], 0)
+        self.assertEqual(service.stats["fast"]["frames_dropped"], 0)
+
+
+    def test_reconnects_after_connection_loss(self):
+        """The service reconnects with backoff when the sensor drops it."""
+        async def scenario():
+            server = FakeSensorServer(_frames(5), rate_hz=100)
+            await server.start()
+            service = AsyncIngestionService(
+                [SensorEndpoint("gemini", "127.0.0.1", server.port)],
+                pipeline_factory=RecordingPipeline, use_tls=False,
+                backoff_initial=0.01, backoff_max=0.05
+            )
+            task = asyncio.create_task(service.run())
+            await asyncio.sleep(0.2)
+            await server.drop_clients()
+            await asyncio.sleep(0.3)
+            service.stop()
+            await task
+            await server.stop()
+            return service
+
+        service = self._run(scenario())
+        self.assertGreaterEqual(service.stats["gemini"]["connects"], 2)
+        self.assertGreater(service.stats["gemini"]["frames_processed"], 0)
+        service.pipelines["gemini"].batch_writer.close.assert_called_once()
+        service.pipelines["gemini"].recorder.stop.assert_called_once()
+
+
+    @unittest.skipIf(shutil.which("openssl") is None, "openssl CLI not available")
+    def test_tls_stream_with_heartbeats(self):
+        """Frames arrive over TLS; heartbeats are passed through as payloads."""
+        async def scenario(workdir):
+            server_context, client_context = make_self_signed_contexts(workdir)
+            server = FakeSensorServer(_frames(3), ssl_context=server_context, rate_hz=None,
+                                      loop=False, heartbeat_every=1)
+            await server.start()
+            pipelines = []
+
+            def factory(name):
+                pipelines.append(RecordingPipeline(name))
+                return pipelines[-1]
+
+            service = AsyncIngestionService(
+                [SensorEndpoint("gemini", "127.0.0.1", server.port)],
+                pipeline_factory=factory, ssl_context=client_context, backoff_initial=10
+            )
+            task = asyncio.create_task(service.run())
+            await asyncio.sleep(0.3)
+            service.stop()
+            await task
+            await server.stop()
+            return pipelines[0].payloads
+
+        with tempfile.TemporaryDirectory() as workdir:
+            payloads = self._run(scenario(workdir))
+        frame_counts = [p["object_list"][0]["frame_count"] for p in payloads if "object_list" in p]
+        self.assertEqual(frame_counts, [0, 1, 2])
+        self.assertEqual(sum(1 for p in payloads if "heartbeat" in p), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-23
+
+import threading
+import unittest
+from unittest.mock import patch
+from utils.batch_writer import BatchWriter
+
+
+class TestBatchWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.writer = BatchWriter(max_pending=2)
+
+
+    def tearDown(self):
+        self.writer.close(timeout=5)
+
+
+    def test_saves_in_order_on_one_thread(self):
+        saved = []
+        futures = [self.writer.submit(lambda batch: saved.append((batch, threading.current_thread().name)), i)
+                   for i in range(5)]
+        self.writer.flush()
+        self.assertEqual([batch for batch, _ in saved], list(range(5)))
+        self.assertEqual({name for _, name in saved}, {"batch-writer"})
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(self.writer.stats['batches_saved'], 5)
+
+
+    def test_full_queue_blocks_submit(self):
+        """With the writer stuck, the third queued batch waits for a free slot."""
+        started, release = threading.Event(), threading.Event()
+        self.writer.submit(lambda: started.set() or release.wait())
+        started.wait(5)  # Being saved
+        self.writer.submit(lambda: None)
+        self.writer.submit(lambda: None)  # Queue (max_pending=2) is now full
+
+        blocked = threading.Thread(target=self.writer.submit, args=(lambda: None,))
+        blocked.start()
+        blocked.join(0.1)
+        self.assertTrue(blocked.is_alive())
+
+        release.set()
+        blocked.join(5)
+        self.writer.flush()
+        self.assertEqual(self.writer.stats['submits_blocked'], 1)
+        self.assertGreater(self.writer.stats['max_wait_ms'], 50)
+        self.assertEqual(self.writer.stats['batches_saved'], 4)
+
+
+    def test_failure_is_counted_and_reported(self):
+        def fail():
+            raise OSError("disk full")
+
+        future = self.writer.submit(fail)
+        self.assertIsInstance(future.exception(timeout=5), OSError)
+        self.writer.submit(lambda: "ok").result(timeout=5)
+        self.assertEqual(self.writer.stats['batches_failed'], 1)
+        self.assertEqual(self.writer.stats['batches_saved'], 1)
+
+
+    def test_close_saves_queued_batches(self):
+        """Batches still queued at exit are saved, not lost with the daemon thread."""
+        release = threading.Event()
+        saved = []
+        self.writer.submit(release.wait)
+        self.writer.submit(saved.append, 1)
+        self.writer.submit(saved.append, 2)
+        threading.Timer(0.1, release.set).start()
+        with patch("builtins.print") as output:
+            self.writer.close(timeout=5)
+        self.assertEqual(saved, [1, 2])
+        self.assertIn("Saving 3 queued batches", str(output.call_args_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
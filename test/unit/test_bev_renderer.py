@@ -0,0 +1,115 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-28
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+from utils.batch_writer import BatchWriter
+from utils.bev_renderer import CLASS_COLOURS, BevRenderer, hold_counts
+from utils.lidar_buffer import LidarBuffer
+from utils.zone_map import ZoneMap
+
+# Stand-in for ffmpeg that stores the byte count of the raw frames on stdin.
+FAKE_FFMPEG = r'''#!{python}
+import sys
+with open(sys.argv[-1], "w") as f:
+    f.write(str(len(sys.stdin.buffer.read())))
+'''
+
+
+def _frame(frame_count, timestamp, objects):
+    return {"frame_count": frame_count, "timestamp": timestamp, "objects": objects}
+
+
+PERSON = {"id": 7, "classification": "PERSON", "heading": 90.0,
+          "position": {"x": 10.0, "y": 0.0, "z": 0.0},
+          "dimensions": {"length": 4.0, "width": 2.0, "height": 1.7}}
+
+
+class TestBevRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.missing_ffmpeg = os.path.join(self.tmp_dir, "no-ffmpeg")
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+    def test_box_is_drawn_at_position_and_heading(self):
+        renderer = BevRenderer(size=(200, 200), range_m=20.0)  # 5 px per metre
+        image = renderer.render_array(_frame(1, 0, [PERSON]))
+        self.assertEqual(image.shape, (200, 200, 3))
+
+        colour = list(CLASS_COLOURS["PERSON"])
+        # Heading 90 degrees: the 4 m length runs along y, the 2 m width along x,
+        # so the box spans x 9..11 m (px 145..155) and y -2..2 m (px 90..110).
+        self.assertEqual(image[100, 145].tolist(), colour)
+        self.assertEqual(image[100, 155].tolist(), colour)
+        self.assertEqual(image[90, 150].tolist(), colour)
+        self.assertNotEqual(image[100, 140].tolist(), colour)
+        self.assertEqual(renderer.stats['frames_rendered'], 1)
+
+
+    def test_zones_are_drawn_under_objects(self):
+        zone_map = ZoneMap.from_dict({"zones": [
+            {"name": "crosswalk", "kind": "crosswalk", "polygon": [[-10, -10], [-2, -10], [-2, 10], [-10, 10]]}]})
+        with_zones = BevRenderer(zone_map, size=(200, 200), range_m=20.0).render_array(_frame(1, 0, []))
+        plain = BevRenderer(size=(200, 200), range_m=20.0).render_array(_frame(1, 0, []))
+        self.assertGreater(with_zones[100, 70].sum(), plain[100, 70].sum())
+        self.assertEqual(with_zones[100, 150].tolist(), plain[100, 150].tolist())
+
+
+    def test_hold_counts_follow_timestamps(self):
+        frames = [_frame(1, 0, []), _frame(2, 100_000, []), _frame(3, 400_000, []),
+                  _frame(4, 60_000_000, []), _frame(5, None, [])]
+        self.assertEqual(hold_counts(frames, 10), [1, 3, 10, 1, 1])
+
+
+    def test_write_video_pipes_raw_frames_to_ffmpeg(self):
+        ffmpeg = os.path.join(self.tmp_dir, "ffmpeg")
+        with open(ffmpeg, "w") as f:
+            f.write(FAKE_FFMPEG.format(python=sys.executable))
+        os.chmod(ffmpeg, os.stat(ffmpeg).st_mode | stat.S_IEXEC)
+        renderer = BevRenderer(size=(64, 48), ffmpeg=ffmpeg)
+
+        output = os.path.join(self.tmp_dir, "batch.mp4")
+        frames = [_frame(1, 0, [PERSON]), _frame(2, 200_000, [PERSON]), _frame(3, 300_000, [])]
+        self.assertEqual(renderer.write_video(frames, output), output)
+        with open(output) as f:
+            self.assertEqual(int(f.read()), (2 + 1 + 1) * 64 * 48 * 3)
+        self.assertEqual(renderer.stats['videos_written'], 1)
+
+
+    def test_batches_become_png_sequences_without_ffmpeg(self):
+        """LidarBuffer draws every batch itself; no screen capture is started."""
+        renderer = BevRenderer(size=(64, 48), ffmpeg=self.missing_ffmpeg)
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        writer = BatchWriter()
+        try:
+            buffer = LidarBuffer(max_frames=2, min_video_duration=0, batch_writer=writer,
+                                 session_codec="none", renderer=renderer)
+            self.assertIsNone(buffer.recorder)
+            video_path = buffer.start_screen_recording()
+            for frame_count in range(5):
+                video_path = buffer.add_data({"object_list": [_frame(frame_count, frame_count * 100_000, [PERSON])]},
+                                             video_path)
+            self.assertTrue(buffer.stop_recording(video_path))
+        finally:
+            writer.close(timeout=30)
+            os.chdir(cwd)
+
+        videos_dir = os.path.join(self.tmp_dir, "data", "videos")
+        self.assertEqual(sorted(os.listdir(videos_dir)), ["0", "3"])
+        self.assertEqual(sorted(os.listdir(os.path.join(videos_dir, "0"))),
+                         ["000000.png", "000001.png", "000002.png"])
+        self.assertEqual(renderer.stats['sequences_written'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 # Author: Fengze Yang, Email: fred.yang@utah.edu
 # Date: 2025-03-21
 
+import time
 import unittest
-from modules.data_ingestion import DataIngestion
+from modules.data_ingestion import DataIngestion, SensorIngestion
+from utils.fake_sensor import FakeSensorServer
 
 
 class TestDataIngestion(unittest.TestCase):
@@ -32,6 +34,42 @@ class TestDataIngestion(unittest.TestCase):
             self.assertIn("position", obj)
 
 
+    def test_get_lidar_batch(self):
+        """Test that get_lidar_batch returns the same objects as a FrameBatch."""
+        lidar_data = self.ingestion.get_lidar_data()
+        batch = self.ingestion.get_lidar_batch()
+        self.assertEqual(len(batch), len(lidar_data))
+        self.assertEqual(list(batch.objects["id"]), [obj["id"] for obj in lidar_data])
+
+
+class TestSensorIngestion(unittest.TestCase):
+
+    def test_keeps_newest_frame(self):
+        """Frames arriving faster than they are read replace each other."""
+        frames = [{"object_list": [{"frame_count": i, "timestamp": i,
+                                    "objects": [{"id": i, "classification": "PERSON",
+                                                 "position": {"x": 1.0, "y": 2.0, "z": 0.0}}]}]}
+                  for i in range(5)]
+        server = FakeSensorServer(frames, rate_hz=None, loop=False, heartbeat_every=2)
+        port = server.start_in_thread()
+        ingestion = SensorIngestion(("127.0.0.1", port))
+        self.assertEqual(len(ingestion.get_lidar_batch()), 0)
+        try:
+            ingestion.start()
+            deadline = time.monotonic() + 5.0
+            while not ingestion.stats['connection_lost'] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            lidar_data = ingestion.get_lidar_data()
+        finally:
+            ingestion.stop()
+            server.stop_thread()
+
+        self.assertEqual([obj["id"] for obj in lidar_data], ["4"])
+        self.assertEqual(ingestion.stats['frames_received'], 5)
+        self.assertEqual(ingestion.stats['frames_replaced'], 4)
+        self.assertEqual(ingestion.stats['frames_consumed'], 1)
+
+
 if __name__ == '__main__':
     unittest.main()
     
\ No newline at end of file
@@ -0,0 +1,99 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-21
+
+import json
+import unittest
+from pathlib import Path
+
+from utils.fp_filter import FalsePositiveFilter
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+
+def _person(**overrides):
+    obj = {
+        "id": "P1",
+        "classification": "PERSON",
+        "classification_confidence": 0.9,
+        "num_points": 40,
+        "dimensions": {"length": 0.6, "width": 0.6, "height": 1.7},
+        "position": {"x": 0.0, "y": 20.0, "z": 1.0},
+        "heading": 0.0,
+        "creation_ts": 1_000_000,
+        "update_ts": 3_000_000,
+    }
+    obj.update(overrides)
+    return obj
+
+
+def _vehicle(x, y, heading=0.0):
+    return {
+        "id": "V1",
+        "classification": "VEHICLE",
+        "dimensions": {"length": 4.8, "width": 2.0, "height": 1.6},
+        "position": {"x": x, "y": y, "z": 0.9},
+        "heading": heading,
+    }
+
+
+class TestFalsePositiveFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.fp_filter = FalsePositiveFilter()
+
+
+    def _first_rule(self, obj, *others):
+        frame = {"frame_count": 1, "objects": [obj, *others]}
+        accepted, suppressed = self.fp_filter.check_frame(frame, [obj])
+        return suppressed[0][1] if suppressed else None
+
+
+    def test_plausible_person_is_accepted(self):
+        self.assertIsNone(self._first_rule(_person()))
+
+
+    def test_example_frame_person_is_accepted(self):
+        frame = json.loads(EXAMPLE_FRAME.read_text())["object_list"][0]
+        candidates = [obj for obj in frame["objects"] if obj["classification"] == "PERSON"]
+        accepted, suppressed = self.fp_filter.check_frame(frame, candidates)
+        self.assertEqual(len(accepted), 1)
+        self.assertEqual(suppressed, [])
+
+
+    def test_each_rule(self):
+        self.assertEqual(self._first_rule(_person(classification_confidence=0.3)), "low_confidence")
+        self.assertEqual(self._first_rule(_person(num_points=3)), "sparse_points")
+        self.assertEqual(self._first_rule(_person(dimensions={"length": 4.5, "width": 1.9, "height": 1.5})),
+                         "dimension_prior")
+        self.assertEqual(self._first_rule(_person(update_ts=1_100_000)), "track_age")
+
+
+    def test_vehicle_overlap_uses_heading(self):
+        """The person is 2 m from the vehicle centre: inside along its length, outside across it."""
+        person = _person(position={"x": 2.0, "y": 20.0, "z": 1.0})
+        self.assertEqual(self._first_rule(person, _vehicle(0.0, 20.0, heading=0.0)), "vehicle_overlap")
+        self.assertIsNone(self._first_rule(person, _vehicle(0.0, 20.0, heading=90.0)))
+
+
+    def test_counters(self):
+        """Rule hits count every flag; an avoided session is counted once per idle run."""
+        bad = _person(classification_confidence=0.1, num_points=1)
+        frame = {"frame_count": 1, "objects": [bad]}
+        for _ in range(3):
+            _, suppressed = self.fp_filter.check_frame(frame, [bad])
+            self.fp_filter.record_idle_frame(suppressed)
+        self.fp_filter.record_idle_frame([])
+        _, suppressed = self.fp_filter.check_frame(frame, [bad])
+        self.fp_filter.record_idle_frame(suppressed)
+
+        self.assertEqual(self.fp_filter.detections_checked, 4)
+        self.assertEqual(self.fp_filter.detections_suppressed, 4)
+        self.assertEqual(self.fp_filter.rule_hits["low_confidence"], 4)
+        self.assertEqual(self.fp_filter.rule_hits["sparse_points"], 4)
+        self.assertEqual(self.fp_filter.sessions_avoided["low_confidence"], 2)
+        self.assertEqual(self.fp_filter.sessions_avoided["sparse_points"], 0)
+        self.assertIn("low_confidence", self.fp_filter.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
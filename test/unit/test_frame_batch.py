@@ -0,0 +1,76 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-16
+
+import json
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from utils.frame_batch import CLASS_CODES, FrameBatch
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+
+class TestFrameBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = json.loads(EXAMPLE_FRAME.read_text())["object_list"][0]
+        self.batch = FrameBatch.from_gemini(self.frame)
+
+
+    def test_from_gemini(self):
+        """Every object becomes one row with its class code and kinematics."""
+        self.assertEqual(len(self.batch), len(self.frame["objects"]))
+        self.assertEqual(self.batch.frame_count, 16421192)
+        first = self.batch.objects[0]
+        self.assertEqual(first["id"], "3776481")
+        self.assertEqual(first["class_code"], CLASS_CODES["VEHICLE"])
+        self.assertAlmostEqual(float(first["x"]), 25.8, places=4)
+        self.assertAlmostEqual(float(first["length"]), 4.944, places=4)
+        self.assertEqual(first["creation_ts"], 1743200482880765)
+        self.assertEqual(int(self.batch.vru_mask().sum()), 1)
+
+
+    def test_gemini_round_trip(self):
+        """to_gemini() restores the columns held by the batch."""
+        restored = self.batch.to_gemini()
+        self.assertEqual(restored["frame_count"], self.frame["frame_count"])
+        original, converted = self.frame["objects"][0], restored["objects"][0]
+        for key in ("id", "classification", "num_points", "creation_ts", "position", "dimensions"):
+            self.assertEqual(converted[key], original[key])
+
+
+    def test_bytes_round_trip(self):
+        restored = FrameBatch.from_bytes(self.batch.to_bytes())
+        self.assertEqual(restored.frame_count, self.batch.frame_count)
+        self.assertTrue(np.array_equal(restored.objects, self.batch.objects))
+
+
+    def test_scene_objects(self):
+        """The DataIngestion format converts to velocity vectors and back."""
+        scene = [{"id": "OBJ456", "type": "PEDESTRIAN", "position": {"x": 13.1, "y": 38.5},
+                  "speed_mps": 1.2, "heading_deg": 90.0}]
+        batch = FrameBatch.from_scene_objects(scene)
+        self.assertTrue(batch.vru_mask()[0])
+        self.assertAlmostEqual(float(batch.objects["vy"][0]), 1.2, places=5)
+        converted = batch.to_scene_objects()[0]
+        self.assertEqual(converted["id"], "OBJ456")
+        self.assertEqual(converted["speed_mps"], 1.2)
+        self.assertEqual(converted["heading_deg"], 90.0)
+
+
+    def test_missing_kinematics_are_nan(self):
+        batch = FrameBatch.from_scene_objects([{"id": "OBJ1"}])
+        self.assertTrue(np.isnan(batch.objects["x"][0]))
+        self.assertTrue(np.isnan(batch.speeds()[0]))
+
+
+    def test_within_radius(self):
+        near = self.batch.within_radius(25.8, 3.23, 1.0)
+        self.assertEqual(len(near), 1)
+        self.assertEqual(near.objects["id"][0], "3776481")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-12
+
+import json
+import unittest
+from pathlib import Path
+from utils.frame_decoder import (
+    DetectedObject, ObjectListMessage, available_backends, compile_classification_screen,
+    get_decoder, message_from_dict
+)
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+
+class TestFrameDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = EXAMPLE_FRAME.read_bytes()
+        self.expected = json.loads(self.payload)
+
+
+    def test_stdlib_backend_always_available(self):
+        self.assertIn("json", available_backends())
+        self.assertEqual(get_decoder("json").name, "json")
+
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_decoder("yaml")
+
+
+    def test_decode_matches_stdlib_for_every_backend(self):
+        """Every installed backend returns the same dicts, even from a memoryview."""
+        for name in available_backends():
+            with self.subTest(backend=name):
+                data = get_decoder(name).decode(memoryview(self.payload))
+                self.assertEqual(data, self.expected)
+
+
+    def test_decode_typed_schema(self):
+        """Typed decoding exposes the Gemini object fields as attributes."""
+        reference = message_from_dict(self.expected)
+        for name in available_backends():
+            with self.subTest(backend=name):
+                message = get_decoder(name).decode_typed(memoryview(self.payload))
+                self.assertIsInstance(message, ObjectListMessage)
+                self.assertEqual(message, reference)
+
+                frame = message.object_list[0]
+                self.assertEqual(frame.frame_count, 16421192)
+                obj = frame.objects[0]
+                self.assertIsInstance(obj, DetectedObject)
+                self.assertEqual(obj.classification, "VEHICLE")
+                self.assertAlmostEqual(obj.position.x, 25.8)
+                self.assertAlmostEqual(obj.dimensions.length, 4.944)
+                self.assertEqual(obj.creation_ts, 1743200482880765)
+
+
+    def test_decode_typed_heartbeat(self):
+        for name in available_backends():
+            with self.subTest(backend=name):
+                message = get_decoder(name).decode_typed(b'{"heartbeat": [{}]}')
+                self.assertEqual(message.object_list, [])
+                self.assertIsNotNone(message.heartbeat)
+
+
+    def test_slotted_objects(self):
+        """Schema classes use __slots__, so no per-instance __dict__."""
+        self.assertFalse(hasattr(DetectedObject(), "__dict__"))
+
+
+    def test_classification_screen(self):
+        """The raw-byte screen finds classification values, not sub-classifications."""
+        screen = compile_classification_screen({"PERSON", "BICYCLE"})
+        self.assertIsNotNone(screen.search(memoryview(self.payload)))
+        self.assertIsNotNone(screen.search(b'{"classification":"BICYCLE"}'))
+        self.assertIsNone(screen.search(b'{"classification": "VEHICLE", "sub_classification": "PERSON"}'))
+        self.assertIsNone(screen.search(b'{"heartbeat": [{}]}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-08
+
+import json
+import socket
+import threading
+import unittest
+from utils.frame_reader import FrameReader
+
+
+def _frame(payload: bytes) -> bytes:
+    return len(payload).to_bytes(4, "big") + payload
+
+
+class TestFrameReader(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+
+    def test_read_single_frame(self):
+        """A complete frame is returned as a view over the payload bytes."""
+        self.server.sendall(_frame(b'{"object_list": []}'))
+        reader = FrameReader(self.client)
+        payload = reader.read_frame()
+        self.assertIsInstance(payload, memoryview)
+        self.assertEqual(bytes(payload), b'{"object_list": []}')
+        self.assertEqual(reader.frames_read, 1)
+
+
+    def test_frames_split_across_packets(self):
+        """Frames arriving in small, misaligned chunks are reassembled."""
+        frames = [json.dumps({"frame_count": i}).encode() for i in range(20)]
+        stream = b"".join(_frame(f) for f in frames)
+
+        def send_in_chunks():
+            for i in range(0, len(stream), 7):
+                self.server.sendall(stream[i:i + 7])
+            self.server.close()
+
+        sender = threading.Thread(target=send_in_chunks)
+        sender.start()
+        received = [bytes(p) for p in FrameReader(self.client, buffer_size=32)]
+        sender.join()
+        self.assertEqual(received, frames)
+
+
+    def test_buffer_grows_for_large_frame(self):
+        """A frame larger than the initial buffer is still read intact."""
+        big = b"x" * 5000
+        self.server.sendall(_frame(big) + _frame(b"tail"))
+        reader = FrameReader(self.client, buffer_size=64)
+        self.assertEqual(bytes(reader.read_frame()), big)
+        self.assertEqual(bytes(reader.read_frame()), b"tail")
+
+
+    def test_eof_returns_none(self):
+        """A closed connection, including mid-frame, ends the stream."""
+        self.server.sendall((100).to_bytes(4, "big") + b"partial")
+        self.server.close()
+        reader = FrameReader(self.client)
+        self.assertIsNone(reader.read_frame())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-21
+
+import tracemalloc
+import unittest
+from utils.frame_ring import FrameRing
+
+
+def _payload(i):
+    return memoryview(b'{"object_list":[{"frame_count":%d}]}' % i)
+
+
+class TestFrameRing(unittest.TestCase):
+
+    def test_keeps_last_frames_oldest_first(self):
+        ring = FrameRing(capacity=4, frame_bytes=64)
+        for i in range(10):
+            self.assertTrue(ring.append(_payload(i)))
+        self.assertEqual(len(ring), 4)
+        self.assertEqual([bytes(p) for p in ring.flush()], [bytes(_payload(i)) for i in range(6, 10)])
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.stats['frames_overwritten'], 6)
+        self.assertEqual(ring.stats['frames_flushed'], 4)
+
+
+    def test_flushed_views_survive_new_frames(self):
+        """Views from flush() point into the idle arena, so appends do not change them."""
+        ring = FrameRing(capacity=2, frame_bytes=64)
+        ring.append(_payload(1))
+        flushed = ring.flush()
+        for i in range(2, 6):
+            ring.append(_payload(i))
+        self.assertEqual(bytes(flushed[0]), bytes(_payload(1)))
+        self.assertEqual([bytes(p) for p in ring.flush()], [bytes(_payload(4)), bytes(_payload(5))])
+
+
+    def test_dense_frame_above_the_average_is_kept(self):
+        """Payloads are packed by length; a frame above frame_bytes pushes out older ones."""
+        ring = FrameRing(capacity=4, frame_bytes=64)
+        for i in range(3):
+            ring.append(_payload(i))
+        dense = b"x" * 200
+        self.assertTrue(ring.append(dense))
+        self.assertTrue(ring.append(_payload(9)))
+        flushed = [bytes(p) for p in ring.flush()]
+        self.assertEqual(flushed[-2:], [dense, bytes(_payload(9))])
+        self.assertLessEqual(sum(map(len, flushed)), 4 * 64)
+        self.assertEqual(ring.stats['frames_too_large'], 0)
+
+
+    def test_oversized_payload_is_not_kept(self):
+        ring = FrameRing(capacity=2, frame_bytes=8)
+        self.assertFalse(ring.append(b"x" * 17))
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.stats['frames_too_large'], 1)
+
+
+    def test_memory_is_constant(self):
+        ring = FrameRing(capacity=30, frame_bytes=4096)
+        for i in range(100):
+            ring.append(_payload(i))
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            for i in range(5000):
+                ring.append(_payload(i))
+                if i % 500 == 0:
+                    ring.flush()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        self.assertLess(growth, 16 * 1024)
+        self.assertEqual(ring.memory_bytes, 2 * 30 * 4096)
+
+
+if __name__ == '__main__':
+    unittest.main()
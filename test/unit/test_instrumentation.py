@@ -0,0 +1,91 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-14
+
+import random
+import unittest
+import urllib.request
+
+from utils.instrumentation import Instrumentation, LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_within_resolution(self):
+        histogram = LatencyHistogram("decode")
+        rng = random.Random(0)
+        values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+        for value in values:
+            histogram.record_us(value)
+
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(histogram.max_us, values[-1])
+        for q in (50, 90, 99):
+            exact = values[int(len(values) * q / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(q), exact, delta=exact * 0.01 + 1)
+
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram("send")
+        for value in (3, 3, 3, 7, 250):
+            histogram.record_us(value)
+        self.assertEqual(histogram.percentile(50), 3)
+        self.assertEqual(histogram.percentile(100), 250)
+        self.assertEqual(histogram.count_at_or_below(7), 4)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Instrumentation()
+
+
+    def test_timer_and_decorator(self):
+        @self.registry.timed("parse")
+        def parse(text):
+            return text.upper()
+
+        with self.registry.timer("prompt_build"):
+            pass
+        self.assertEqual(parse("ok"), "OK")
+        self.registry.record("llm_prefill", 0.25)
+
+        summary = self.registry.summary()
+        self.assertEqual(sorted(summary), ["llm_prefill", "parse", "prompt_build"])
+        self.assertAlmostEqual(summary["llm_prefill"]["p50_ms"], 250.0, delta=2.5)
+
+
+    def test_disabled_records_nothing(self):
+        self.registry.enabled = False
+
+        @self.registry.timed("parse")
+        def parse():
+            return 1
+
+        with self.registry.timer("decode"):
+            pass
+        self.assertEqual(parse(), 1)
+        self.registry.record("decode", 1.0)
+        self.assertEqual(self.registry.histograms, {})
+
+
+    def test_prometheus_endpoint(self):
+        for seconds in (0.0004, 0.003, 0.003, 2.0):
+            self.registry.record("frame_decode", seconds)
+        text = self.registry.prometheus_text()
+        self.assertIn('shield_rsu_stage_latency_seconds_bucket{stage="frame_decode",le="0.0005"} 1', text)
+        self.assertIn('shield_rsu_stage_latency_seconds_bucket{stage="frame_decode",le="0.005"} 3', text)
+        self.assertIn('shield_rsu_stage_latency_seconds_bucket{stage="frame_decode",le="+Inf"} 4', text)
+        self.assertIn('shield_rsu_stage_latency_seconds_count{stage="frame_decode"} 4', text)
+
+        server = self.registry.serve(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertEqual(response.read().decode("utf-8"), text)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
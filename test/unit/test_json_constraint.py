@@ -0,0 +1,112 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-02
+
+import json
+import types
+import unittest
+
+from modules.json_constraint import JsonConstraint, JsonPrefixValidator, close_truncated
+
+ANSWER = '{"dangerous_objects": [{"id": "OBJ1", "risk_score": 0.95, "ttc_s": -1.5e2, "vru": true, "notes": "a\\"b\\u00e9"}, {}]}'
+
+
+def _accepts(text):
+    return JsonPrefixValidator().feed_text(text)
+
+
+class _Ids:
+    """Minimal stand-in for a (1, N) token id tensor."""
+    def __init__(self, ids):
+        self.ids = ids
+        self.shape = (1, len(ids))
+
+    def __getitem__(self, index):
+        row, columns = index
+        return _Ids(self.ids[columns])
+
+    def tolist(self):
+        return self.ids
+
+
+class _Scores:
+    """Minimal stand-in for one row of logits."""
+    def __init__(self, values):
+        self.values = values
+        self.shape = (len(values),)
+
+    def topk(self, k):
+        order = sorted(range(len(self.values)), key=lambda i: -self.values[i])[:k]
+        return types.SimpleNamespace(indices=types.SimpleNamespace(tolist=lambda: order))
+
+
+class TestJsonPrefixValidator(unittest.TestCase):
+
+    def test_accepts_schema_answer(self):
+        validator = JsonPrefixValidator()
+        self.assertTrue(validator.feed_text(ANSWER))
+        self.assertTrue(validator.complete)
+        self.assertEqual(len(json.loads(ANSWER)["dangerous_objects"]), 2)
+
+
+    def test_every_prefix_is_accepted_but_incomplete(self):
+        for end in range(len(ANSWER)):
+            validator = JsonPrefixValidator()
+            self.assertTrue(validator.feed_text(ANSWER[:end]), ANSWER[:end])
+            self.assertFalse(validator.complete)
+
+
+    def test_rejects_off_schema_output(self):
+        for text in ('Sure! {', '[', '{}', '{"dangerous":', '{"dangerous_objects": {',
+                     '{"dangerous_objects": [1', '{"dangerous_objects": [], "x"',
+                     '{"dangerous_objects": []} x', '{"dangerous_objects": [{"a": 01',
+                     '{"dangerous_objects": [{"a": 1.e', '{"dangerous_objects": [{"a": tru}',
+                     '{"dangerous_objects": [{"a": "\\x"', '{"dangerous_objects": [{"a" 1'):
+            self.assertFalse(_accepts(text), text)
+
+
+    def test_whitespace_is_limited(self):
+        self.assertFalse(_accepts(' {'))
+        self.assertFalse(_accepts('{  \n"dangerous_objects"'))
+        self.assertFalse(_accepts('{"dangerous_objects": []}\n'))
+        self.assertFalse(_accepts('{"dangerous_objects": [{"a": "x   '))
+        self.assertTrue(_accepts('{ "dangerous_objects" :\n [ {"a": "x  y"},\n {} ] }'))
+        self.assertTrue(JsonPrefixValidator(max_whitespace=None).feed_text('{\n    "dangerous_objects": ['))
+
+
+    def test_whitespace_loving_model_completes(self):
+        """Greedy decoding under the constraint closes the object although whitespace always scores best."""
+        vocab = ['\n', ' ', '  ', '}', ']', '":', 'dangerous_objects', '[', '{"']
+        scores = _Scores([10.0, 9.0, 8.0, 5.0, 4.0, 3.0, 2.0, 1.0, 0.5])
+        constraint = JsonConstraint(vocab.__getitem__, prompt_length=0, batch_size=1, eos_token_id=99)
+        validator = JsonPrefixValidator()
+        text = ""
+        for _ in range(40):
+            token = constraint.best_valid_token(validator, scores)
+            self.assertIsNotNone(token)
+            validator.feed_text(vocab[token])
+            text += vocab[token]
+            if validator.complete:
+                break
+        self.assertTrue(validator.complete, repr(text))
+        self.assertEqual(text, '{"dangerous_objects":\n\n[\n\n]\n\n}')
+        self.assertEqual(json.loads(text), {"dangerous_objects": []})
+
+
+    def test_close_truncated(self):
+        truncated = '{"dangerous_objects": [{"id": "A", "risk_score": 0.9}, {"id": "B", "risk'
+        self.assertEqual(json.loads(close_truncated(truncated)),
+                         {"dangerous_objects": [{"id": "A", "risk_score": 0.9}]})
+        self.assertEqual(json.loads(close_truncated('{"dangerous_objects": [')), {"dangerous_objects": []})
+        self.assertEqual(close_truncated(ANSWER + "<|im_end|>"), ANSWER)
+        self.assertIsNone(close_truncated('{"dangerous_obj'))
+
+
+    def test_stops_when_json_closes(self):
+        vocab = ['{"', 'dangerous_objects', '":', ' []', '}', ' trailing']
+        constraint = JsonConstraint(vocab.__getitem__, prompt_length=2, batch_size=1, eos_token_id=99)
+        self.assertEqual(constraint.is_done(_Ids([7, 7, 0, 1, 2, 3])), [False])
+        self.assertEqual(constraint.is_done(_Ids([7, 7, 0, 1, 2, 3, 4])), [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
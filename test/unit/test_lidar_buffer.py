@@ -0,0 +1,97 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-30
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from utils.batch_writer import BatchWriter
+from utils.bev_renderer import BevRenderer
+from utils.lidar_buffer import LidarBuffer
+
+
+def _frames(count, first=1000, with_timestamps=True):
+    return [{"frame_count": first + i, "timestamp": 1_000_000 + i * 100_000 if with_timestamps else None,
+             "objects": []} for i in range(count)]
+
+
+class TestLidarBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        self.writer = BatchWriter()
+
+
+    def tearDown(self):
+        self.writer.close(timeout=30)
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir)
+
+
+    def _buffer(self, **kwargs):
+        return LidarBuffer(max_frames=100, min_video_duration=6, batch_writer=self.writer,
+                           session_codec="none", **kwargs)
+
+
+    def test_batch_duration_from_frames(self):
+        buffer = self._buffer(recorder=MagicMock())
+        self.assertAlmostEqual(buffer._batch_duration(_frames(70)), 7.0)
+        # Dropped frames: timestamps, not the frame count, give the duration
+        self.assertAlmostEqual(buffer._batch_duration(_frames(70)[::2]), 6.9)
+        self.assertAlmostEqual(buffer._batch_duration(_frames(40, with_timestamps=False)), 4.0)
+        self.assertEqual(buffer._batch_duration([]), 0.0)
+        # A video cut from the screen capture is no longer than its span
+        self.assertAlmostEqual(buffer._batch_duration(_frames(70), (100.0, 105.5)), 5.5)
+
+
+    def test_validity_without_probing_the_video(self):
+        """Batches are classified from their frames; no ffprobe process runs."""
+        buffer = self._buffer(renderer=BevRenderer(size=(32, 32), ffmpeg="no-such-ffmpeg"))
+        with patch("subprocess.run") as run:
+            video_path = buffer.start_screen_recording()
+            buffer.add_data({"object_list": _frames(30)}, video_path)
+            self.assertFalse(buffer.stop_recording(video_path))
+
+            video_path = buffer.start_screen_recording()
+            buffer.add_data({"object_list": _frames(70, first=2000)}, video_path)
+            self.assertTrue(buffer.stop_recording(video_path))
+        run.assert_not_called()
+
+        self.assertEqual(os.listdir(os.path.join("data", "invalid_videos")), ["1000"])
+        self.assertEqual(os.listdir(os.path.join("data", "videos")), ["2000"])
+
+
+    def test_pre_event_frames_extend_the_video_span(self):
+        """The first batch's video starts with the pre-event frames saved in front of it."""
+        recorder = MagicMock()
+        buffer = self._buffer(recorder=recorder)
+        video_path = buffer.start_screen_recording()
+        started_at = buffer.batch_started_at
+        payloads = [json.dumps({"object_list": [frame]}).encode() for frame in _frames(30, first=970)]
+        self.assertEqual(buffer.add_pre_event(payloads), 30)
+        self.assertAlmostEqual(started_at - buffer.batch_started_at, 3.0)
+
+        buffer.add_data({"object_list": _frames(40)}, video_path)
+        buffer.stop_recording(video_path)
+        start, end = recorder.export.call_args.args[:2]
+        self.assertAlmostEqual(start, started_at - 3.0)
+        self.assertGreaterEqual(end, started_at)
+
+
+    def test_audit_reports_mismatched_video(self):
+        buffer = self._buffer(recorder=MagicMock(), audit_video=True)
+        with open("batch.mp4", "wb") as f:
+            f.write(b"video")
+        probe = MagicMock(stdout="3.00\n")
+        with patch("subprocess.run", return_value=probe) as run, patch("builtins.print") as output:
+            self.assertTrue(buffer._validate_video_duration("batch.mp4", 7.0))
+        run.assert_called_once()
+        self.assertIn("batch.mp4 is 3.00 seconds long", str(output.call_args_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-07
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from modules.llm_backends import (BACKENDS, HFBackend, LLMBackend, LlamaCppBackend,
+                                  available_backends, get_backend, resident_memory_mb)
+
+
+class _CountingBackend(LLMBackend):
+    name = "counting"
+
+    def __init__(self):
+        super().__init__("counting-model")
+        self.loads = 0
+
+    def _load(self):
+        self.loads += 1
+
+
+class TestLLMBackends(unittest.TestCase):
+
+    def test_load_is_lazy_and_runs_once(self):
+        backend = _CountingBackend()
+        self.assertFalse(backend.loaded)
+        self.assertEqual(backend.loads, 0)
+
+        self.assertIs(backend.load(), backend)
+        backend.load()
+        self.assertTrue(backend.loaded)
+        self.assertEqual(backend.loads, 1)
+        self.assertEqual(set(backend.load_stats), {'load_s', 'rss_before_mb', 'rss_after_mb'})
+        self.assertGreater(resident_memory_mb(), 0)
+
+
+    def test_construction_reads_nothing(self):
+        self.assertFalse(HFBackend("not/a-model").loaded)
+        missing = LlamaCppBackend(model_path=Path("properties/models/missing.gguf"))
+        self.assertFalse(missing.loaded)
+        with self.assertRaises(FileNotFoundError):
+            missing.load()
+        self.assertFalse(missing.loaded)
+
+
+    def test_get_backend(self):
+        self.assertTrue(set(available_backends()) <= set(BACKENDS))
+        self.assertIsInstance(get_backend("llama.cpp"), LlamaCppBackend)
+        with self.assertRaises(ValueError):
+            get_backend("onnx")
+
+
+
+    def test_system_imports_without_torch(self):
+        """The llama.cpp backend targets boxes without torch; main must import there."""
+        src_dir = Path(__file__).resolve().parents[2] / "src"
+        code = ("import sys; sys.modules['torch'] = sys.modules['transformers'] = None; "
+                "import main, modules.speculative")
+        result = subprocess.run([sys.executable, "-c", code], cwd=src_dir, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,11 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
+from modules.llm_backends import LLMBackend, available_backends
 from modules.llm_inference import LLMInference
 
 
+@unittest.skipUnless(available_backends(), "no LLM backend installed")
 class TestLLMInference(unittest.TestCase):
     def setUp(self):
         """Initialize LLMInference before each test."""
@@ -61,6 +63,15 @@ class TestLLMInference(unittest.TestCase):
         self.assertIn('"location_x": 0.0', prompt)
 
 
+    def test_format_prompt_extends_template(self):
+        """The cached template is a prefix of every prompt; only the scene part varies."""
+        prompt = self.inference._format_prompt(self.sample_ego_data, self.sample_lidar_objects)
+        template = self.inference.prompt_template
+        self.assertTrue(prompt.startswith(template))
+        self.assertEqual(prompt[len(template):],
+                         self.inference._format_scene(self.sample_ego_data, self.sample_lidar_objects))
+
+
     @patch("modules.llminference.json.loads", return_value={"dangerous_objects":[{"id":"OBJXYZ"}]})
     def test_parse_llm_output(self, mock_json_loads):
         """Test that _parse_llm_output extracts JSON from the raw output."""
@@ -85,5 +96,37 @@ class TestLLMInference(unittest.TestCase):
         self.assertEqual(result["ranked_objects"][0]["id"], "OBJ999")
 
 
+class _WordBackend(LLMBackend):
+    """Counts whitespace-separated words as tokens; never loads a model."""
+    name = "words"
+
+    def __init__(self):
+        super().__init__("word-model")
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+
+class TestSceneTokenSavings(unittest.TestCase):
+
+    EGO_DATA = {"location_x": 0.0, "location_y": 0.0, "speed_mps": 10.0, "heading_deg": 90.0}
+    LIDAR_OBJECTS = [{"id": "OBJ123", "type": "VEHICLE", "position": {"x": 5.0, "y": 5.0},
+                      "speed_mps": 2.0, "heading_deg": 0.0}]
+
+    @patch("modules.llm_inference.Path.read_text", return_value="Mock Prompt")
+    def test_savings_are_measured_only_when_configured(self, mock_read_text):
+        inference = LLMInference(backend=_WordBackend(), draft_model=None)
+        inference._format_scene(self.EGO_DATA, self.LIDAR_OBJECTS)
+        self.assertEqual(inference.last_scene.verbose_tokens, 0)
+
+        with patch("modules.llm_inference.MEASURE_TOKEN_SAVINGS", True):
+            inference = LLMInference(backend=_WordBackend(), draft_model=None)
+        with self.assertLogs("SHIELD_RSU", level="INFO") as logs:
+            inference._format_scene(self.EGO_DATA, self.LIDAR_OBJECTS)
+        scene = inference.last_scene
+        self.assertGreater(scene.verbose_tokens, 0)
+        self.assertIn(f"{scene.tokens} tokens (indented JSON: {scene.verbose_tokens})", logs.output[0])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-28
+
+import threading
+import unittest
+
+from modules.llm_server import LLMServer
+
+
+class TestLLMServer(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.generating = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+        def generate(prompts):
+            self.calls.append(list(prompts))
+            self.generating.set()
+            self.release.wait(5)
+            return [prompt.upper() for prompt in prompts]
+
+        self.server = LLMServer(generate, max_batch_size=8, max_batch_wait_s=0.0)
+
+
+    def tearDown(self):
+        self.release.set()
+        self.server.stop(timeout=5)
+
+
+    def test_batches_requests_queued_during_generate(self):
+        """Requests arriving while a batch runs are served together in the next batch."""
+        self.release.clear()
+        self.server.start()
+        first = self.server.submit("a")
+        self.assertTrue(self.generating.wait(5))
+        others = [self.server.submit(prompt) for prompt in ("b", "c", "d")]
+        self.release.set()
+
+        self.assertEqual(first.result(timeout=5), "A")
+        self.assertEqual([future.result(timeout=5) for future in others], ["B", "C", "D"])
+        self.assertEqual(self.calls, [["a"], ["b", "c", "d"]])
+        summary = self.server.summary()
+        self.assertEqual(summary['batches'], 2)
+        self.assertEqual(summary['requests_completed'], 4)
+        self.assertEqual(summary['mean_batch_size'], 2.0)
+
+
+    def test_finish_runs_on_output(self):
+        self.server.start()
+        future = self.server.submit("scene", finish=lambda output: {"raw": output})
+        self.assertEqual(future.result(timeout=5), {"raw": "SCENE"})
+
+
+    def test_generate_error_fails_the_batch(self):
+        server = LLMServer(lambda prompts: 1 / 0, max_batch_wait_s=0.0).start()
+        try:
+            with self.assertRaises(ZeroDivisionError):
+                server.submit("a").result(timeout=5)
+            self.assertEqual(server.stats['requests_failed'], 1)
+        finally:
+            server.stop(timeout=5)
+
+
+    def test_full_queue_drops_oldest(self):
+        server = LLMServer(lambda prompts: prompts, queue_size=2)
+        futures = [server.submit(prompt) for prompt in ("a", "b", "c")]
+        self.assertTrue(futures[0].cancelled())
+        self.assertEqual(server.stats['requests_dropped'], 1)
+        server.start()
+        self.assertEqual([future.result(timeout=5) for future in futures[1:]], ["b", "c"])
+        server.stop(timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 # Author: Fengze Yang, Email: fred.yang@utah.edu
 # Date: 2025-03-21
 
+import time
 import unittest
+from concurrent.futures import Future
 from unittest.mock import patch, MagicMock
 from main import SHIELDRSUSystem
 
@@ -40,13 +42,140 @@ class TestMain(unittest.TestCase):
         mock_comm_instance.send_personalized_message.assert_called_once()
 
 
+    @patch("main.LLMServer")
+    @patch("main.DataIngestion")
+    @patch("main.LLMInference")
+    @patch("main.Communication")
+    def test_run_cycle_async_llm(self, mock_comm, mock_llm, mock_ingestion, mock_server):
+        """
+        With async_llm the ambiguous scene is submitted once and the cycle
+        continues on the rule-based result while the answer is pending.
+        """
+        system = SHIELDRSUSystem(async_llm=True)
+
+        mock_ingest_instance = mock_ingestion.return_value
+        mock_ingest_instance.get_ego_data.return_value = {"location_x":0.0,"location_y":0.0}
+        mock_ingest_instance.get_lidar_data.return_value = [{"id":"OBJ1"}]
+
+        mock_llm_instance = mock_llm.return_value
+        mock_llm_instance.submit_analysis.return_value = Future()
+
+        system.run_cycle()
+        system.run_cycle()
+
+        mock_llm_instance.end_to_end_analysis.assert_not_called()
+        mock_llm_instance.submit_analysis.assert_called_once()
+        mock_comm.return_value.format_broadcast_message.assert_called_with([])
+
+
+    @patch("main.LLM_RESULT_MAX_AGE_S", 0.1)
+    @patch("main.LLMServer")
+    @patch("main.DataIngestion")
+    @patch("main.LLMInference")
+    @patch("main.Communication")
+    def test_slow_llm_answer_is_not_used(self, mock_comm, mock_llm, mock_ingestion, mock_server):
+        """
+        An answer that arrives after LLM_RESULT_MAX_AGE_S describes an old
+        scene, however recent its analysis_timestamp: the fallback is used.
+        """
+        system = SHIELDRSUSystem(async_llm=True)
+
+        mock_ingest_instance = mock_ingestion.return_value
+        mock_ingest_instance.get_ego_data.return_value = {"location_x":0.0,"location_y":0.0}
+        mock_ingest_instance.get_lidar_data.return_value = [{"id":"OBJ1"}]
+
+        slow, fast = Future(), Future()
+        fast.set_result({"ranked_objects":[{"id":"FRESH"}], "analysis_timestamp": int(time.time() * 1e6)})
+        mock_llm.return_value.submit_analysis.side_effect = [slow, fast, Future()]
+        format_broadcast = mock_comm.return_value.format_broadcast_message
+
+        system.run_cycle()  # Submits the slow scene
+        time.sleep(0.15)
+        slow.set_result({"ranked_objects":[{"id":"STALE"}], "analysis_timestamp": int(time.time() * 1e6)})
+
+        system.run_cycle()  # Slow answer arrives too late; the fast scene is submitted
+        format_broadcast.assert_called_with([])
+
+        system.run_cycle()  # Fast answer is fresh
+        format_broadcast.assert_called_with([{"id":"FRESH"}])
+
+
+    @patch("main.DataIngestion")
+    @patch("main.LLMInference")
+    @patch("main.Communication")
+    def test_pipeline_broadcasts_while_analysis_is_slow(self, mock_comm, mock_llm, mock_ingestion):
+        """
+        The pipeline keeps ingesting and broadcasting at 10 Hz while a slow
+        analysis stage only sees the newest frame.
+        """
+        system = SHIELDRSUSystem(pipelined=True)
+
+        mock_ingest_instance = mock_ingestion.return_value
+        mock_ingest_instance.get_ego_data.return_value = {"location_x":0.0,"location_y":0.0}
+        mock_ingest_instance.get_lidar_data.return_value = [{"id":"OBJ1"}]
+
+        analyse = system._analyse
+        system._analyse = lambda ego, lidar: time.sleep(0.35) or analyse(ego, lidar)
+
+        system.start_pipeline()
+        time.sleep(1.2)
+        system.stop_pipeline()
+
+        summary = system.pipeline_summary()
+        self.assertGreaterEqual(summary['frames_ingested'], 10)
+        self.assertLessEqual(summary['frames_analysed'], 4)
+        self.assertGreater(summary['frames_dropped'], 0)
+        self.assertGreaterEqual(summary['broadcasts_sent'], 5)
+        self.assertGreaterEqual(mock_comm.return_value.send_broadcast_message.call_count, 5)
+
+
+    @patch("main.DataIngestion")
+    @patch("main.LLMInference")
+    @patch("main.Communication")
+    def test_stale_result_is_not_broadcast(self, mock_comm, mock_llm, mock_ingestion):
+        """
+        Once the latest result is older than BROADCAST_MAX_AGE_S (analysis
+        failing or stalled) the communication stage stops repeating it.
+        """
+        system = SHIELDRSUSystem(pipelined=True)
+        system.latest_result = (time.monotonic() - 0.2, {"location_x":0.0}, [{"id":"OBJ1"}])
+        system._communication_stage()
+        self.assertEqual(system.stage_stats['broadcasts_sent'], 1)
+
+        system.latest_result = (time.monotonic() - 5.0, {"location_x":0.0}, [{"id":"OBJ1"}])
+        system._communication_stage()
+        system._communication_stage()
+        self.assertEqual(system.stage_stats['broadcasts_sent'], 1)
+        self.assertEqual(system.stage_stats['stale_results'], 2)
+        mock_comm.return_value.send_broadcast_message.assert_called_once()
+
+
     def test_main_loop(self):
         """
         This is more of an integration test. 
         Typically you'd test main_loop with a mocking approach or a minimal times run.
         """
         pass
-    
+
+
+    @patch("main.DataIngestion")
+    @patch("main.LLMInference")
+    @patch("main.Communication")
+    def test_main_loop_runs_without_metrics_port(self, mock_comm, mock_llm, mock_ingestion):
+        """A metrics port already in use does not stop the system."""
+        system = SHIELDRSUSystem(pipelined=True)
+        with patch("main.instrumentation.serve", side_effect=OSError("Address already in use")), \
+             patch("main.instrumentation.start_periodic_summary"), \
+             patch.object(system, "start_pipeline") as start_pipeline, \
+             patch.object(system, "stop_pipeline") as stop_pipeline, \
+             patch("main.time.sleep", side_effect=KeyboardInterrupt), \
+             self.assertLogs("SHIELD_RSU", level="WARNING") as logs:
+            with self.assertRaises(KeyboardInterrupt):
+                system.main_loop()
+        start_pipeline.assert_called_once()
+        stop_pipeline.assert_called_once()
+        self.assertIn("Address already in use", logs.output[0])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-16
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+from utils.frame_reader import FrameReader
+from utils.replay_server import (DEFAULT_GAP_S, MAX_GAP_S, ReplayServer, load_recording, recorded_gaps,
+                                 write_capture)
+
+
+def _entry(frame_count, timestamp_us):
+    return {"frame_count": frame_count, "timestamp": timestamp_us,
+            "objects": [{"id": frame_count, "classification": "PERSON"}]}
+
+
+class TestReplayServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Saved like LidarBuffer._save_json_data(): one entry per <frame_count>.json
+        self.session = os.path.join(self.tmp_dir, "object_lists", "98")
+        os.makedirs(self.session)
+        for frame_count in (98, 99, 100, 101):
+            with open(os.path.join(self.session, f"{frame_count}.json"), "w") as f:
+                json.dump(_entry(frame_count, 1_000_000 + (frame_count - 98) * 100_000), f, indent=4)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+    def test_load_session_folder_in_frame_order(self):
+        """Files are ordered by frame_count, not by name."""
+        messages = load_recording(self.session)
+        self.assertEqual([m["object_list"][0]["frame_count"] for m in messages], [98, 99, 100, 101])
+        self.assertEqual(load_recording(os.path.dirname(self.session)), messages)
+
+
+    def test_capture_round_trip(self):
+        messages = load_recording(self.session)
+        path = os.path.join(self.tmp_dir, "capture.bin")
+        self.assertEqual(write_capture(path, messages[:2] + [{"heartbeat": [{}]}] + messages[2:]), 5)
+        self.assertEqual(load_recording(path), messages)
+
+
+    def test_gaps_follow_timestamps_and_speed(self):
+        messages = load_recording(self.session)
+        messages.append({"object_list": [_entry(200, 60_000_000)]})  # Long pause
+        self.assertEqual(recorded_gaps(messages), [0.1, 0.1, 0.1, MAX_GAP_S, DEFAULT_GAP_S])
+
+        self.assertAlmostEqual(ReplayServer(messages, speed=2.0)._interval_after(0), 0.05)
+        self.assertEqual(ReplayServer(messages, speed=0)._interval_after(0), 0.0)
+
+
+    def test_serves_recording_at_speed(self):
+        server = ReplayServer(load_recording(self.session), speed=4.0, loop=False)
+        port = server.start_in_thread()
+        try:
+            with socket.create_connection(("127.0.0.1", port)) as client:
+                start = time.monotonic()
+                payloads = [json.loads(bytes(p)) for p in FrameReader(client)]
+                elapsed = time.monotonic() - start
+        finally:
+            server.stop_thread()
+
+        self.assertEqual([p["object_list"][0]["frame_count"] for p in payloads], [98, 99, 100, 101])
+        self.assertGreaterEqual(elapsed, 3 * 0.1 / 4.0 - 0.01)
+        self.assertEqual(server.frames_sent, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
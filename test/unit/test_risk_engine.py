@@ -0,0 +1,84 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-18
+
+import math
+import unittest
+
+import numpy as np
+
+from modules.risk_engine import RiskEngine
+from utils.frame_batch import FrameBatch
+
+
+class TestRiskEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = RiskEngine()
+        # Ego at the origin, driving along +x at 10 m/s.
+        self.ego_data = {"location_x": 0.0, "location_y": 0.0, "speed_mps": 10.0, "heading_deg": 0.0}
+
+
+    def test_head_on_ttc(self):
+        """A stationary pedestrian 22 m ahead is hit (2 m radius) after 2 s."""
+        batch = FrameBatch.from_scene_objects([
+            {"id": "PED", "type": "PEDESTRIAN", "position": {"x": 22.0, "y": 0.0}, "speed_mps": 0.0, "heading_deg": 0.0}
+        ])
+        terms = self.engine.pairwise(np.array([[0.0, 0.0]]), np.array([[10.0, 0.0]]), batch)
+        self.assertAlmostEqual(float(terms["ttc_s"][0, 0]), 2.0, places=4)
+        self.assertAlmostEqual(float(terms["closest_approach_m"][0, 0]), 0.0, places=4)
+        self.assertAlmostEqual(float(terms["distance_m"][0, 0]), 22.0, places=4)
+
+
+    def test_diverging_object_has_no_ttc(self):
+        batch = FrameBatch.from_scene_objects([
+            {"id": "CAR", "type": "VEHICLE", "position": {"x": -30.0, "y": 0.0}, "speed_mps": 5.0, "heading_deg": 180.0}
+        ])
+        result = self.engine.pairwise(np.array([[0.0, 0.0]]), np.array([[10.0, 0.0]]), batch)
+        self.assertTrue(math.isinf(float(result["ttc_s"][0, 0])))
+        self.assertAlmostEqual(float(result["time_to_closest_s"][0, 0]), 0.0)
+
+
+    def test_pairwise_shapes_for_several_egos(self):
+        batch = FrameBatch.from_scene_objects([
+            {"id": str(i), "type": "VEHICLE", "position": {"x": float(i), "y": 5.0}, "speed_mps": 1.0, "heading_deg": 90.0}
+            for i in range(7)
+        ])
+        egos = np.zeros((3, 2))
+        terms = self.engine.pairwise(egos, egos, batch)
+        for values in terms.values():
+            self.assertEqual(values.shape, (3, 7))
+
+
+    def test_assess_ranks_vru_first(self):
+        """Dangerous objects are returned highest risk first, with their risk terms."""
+        lidar_objects = [
+            {"id": "CAR", "type": "VEHICLE", "position": {"x": 8.0, "y": 0.0}, "speed_mps": 0.0, "heading_deg": 0.0},
+            {"id": "PED", "type": "PEDESTRIAN", "position": {"x": 15.0, "y": 1.0}, "speed_mps": 0.0, "heading_deg": 0.0},
+            {"id": "FAR", "type": "VEHICLE", "position": {"x": -80.0, "y": 40.0}, "speed_mps": 3.0, "heading_deg": 90.0},
+        ]
+        result = self.engine.assess(self.ego_data, lidar_objects)
+        ids = [obj["id"] for obj in result["ranked_objects"]]
+        self.assertEqual(ids, ["PED", "CAR"])
+        self.assertEqual(result["source"], "risk_engine")
+        self.assertIn("ttc_s", result["ranked_objects"][0])
+        self.assertGreaterEqual(result["ranked_objects"][0]["risk_score"], result["ranked_objects"][1]["risk_score"])
+
+
+    def test_clear_scene_is_not_ambiguous(self):
+        lidar_objects = [
+            {"id": "FAR", "type": "VEHICLE", "position": {"x": -80.0, "y": 40.0}, "speed_mps": 3.0, "heading_deg": 90.0}
+        ]
+        result = self.engine.assess(self.ego_data, lidar_objects)
+        self.assertEqual(result["ranked_objects"], [])
+        self.assertFalse(result["ambiguous"])
+
+
+    def test_missing_kinematics_is_ambiguous(self):
+        """Objects without position/speed cannot be scored, so the LLM decides."""
+        result = self.engine.assess(self.ego_data, [{"id": "OBJ1"}])
+        self.assertTrue(result["ambiguous"])
+        self.assertEqual(result["ranked_objects"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-05
+
+import unittest
+
+from modules.scene_cache import SceneCache, refresh_result, scene_signature
+
+
+class TestSceneCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = SceneCache(max_size=2, ttl_s=1.0, clock=lambda: self.now)
+        self.ego_data = {"location_x": 12.5, "location_y": 38.2, "speed_mps": 11.4, "heading_deg": 82.3}
+        self.lidar_objects = [
+            {"id": "OBJ456", "type": "PEDESTRIAN", "position": {"x": 13.1, "y": 38.5}, "speed_mps": 1.2, "heading_deg": 270.0},
+            {"id": "OBJ789", "type": "VEHICLE", "position": {"x": 11.8, "y": 37.9}, "speed_mps": 9.0, "heading_deg": 85.0},
+        ]
+
+
+    def test_signature_quantizes_small_changes(self):
+        moved = [dict(obj, position={"x": obj["position"]["x"] + 0.1, "y": obj["position"]["y"]})
+                 for obj in reversed(self.lidar_objects)]
+        self.assertEqual(scene_signature(self.ego_data, self.lidar_objects),
+                         scene_signature(self.ego_data, moved))
+
+        far = [dict(self.lidar_objects[0], position={"x": 16.0, "y": 38.5}), self.lidar_objects[1]]
+        self.assertNotEqual(scene_signature(self.ego_data, self.lidar_objects),
+                            scene_signature(self.ego_data, far))
+        self.assertNotEqual(scene_signature(self.ego_data, self.lidar_objects),
+                            scene_signature(self.ego_data, self.lidar_objects[:1]))
+
+
+    def test_ttl_lru_and_stats(self):
+        self.cache.put("a", {"ranked_objects": []})
+        self.assertIsNotNone(self.cache.get("a"))
+        self.now = 1.5
+        self.assertIsNone(self.cache.get("a"))
+        for key in ("b", "c", "d"):
+            self.cache.put(key, {})
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats, {'hits': 1, 'misses': 2, 'expired': 1, 'evicted': 1})
+        self.assertAlmostEqual(self.cache.hit_rate(), 1 / 3)
+
+
+    def test_refresh_result_uses_current_positions(self):
+        cached = {"ranked_objects": [{"id": "OBJ456", "position": {"x": 0.0, "y": 0.0}, "risk_score": 0.9}],
+                  "analysis_timestamp": 0}
+        refreshed = refresh_result(cached, self.lidar_objects)
+        self.assertEqual(refreshed["ranked_objects"][0]["position"], {"x": 13.1, "y": 38.5})
+        self.assertEqual(refreshed["ranked_objects"][0]["risk_score"], 0.9)
+        self.assertTrue(refreshed["cached"])
+        self.assertEqual(cached["ranked_objects"][0]["position"], {"x": 0.0, "y": 0.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-30
+
+import json
+import unittest
+from pathlib import Path
+
+from modules.scene_encoder import COLUMNS, SceneEncoder
+from utils.frame_batch import FrameBatch
+
+EXAMPLE_FRAME = Path(__file__).resolve().parents[2] / "data" / "example_object_list.json"
+
+
+class TestSceneEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = SceneEncoder()
+        self.ego_data = {"location_x": 0.0, "location_y": 0.0, "speed_mps": 10.0, "heading_deg": 0.0}
+        self.lidar_objects = [
+            {"id": "FAR", "type": "VEHICLE", "position": {"x": -80.04, "y": 40.0}, "speed_mps": 3.0, "heading_deg": 90.0},
+            {"id": "PED", "type": "PEDESTRIAN", "position": {"x": 22.0, "y": 0.0}, "speed_mps": 0.0, "heading_deg": 0.0},
+            {"id": "OBJ1"},
+        ]
+
+
+    def _rows(self, text):
+        lines = text.splitlines()
+        return lines[lines.index(",".join(COLUMNS)) + 1:]
+
+
+    def test_table_rows(self):
+        """One row per object, highest priority first, rounded, '-' for missing values."""
+        encoding = self.encoder.encode(self.ego_data, self.lidar_objects)
+        self.assertIn("EGO Vehicle Data", encoding.text)
+        self.assertIn('"location_x": 0.0', encoding.text)
+        self.assertEqual(self._rows(encoding.text), [
+            "PED,PEDESTRIAN,22.0,0.0,0.0,0,22.0,2.0",
+            "FAR,VEHICLE,-80.0,40.0,3.0,90,89.5,-",
+            "OBJ1,UNKNOWN,-,-,-,-,-,-",
+        ])
+        self.assertEqual(encoding.objects_kept, 3)
+
+
+    def test_frame_batch_input(self):
+        batch = FrameBatch.from_scene_objects(self.lidar_objects)
+        encoding = self.encoder.encode(self.ego_data, batch)
+        self.assertEqual(self._rows(encoding.text)[0].split(",")[0], "PED")
+
+
+    def test_budget_keeps_highest_priority(self):
+        objects = [{"id": obj["id"], "type": "PEDESTRIAN" if obj["classification"] == "PERSON" else "VEHICLE",
+                    "position": obj["position"], "speed_mps": 0.0, "heading_deg": obj["heading"]}
+                   for obj in json.loads(EXAMPLE_FRAME.read_text())["object_list"][0]["objects"]]
+        self.assertEqual(self.encoder.encode(self.ego_data, objects).verbose_tokens, 0)
+        full = SceneEncoder(measure_savings=True).encode(self.ego_data, objects)
+        self.assertEqual(full.objects_kept, len(objects))
+        self.assertLess(full.tokens, full.verbose_tokens / 3)
+
+        budget = SceneEncoder(token_budget=full.tokens // 2).encode(self.ego_data, objects)
+        self.assertLessEqual(budget.tokens, full.tokens // 2)
+        self.assertGreater(budget.objects_kept, 0)
+        self.assertEqual(self._rows(budget.text), self._rows(full.text)[:budget.objects_kept])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-12
+
+import threading
+import unittest
+
+from modules.scheduler import LatestQueue, PeriodicScheduler
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class TestPeriodicScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.scheduler = PeriodicScheduler(0.1, clock=self.clock, sleep=self.clock.sleep)
+
+
+    def test_no_drift(self):
+        """Work of varying length within the period keeps ticks on the 100 ms grid."""
+        ticks = []
+        for work_s in (0.0, 0.03, 0.07, 0.01):
+            self.assertTrue(self.scheduler.wait())
+            ticks.append(round(self.clock.now - 100.0, 6))
+            self.clock.now += work_s
+        self.assertEqual(ticks, [0.0, 0.1, 0.2, 0.3])
+        self.assertEqual(self.scheduler.stats['deadline_misses'], 0)
+
+
+    def test_overrun_is_a_miss_and_skips_passed_ticks(self):
+        self.scheduler.wait()
+        self.clock.now += 0.35  # Ticks at 0.1, 0.2 and 0.3 have passed
+        self.assertFalse(self.scheduler.wait())
+        self.assertEqual(self.scheduler.stats['deadline_misses'], 1)
+        self.assertEqual(self.scheduler.stats['skipped_ticks'], 2)
+        self.assertAlmostEqual(self.scheduler.stats['max_lateness_ms'], 250.0)
+
+        # Back on the grid: the next tick is at 0.4, not 0.45.
+        self.assertTrue(self.scheduler.wait())
+        self.assertAlmostEqual(self.clock.now - 100.0, 0.4)
+
+
+    def test_run_until_stopped(self):
+        stop = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(self.clock.now)
+            if len(calls) == 3:
+                stop.set()
+            raise RuntimeError("logged, not raised")
+
+        self.scheduler.run(work, stop)
+        self.assertEqual(len(calls), 3)
+
+
+class TestLatestQueue(unittest.TestCase):
+
+    def test_keeps_only_newest(self):
+        frames = LatestQueue()
+        for frame in range(5):
+            frames.put_latest(frame)
+        self.assertEqual(frames.dropped, 4)
+        self.assertEqual(frames.get_latest(), 4)
+        self.assertIsNone(frames.get_latest())
+        self.assertIsNone(frames.get_latest(timeout=0.01))
+
+
+if __name__ == '__main__':
+    unittest.main()
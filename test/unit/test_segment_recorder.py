@@ -0,0 +1,114 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-26
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from utils.batch_writer import BatchWriter
+from utils.lidar_buffer import LidarBuffer
+from utils.segment_recorder import SegmentRecorder
+
+# Stand-in for ffmpeg: the segment muxer writes a small file plus a segment
+# list line every -segment_time seconds until "q" arrives on stdin; the
+# concat demuxer joins the listed files byte for byte.
+FAKE_FFMPEG = r'''#!{python}
+import os, sys, threading, time
+args = sys.argv[1:]
+if "concat" in args:
+    with open(args[args.index("-i") + 1]) as f:
+        paths = [line.split("'")[1] for line in f if line.startswith("file")]
+    with open(args[-1], "wb") as out:
+        for path in paths:
+            with open(path, "rb") as seg:
+                out.write(seg.read())
+    sys.exit(0)
+
+segment_s = float(args[args.index("-segment_time") + 1])
+segment_list = args[args.index("-segment_list") + 1]
+pattern = args[-1]
+stop = threading.Event()
+threading.Thread(target=lambda: (sys.stdin.read(1), stop.set()), daemon=True).start()
+index, start = 0, 0.0
+while not stop.wait(segment_s):
+    path = pattern % index
+    with open(path, "wb") as f:
+        f.write(b"segment %d\n" % index)
+    with open(segment_list, "a") as f:
+        f.write(f"{{os.path.basename(path)}},{{start:.3f}},{{start + segment_s:.3f}}\n")
+    index, start = index + 1, start + segment_s
+'''
+
+
+class TestSegmentRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ffmpeg = os.path.join(self.tmp_dir, "ffmpeg")
+        with open(self.ffmpeg, "w") as f:
+            f.write(FAKE_FFMPEG.format(python=sys.executable))
+        os.chmod(self.ffmpeg, os.stat(self.ffmpeg).st_mode | stat.S_IEXEC)
+        self.recorder = SegmentRecorder((640, 480, 0, 0), os.path.join(self.tmp_dir, "segments"),
+                                        ffmpeg=self.ffmpeg, segment_s=0.1, retain_s=0.6)
+
+
+    def tearDown(self):
+        self.recorder.stop()
+        shutil.rmtree(self.tmp_dir)
+
+
+    def test_export_joins_covering_segments(self):
+        self.assertTrue(self.recorder.start())
+        self.assertTrue(self.recorder.start())  # Already running: no second process
+        start = time.time()
+        time.sleep(0.35)
+        output = os.path.join(self.tmp_dir, "batch.mp4")
+        self.assertEqual(self.recorder.export(start, time.time(), output), output)
+
+        with open(output, "rb") as f:
+            parts = f.read().split(b"\n")[:-1]
+        self.assertGreaterEqual(len(parts), 3)
+        self.assertEqual(parts[0], b"segment 0")
+        self.assertEqual(self.recorder.stats['processes_started'], 1)
+        self.assertFalse(os.path.exists(output + ".txt"))
+
+
+    def test_old_segments_are_deleted(self):
+        self.recorder.start()
+        time.sleep(1.2)
+        segments = self.recorder.completed_segments()
+        self.assertGreater(self.recorder.stats['segments_deleted'], 0)
+        self.assertTrue(all(os.path.exists(s.path) for s in segments))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "segments", "seg_000000.mp4")))
+
+
+    def test_batch_rollover_does_not_restart_capture(self):
+        """LidarBuffer cuts every batch from the one capture process."""
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        writer = BatchWriter()
+        try:
+            buffer = LidarBuffer(max_frames=2, min_video_duration=0, recorder=self.recorder,
+                                 batch_writer=writer, session_codec="none")
+            video_path = buffer.start_screen_recording()
+            for frame_count in range(6):
+                time.sleep(0.05)
+                video_path = buffer.add_data({"object_list": [{"frame_count": frame_count, "objects": []}]},
+                                             video_path)
+            buffer.stop_recording(video_path)
+        finally:
+            writer.close(timeout=30)
+            os.chdir(cwd)
+
+        self.assertEqual(self.recorder.stats['processes_started'], 1)
+        self.assertTrue(self.recorder.running)
+        self.assertEqual(self.recorder.stats['exports'], 2)
+        videos = sorted(os.listdir(os.path.join(self.tmp_dir, "data", "videos")))
+        self.assertEqual(videos, ["0.mp4", "3.mp4"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-19
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from utils.session_store import (SESSION_SUFFIX, SessionReader, available_codecs, convert_tree, read_session,
+                                 write_session)
+
+
+def _frames(first, count):
+    return [{"frame_count": first + i, "timestamp": 1_000_000 + i * 100_000,
+             "objects": [{"id": i, "classification": "PERSON", "position": {"x": 1.5, "y": -2.0, "z": 0.0}}]}
+            for i in range(count)]
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "1000" + SESSION_SUFFIX)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+    def test_round_trip_every_codec(self):
+        frames = _frames(1000, 71)
+        for codec in available_codecs():
+            with self.subTest(codec=codec):
+                self.assertEqual(write_session(self.path, frames, codec), 71)
+                with SessionReader(self.path) as reader:
+                    self.assertEqual(reader.codec.name, codec)
+                    self.assertFalse(reader.recovered)
+                    self.assertEqual(len(reader), 71)
+                    self.assertEqual(reader.frame_counts, list(range(1000, 1071)))
+                    self.assertEqual(reader.get(1042), frames[42])
+                    self.assertRaises(KeyError, reader.get, 999)
+                self.assertEqual(read_session(self.path), frames)
+
+
+    def test_truncated_file_rebuilds_index(self):
+        """A session cut short mid-record keeps every complete record."""
+        frames = _frames(1000, 10)
+        write_session(self.path, frames, "none")
+        with SessionReader(self.path) as reader:
+            cut = reader.index[7][1] + 5  # Inside record 7
+        with open(self.path, "r+b") as f:
+            f.truncate(cut)
+
+        with SessionReader(self.path) as reader:
+            self.assertTrue(reader.recovered)
+            self.assertEqual(list(reader), frames[:7])
+
+
+    def test_convert_per_frame_folders(self):
+        base_dir = os.path.join(self.tmp_dir, "object_lists")
+        for first in (98, 500):
+            folder = os.path.join(base_dir, str(first))
+            os.makedirs(folder)
+            for frame in _frames(first, 12):
+                with open(os.path.join(folder, f"{frame['frame_count']}.json"), "w") as f:
+                    json.dump(frame, f, indent=4)
+
+        written = convert_tree(base_dir, remove=True)
+        self.assertEqual(written, [os.path.join(base_dir, "98" + SESSION_SUFFIX),
+                                   os.path.join(base_dir, "500" + SESSION_SUFFIX)])
+        self.assertEqual(sorted(os.listdir(base_dir)), ["500" + SESSION_SUFFIX, "98" + SESSION_SUFFIX])
+        # Numeric, not lexical, frame order (98..109 and 500..511)
+        self.assertEqual(read_session(written[0]), _frames(98, 12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-05-09
+
+import types
+import unittest
+
+import numpy as np
+
+try:
+    import torch
+    from transformers import DynamicCache, Qwen2Config, Qwen2ForCausalLM
+except ImportError:  # llama.cpp hosts run without torch
+    torch = None
+
+from modules.speculative import SpeculativeDecoder
+
+PAD_ID, EOS_ID = 62, 63
+
+
+def _tiny_model(seed):
+    config = Qwen2Config(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=256,
+                         pad_token_id=PAD_ID, bos_token_id=EOS_ID, eos_token_id=EOS_ID)
+    torch.manual_seed(seed)
+    return Qwen2ForCausalLM(config).eval()
+
+
+@unittest.skipIf(torch is None, "torch/transformers not installed")
+class TestSpeculativeDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.target = _tiny_model(0)
+        torch.manual_seed(2)
+        self.input_ids = torch.randint(0, 60, (1, 12))
+        with torch.no_grad():
+            self.expected = self.target.generate(self.input_ids, attention_mask=torch.ones_like(self.input_ids),
+                                                 max_new_tokens=24, do_sample=False, pad_token_id=PAD_ID)
+
+
+    def _generate(self, draft, past_key_values=None):
+        decoder = SpeculativeDecoder(types.SimpleNamespace(model=draft), num_draft_tokens=3)
+        output_ids, run = decoder.generate(self.target, self.input_ids, past_key_values,
+                                           max_new_tokens=24, eos_token_id=EOS_ID)
+        return output_ids, run
+
+
+    def test_matches_greedy_decoding(self):
+        """Any draft model gives the target's greedy output."""
+        output_ids, run = self._generate(_tiny_model(1))
+        self.assertTrue(torch.equal(output_ids, self.expected))
+        self.assertLessEqual(run['accepted'], run['drafted'])
+
+
+    def test_identical_draft_is_always_accepted(self):
+        output_ids, run = self._generate(self.target)
+        self.assertTrue(torch.equal(output_ids, self.expected))
+        self.assertEqual(run['accepted'], run['drafted'])
+        self.assertLessEqual(run['rounds'], self.expected.shape[1] - self.input_ids.shape[1])
+
+
+    def test_uses_prefix_cache(self):
+        cache = DynamicCache()
+        with torch.no_grad():
+            self.target(input_ids=self.input_ids[:, :5], past_key_values=cache, use_cache=True)
+        output_ids, _ = self._generate(_tiny_model(1), past_key_values=cache)
+        self.assertTrue(torch.equal(output_ids, self.expected))
+
+
+class TestChoose(unittest.TestCase):
+
+    def test_only_verify_steps_count_as_unconstrained(self):
+        """Draft proposals are re-chosen by the target; counting both would inflate the metric."""
+        validator = types.SimpleNamespace(complete=False, failed=True)
+        constraint = types.SimpleNamespace(unconstrained_steps=0)
+        scores = np.array([[0.1, 0.9, 0.2]])
+        self.assertEqual(SpeculativeDecoder._choose(scores, validator, constraint, verify=False), 1)
+        self.assertEqual(constraint.unconstrained_steps, 0)
+        self.assertEqual(SpeculativeDecoder._choose(scores, validator, constraint), 1)
+        self.assertEqual(constraint.unconstrained_steps, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-14
+
+import json
+import unittest
+from unittest.mock import MagicMock
+from utils.fp_filter import FalsePositiveFilter
+from utils.frame_ring import FrameRing
+from utils.vru_detector import VRU_CLASSIFICATIONS, VruDetector
+from utils.vru_tracker import VruTracker
+from utils.zone_map import ZoneMap
+
+
+def _frame(frame_count, *classifications):
+    return {
+        "object_list": [{
+            "frame_count": frame_count,
+            "objects": [{"id": i, "classification": c} for i, c in enumerate(classifications)]
+        }]
+    }
+
+
+def _payload(data):
+    return memoryview(json.dumps(data).encode("utf-8"))
+
+
+class TestVruDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.lidar_buffer = MagicMock()
+        self.lidar_buffer.start_screen_recording.return_value = "temp.mp4"
+        self.lidar_buffer.add_data.return_value = "temp.mp4"
+        self.detector = VruDetector(self.lidar_buffer, no_vru_threshold=2)
+
+
+    def test_session_lifecycle(self):
+        """A VRU starts a session, which ends after no_vru_threshold empty frames."""
+        self.assertFalse(self.detector.handle_frame(_frame(1, "PERSON")))
+        self.lidar_buffer.start_screen_recording.assert_called_once()
+        self.assertFalse(self.detector.handle_frame(_frame(2, "VEHICLE")))
+        self.assertTrue(self.detector.handle_frame(_frame(3, "VEHICLE")))
+        self.lidar_buffer.stop_recording.assert_called_once_with("temp.mp4")
+        self.assertEqual(self.lidar_buffer.add_data.call_count, 3)
+
+
+    def test_prescreen_skips_frames_without_vru(self):
+        """Idle frames without a VRU are not decoded; the counter records it."""
+        self.assertFalse(self.detector.should_decode(_payload(_frame(1, "VEHICLE"))))
+        self.assertTrue(self.detector.should_decode(_payload(_frame(2, "VEHICLE", "PERSON"))))
+        self.assertEqual(self.detector.screen_counters['frames_screened'], 2)
+        self.assertEqual(self.detector.screen_counters['full_decodes_avoided'], 1)
+
+
+    def test_prescreen_decodes_everything_during_session(self):
+        self.detector.handle_frame(_frame(1, "BICYCLE"))
+        self.assertTrue(self.detector.should_decode(_payload(_frame(2, "VEHICLE"))))
+
+
+    def test_pre_event_frames_start_the_session(self):
+        """Idle frames in the ring are handed over on session start, without the current frame."""
+        ring = FrameRing(capacity=3)
+        detector = VruDetector(self.lidar_buffer, no_vru_threshold=2, pre_event=ring)
+        for frame_count in range(1, 6):
+            self.assertFalse(detector.should_decode(_payload(_frame(frame_count, "VEHICLE"))))
+        payload = _payload(_frame(6, "PERSON"))
+        self.assertTrue(detector.should_decode(payload))
+        detector.handle_frame(json.loads(bytes(payload)))
+
+        pre_event = self.lidar_buffer.add_pre_event.call_args[0][0]
+        self.assertEqual([json.loads(bytes(p))["object_list"][0]["frame_count"] for p in pre_event], [4, 5])
+        self.lidar_buffer.add_data.assert_called_once()
+        self.assertEqual(len(ring), 0)
+
+        # Frames of an active session are not kept in the ring
+        detector.should_decode(_payload(_frame(7, "VEHICLE")))
+        self.assertEqual(len(ring), 0)
+
+
+    def test_fp_filter_suppresses_session(self):
+        """A VRU rejected by the false-positive filter does not start a session."""
+        fp_filter = FalsePositiveFilter()
+        detector = VruDetector(self.lidar_buffer, no_vru_threshold=2, fp_filter=fp_filter)
+        # _frame() objects have no confidence, so the low_confidence rule fires.
+        detector.handle_frame(_frame(1, "PERSON"))
+        detector.handle_frame(_frame(2, "PERSON"))
+        self.assertFalse(detector.vru_started)
+        self.lidar_buffer.start_screen_recording.assert_not_called()
+        self.assertEqual(fp_filter.sessions_avoided["low_confidence"], 1)
+
+
+    def test_skipped_frame_ends_suppressed_run(self):
+        """Suppressed runs split by a frame the prescreen skips count as two avoided sessions."""
+        fp_filter = FalsePositiveFilter()
+        detector = VruDetector(self.lidar_buffer, no_vru_threshold=2, fp_filter=fp_filter)
+        for frame in (_frame(1, "PERSON"), _frame(2, "VEHICLE"), _frame(3, "PERSON")):
+            if detector.should_decode(_payload(frame)):
+                detector.handle_frame(frame)
+        self.assertEqual(detector.screen_counters['full_decodes_avoided'], 1)
+        self.assertEqual(fp_filter.sessions_avoided["low_confidence"], 2)
+
+
+    def test_tracker_requires_confirmed_vru(self):
+        """With a tracker, a single-frame VRU does not start a session; a persistent one does."""
+        tracker = VruTracker(VRU_CLASSIFICATIONS, confirm_hits=2, confirm_window=3)
+        detector = VruDetector(self.lidar_buffer, no_vru_threshold=2, tracker=tracker)
+        detector.handle_frame(_frame(1, "VEHICLE", "PERSON"))
+        detector.handle_frame(_frame(2, "VEHICLE"))
+        self.assertFalse(detector.vru_started)
+        detector.handle_frame(_frame(3, "VEHICLE", "PERSON"))
+        self.assertTrue(detector.vru_started)
+        self.lidar_buffer.start_screen_recording.assert_called_once()
+
+
+    def test_zone_map_ignores_vru_outside_zones(self):
+        zone_map = ZoneMap.from_dict({"zones": [
+            {"name": "crosswalk", "kind": "crosswalk", "polygon": [[0, 0], [5, 0], [5, 5], [0, 5]]}
+        ]})
+        detector = VruDetector(self.lidar_buffer, no_vru_threshold=2, zone_map=zone_map)
+        outside = _frame(1, "PERSON")
+        outside["object_list"][0]["objects"][0]["position"] = {"x": 20.0, "y": 1.0}
+        detector.handle_frame(outside)
+        self.assertFalse(detector.vru_started)
+        inside = _frame(2, "PERSON")
+        inside["object_list"][0]["objects"][0]["position"] = {"x": 2.0, "y": 1.0}
+        detector.handle_frame(inside)
+        self.assertTrue(detector.vru_started)
+
+
+if __name__ == '__main__':
+    unittest.main()
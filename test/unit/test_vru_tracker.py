@@ -0,0 +1,66 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-23
+
+import unittest
+
+from utils.vru_tracker import VruTracker
+
+VRU_CLASSIFICATIONS = {"PERSON", "BICYCLE"}
+
+
+def _obj(track_id, classification, confidence=0.9):
+    return {"id": track_id, "classification": classification, "classification_confidence": confidence}
+
+
+class TestVruTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = VruTracker(VRU_CLASSIFICATIONS, confirm_hits=3, confirm_window=5,
+                                  vote_window=4, timeout_frames=10)
+
+
+    def test_confirmed_after_k_of_n(self):
+        """A VRU is reported from its third hit on, gaps within the window allowed."""
+        self.assertEqual(self.tracker.update(1, [_obj(7, "PERSON")]), [])
+        self.assertEqual(self.tracker.update(3, [_obj(7, "PERSON")]), [])
+        confirmed = self.tracker.update(4, [_obj(7, "PERSON")])
+        self.assertEqual([obj["id"] for obj in confirmed], [7])
+        self.assertEqual(self.tracker.counters['tracks_confirmed'], 1)
+
+
+    def test_sparse_hits_are_not_confirmed(self):
+        for frame_count in (1, 4, 7, 10):
+            self.assertEqual(self.tracker.update(frame_count, [_obj(7, "PERSON")]), [])
+
+
+    def test_hysteresis_and_class_votes(self):
+        """A confirmed track survives a misclassified frame but not a majority of them."""
+        for frame_count in (1, 2, 3):
+            self.tracker.update(frame_count, [_obj(7, "PERSON")])
+        self.assertEqual(len(self.tracker.update(4, [_obj(7, "VEHICLE")])), 1)
+        self.assertEqual(len(self.tracker.update(5, [_obj(7, "VEHICLE")])), 0)
+        self.assertEqual(len(self.tracker.update(6, [_obj(7, "VEHICLE")])), 0)
+        self.assertFalse(self.tracker.tracks[7].is_vru)
+
+
+    def test_only_vru_objects_open_tracks(self):
+        self.tracker.update(1, [_obj(1, "VEHICLE"), _obj(2, "BICYCLE", 0.5)])
+        self.assertEqual(list(self.tracker.tracks), [2])
+        self.tracker.update(2, [_obj(2, "BICYCLE", 1.0)])
+        self.assertAlmostEqual(self.tracker.tracks[2].smoothed_confidence, 0.65)
+        self.assertEqual(self.tracker.tracks[2].first_seen, 1)
+
+
+    def test_tracks_expire(self):
+        self.tracker.update(1, [_obj(1, "PERSON")])
+        self.tracker.update(5, [_obj(2, "PERSON")])
+        self.tracker.update(12, [])
+        self.assertEqual(list(self.tracker.tracks), [2])
+        self.assertEqual(self.tracker.counters['tracks_expired'], 1)
+        # A frame counter that goes backwards means the sensor restarted.
+        self.tracker.update(3, [])
+        self.assertEqual(len(self.tracker.tracks), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
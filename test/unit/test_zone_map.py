@@ -0,0 +1,66 @@
+# Author: Fengze Yang, Email: fred.yang@utah.edu
+# Date: 2025-04-25
+
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from utils.zone_map import ZoneMap, load_zone_map, points_in_polygon
+
+EXAMPLE_ZONES = Path(__file__).resolve().parents[2] / "src" / "properties" / "zones.example.json"
+
+
+class TestZoneMap(unittest.TestCase):
+
+    def setUp(self):
+        self.zone_map = ZoneMap.from_dict({
+            "cell_size_m": 1.0,
+            "zones": [
+                {"name": "crosswalk", "kind": "crosswalk",
+                 "polygon": [[0.0, 0.0], [4.0, 0.0], [4.0, 2.0], [0.0, 2.0]]},
+                # L-shaped sidewalk overlapping the crosswalk corner.
+                {"name": "sidewalk", "kind": "sidewalk",
+                 "polygon": [[3.0, 1.0], [10.0, 1.0], [10.0, 3.0], [5.0, 3.0], [5.0, 8.0], [3.0, 8.0]]},
+            ]
+        })
+
+
+    def test_zone_indices(self):
+        points = np.array([[1.0, 1.0], [3.5, 1.5], [7.0, 2.0], [7.0, 6.0], [4.0, 6.0], [np.nan, 1.0], [-5.0, 0.0]])
+        np.testing.assert_array_equal(self.zone_map.zone_indices(points), [0, 0, 1, -1, 1, -1, -1])
+
+
+    def test_matches_exact_test(self):
+        """The grid index gives the same answer as testing every polygon."""
+        points = np.random.default_rng(0).uniform(-2.0, 12.0, (5000, 2))
+        expected = np.full(len(points), -1)
+        for index in reversed(range(len(self.zone_map.zones))):
+            expected[points_in_polygon(points, self.zone_map.zones[index].polygon)] = index
+        np.testing.assert_array_equal(self.zone_map.zone_indices(points), expected)
+
+
+    def test_filter_and_tag_objects(self):
+        objects = [
+            {"id": "A", "position": {"x": 1.0, "y": 1.0}},
+            {"id": "B", "position": {"x": 4.0, "y": 6.0}},
+            {"id": "C", "position": {"x": 30.0, "y": 30.0}},
+            {"id": "D"},
+        ]
+        self.assertEqual(self.zone_map.tag_objects(objects), ["crosswalk", "sidewalk", None, None])
+        self.assertEqual([obj["id"] for obj in self.zone_map.filter_objects(objects)], ["A", "B"])
+        self.assertEqual([obj["id"] for obj in self.zone_map.filter_objects(objects, kinds={"crosswalk"})], ["A"])
+
+
+    def test_invalid_config(self):
+        with self.assertRaises(ValueError):
+            ZoneMap.from_dict({"zones": [{"name": "x", "kind": "parking", "polygon": [[0, 0], [1, 0], [0, 1]]}]})
+
+
+    def test_example_file_and_missing_file(self):
+        self.assertEqual(len(ZoneMap.from_json(EXAMPLE_ZONES).zones), 8)
+        self.assertIsNone(load_zone_map(EXAMPLE_ZONES.with_name("missing_zones.json")))
+
+
+if __name__ == '__main__':
+    unittest.main()